@@ -10,6 +10,6 @@ setup(
     author_email='',
     description='',
     install_requires=[
-        'PySide6', 'peewee'
+        'PySide6', 'peewee', 'numpy'
     ]
 )
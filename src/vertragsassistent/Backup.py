@@ -0,0 +1,220 @@
+from collections.abc import Callable
+from Data import *
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+# pages copied per step, the database is locked only for the duration of a step
+BACKUP_PAGES = 256
+# snapshots kept by default, older ones are deleted after each new one
+KEEP = 10
+CHUNK_SIZE = 1024 * 1024
+SNAPSHOT_FORMAT = '%Y%m%d-%H%M%S'
+
+
+class Cancelled(Exception):
+    pass
+
+
+def backup_directory() -> str:
+    # snapshots are kept next to the database, like the document store
+    base, _ = os.path.splitext(os.path.abspath(db.database))
+    return base + '.sicherungen'
+
+
+def snapshots(directory: str) -> list[str]:
+    # names of the snapshots in the directory, oldest first
+    try:
+        names = [name[:-3] for name in os.listdir(directory) if name.endswith('.db')]
+    except FileNotFoundError:
+        return []
+    return sorted((name for name in names if _snapshot_time(name) is not None), key=_snapshot_order)
+
+
+def _snapshot_time(name: str) -> datetime.datetime | None:
+    # snapshots of the same second are numbered from the second one on, as <time>-2 and so on
+    stamp, number = name[:15], name[15:]
+    if number and not (number.startswith('-') and number[1:].isdigit()):
+        return None
+    try:
+        return datetime.datetime.strptime(stamp, SNAPSHOT_FORMAT)
+    except ValueError:
+        return None
+
+
+def _snapshot_order(name: str) -> tuple[str, int]:
+    return name[:15], int(name[16:] or 1)
+
+
+def _reserve(directory: str) -> str:
+    # a name no other snapshot has, also when backups of another process run in the same second; the empty file
+    # is replaced by the snapshot
+    stamp = datetime.datetime.now().strftime(SNAPSHOT_FORMAT)
+    for number in itertools.count(1):
+        name = stamp if number == 1 else f"{stamp}-{number}"
+        try:
+            with open(os.path.join(directory, name + '.db'), 'x'):
+                return name
+        except FileExistsError:
+            continue
+
+
+def last_snapshot(directory: str) -> datetime.datetime | None:
+    names = snapshots(directory)
+    return _snapshot_time(names[-1]) if names else None
+
+
+def backup(directory: str | None = None, documents: bool = False, keep: int = KEEP,
+           cancelled: threading.Event | None = None, progress: Callable[[int, int], None] | None = None) -> str:
+    # copy the open database with the online backup API while it stays in use, optionally archive the changed
+    # documents, then delete the snapshots beyond the newest keep ones; returns the file of the snapshot
+    directory = directory or backup_directory()
+    os.makedirs(directory, exist_ok=True)
+    name = _reserve(directory)
+    target = os.path.join(directory, name + '.db')
+    temporary = tempfile.NamedTemporaryFile(dir=directory, prefix='.sicherung-', suffix='.db', delete=False)
+    temporary.close()
+    try:
+        backup_database(temporary.name, cancelled, progress)
+        # readable like the database, not only by its owner like temporary files
+        shutil.copymode(db.database, temporary.name)
+        os.replace(temporary.name, target)
+    except BaseException:
+        os.remove(temporary.name)
+        os.remove(target)
+        raise
+    if documents:
+        try:
+            archive_documents(directory, name, cancelled)
+        except BaseException:
+            os.remove(target)
+            raise
+    prune(directory, keep)
+    return target
+
+
+def backup_database(target: str, cancelled: threading.Event | None = None,
+                    progress: Callable[[int, int], None] | None = None):
+    # a connection of its own, writes of the application in between let sqlite restart the copy
+    source = sqlite3.connect(db.database, timeout=30)
+    destination = sqlite3.connect(target)
+
+    def step(status: int, remaining: int, total: int):
+        # raising here aborts the backup
+        if cancelled is not None and cancelled.is_set():
+            raise Cancelled(target)
+        if progress is not None:
+            progress(total - remaining, total)
+
+    try:
+        source.backup(destination, pages=BACKUP_PAGES, progress=step, sleep=0.005)
+    finally:
+        destination.close()
+        source.close()
+
+
+def archive_documents(directory: str, name: str, cancelled: threading.Event | None = None):
+    # the documents referenced by the snapshot, compressed and stored under their content hash; only files changed
+    # since the previous snapshot are read again, unchanged ones are recognized by size and modification time
+    archive = os.path.join(directory, 'dokumente')
+    # the newest earlier snapshot with documents, not every snapshot has them
+    previous = {}
+    for older in reversed([snapshot for snapshot in snapshots(directory)
+                          if _snapshot_order(snapshot) < _snapshot_order(name)]):
+        if os.path.exists(os.path.join(directory, older + '.json')):
+            previous = _manifest(directory, older)
+            break
+
+    snapshot = sqlite3.connect(os.path.join(directory, name + '.db'))
+    try:
+        files = [file for file, in snapshot.execute("SELECT DISTINCT file FROM contractdocument")]
+    finally:
+        snapshot.close()
+
+    base = os.path.dirname(os.path.abspath(db.database))
+    manifest = {}
+    for file in files:
+        if cancelled is not None and cancelled.is_set():
+            raise Cancelled(name)
+        try:
+            stat = os.stat(os.path.join(base, file))
+        except OSError:
+            # missing files are left out, the previous snapshots may still hold them
+            continue
+        known = previous.get(file)
+        if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns] \
+                and os.path.exists(_archived(archive, known[2])):
+            manifest[file] = known
+            continue
+        try:
+            manifest[file] = [stat.st_size, stat.st_mtime_ns, _compress(os.path.join(base, file), archive)]
+        except OSError:
+            continue
+
+    temporary = os.path.join(directory, f".{name}.json.tmp")
+    with open(temporary, 'w', encoding='utf-8') as out:
+        json.dump({'database': name + '.db', 'documents': manifest}, out)
+    os.replace(temporary, os.path.join(directory, name + '.json'))
+
+
+def _manifest(directory: str, name: str) -> dict[str, list]:
+    try:
+        with open(os.path.join(directory, name + '.json'), encoding='utf-8') as file:
+            return json.load(file)['documents']
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def _archived(archive: str, digest: str) -> str:
+    return os.path.join(archive, digest[:2], digest + '.gz')
+
+
+def _compress(path: str, archive: str) -> str:
+    # the file compressed into the archive, hashed while reading; returns the hash
+    os.makedirs(archive, exist_ok=True)
+    digest = hashlib.sha256()
+    target = tempfile.NamedTemporaryFile(dir=archive, prefix='.archiv-', delete=False)
+    try:
+        with open(path, 'rb') as source, gzip.GzipFile(fileobj=target, mode='wb', mtime=0) as compressed:
+            while chunk := source.read(CHUNK_SIZE):
+                digest.update(chunk)
+                compressed.write(chunk)
+        target.close()
+    except BaseException:
+        target.close()
+        os.remove(target.name)
+        raise
+    stored = _archived(archive, digest.hexdigest())
+    if os.path.exists(stored):
+        os.remove(target.name)
+    else:
+        os.makedirs(os.path.dirname(stored), exist_ok=True)
+        os.replace(target.name, stored)
+    return digest.hexdigest()
+
+
+def prune(directory: str, keep: int = KEEP):
+    # delete all but the newest keep snapshots and the archived documents none of the remaining ones refers to
+    names = snapshots(directory)
+    for name in names[:-keep] if keep > 0 else []:
+        for extension in ('.db', '.json'):
+            try:
+                os.remove(os.path.join(directory, name + extension))
+            except FileNotFoundError:
+                pass
+    archive = os.path.join(directory, 'dokumente')
+    if not os.path.isdir(archive):
+        return
+    referenced = {known[2] for name in snapshots(directory) for known in _manifest(directory, name).values()}
+    for entry in os.scandir(archive):
+        if entry.is_dir():
+            for blob in os.scandir(entry.path):
+                if blob.name.endswith('.gz') and blob.name[:-3] not in referenced:
+                    os.remove(blob.path)
+
@@ -0,0 +1,99 @@
+from PySide6 import QtCore
+from Backup import Cancelled, KEEP, backup, backup_directory, last_snapshot
+import datetime
+import threading
+
+
+class BackupScheduler(QtCore.QObject):
+    # pages copied and total pages of the running backup
+    progress = QtCore.Signal(int, int)
+    # the file of the snapshot, empty if the backup failed or was cancelled; the error message otherwise
+    finished = QtCore.Signal(str, str)
+    _progressed = QtCore.Signal(int, int)
+    _done = QtCore.Signal(str, str)
+    # how often it is checked whether the next scheduled backup is due
+    check_interval = 15 * 60 * 1000
+    # the first check waits until the application is done starting
+    start_delay = 30 * 1000
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._hours = 0
+        self._keep = KEEP
+        self._documents = False
+        self._running = False
+        self._cancelled = threading.Event()
+        self._progressed.connect(self.progress)
+        self._done.connect(self._finish)
+        self._timer = QtCore.QTimer(self)
+        self._timer.timeout.connect(self._check)
+
+        self._pool = QtCore.QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+
+    def start(self, hours: float, keep: int = KEEP, documents: bool = False):
+        # back up every given hours (none for 0), counted from the last snapshot, also across sessions
+        self._hours, self._keep, self._documents = hours, keep, documents
+        if hours > 0:
+            self._timer.start(self.check_interval)
+            QtCore.QTimer.singleShot(self.start_delay, self, self._check)
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def backup_now(self):
+        if self._running:
+            return
+        self._running = True
+        self._pool.start(_BackupJob(self._keep, self._documents, self._cancelled, self._progressed, self._done))
+
+    def cancel(self):
+        # a cancelled backup leaves no snapshot behind
+        self._timer.stop()
+        self._cancelled.set()
+        self._pool.waitForDone()
+        self._cancelled.clear()
+
+    @QtCore.Slot()
+    def _check(self):
+        last = last_snapshot(backup_directory())
+        if last is None or datetime.datetime.now() - last >= datetime.timedelta(hours=self._hours):
+            self.backup_now()
+
+    @QtCore.Slot(str, str)
+    def _finish(self, file: str, error: str):
+        self._running = False
+        self.finished.emit(file, error)
+
+
+class _BackupJob(QtCore.QRunnable):
+    def __init__(self, keep: int, documents: bool, cancelled: threading.Event, progressed: QtCore.SignalInstance,
+                 done: QtCore.SignalInstance):
+        super().__init__()
+        self._keep = keep
+        self._documents = documents
+        self._cancelled = cancelled
+        self._progressed = progressed
+        self._done = done
+
+    def run(self):
+        file, error = '', ''
+        try:
+            file = backup(documents=self._documents, keep=self._keep, cancelled=self._cancelled,
+                          progress=self._progressed.emit)
+        except Cancelled:
+            pass
+        except Exception as e:
+            error = str(e)
+        self._done.emit(file, error)
+
+
+_scheduler: BackupScheduler | None = None
+
+
+def backups() -> BackupScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = BackupScheduler()
+    return _scheduler
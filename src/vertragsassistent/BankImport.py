@@ -0,0 +1,338 @@
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator
+from typing import NamedTuple
+import csv
+import decimal
+import functools
+import re
+import statistics
+from Data import *
+
+# header names of the columns in the exports of common banks, lower case, preferred ones first
+DATE_COLUMNS = ('buchungstag', 'buchungsdatum', 'datum', 'valutadatum', 'valuta', 'wertstellung', 'date',
+                'booking date')
+AMOUNT_COLUMNS = ('betrag', 'betrag (eur)', 'betrag in eur', 'umsatz', 'umsatz in eur', 'amount')
+PARTY_COLUMNS = ('beguenstigter/zahlungspflichtiger', 'begünstigter/zahlungspflichtiger', 'zahlungsempfänger',
+                 'empfänger', 'name zahlungsbeteiligter', 'auftraggeber / begünstigter', 'auftraggeber/empfänger',
+                 'empfänger/auftraggeber', 'zahlungsempfänger*in', 'name', 'payee', 'counterparty')
+PURPOSE_COLUMNS = ('verwendungszweck', 'buchungstext', 'purpose', 'reference')
+
+# payment intervals in days as used by the pricings
+INTERVALS = (7, 14, 30, 90, 182, 365)
+# words of company names which do not help to tell them apart
+STOP_WORDS = {'gmbh', 'mbh', 'ag', 'se', 'kg', 'co', 'ohg', 'ev', 'e', 'v', 'und', 'the', 'ltd', 'inc', 'sa', 'sarl',
+              'bv', 'ug', 'haftungsbeschraenkt', 'deutschland', 'germany', 'europe', 'sagt', 'danke'}
+MIN_SCORE = 0.6
+UMLAUTS = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+
+
+class Payment(NamedTuple):
+    date: datetime.date
+    amount: decimal.Decimal
+    party: str
+    purpose: str
+
+
+class Proposal(NamedTuple):
+    # a recurring payment and what to do with the pricings of its contract: 'new' pricing, 'change' of price or
+    # interval, 'end' of the pricing, None if no contract matched
+    action: str | None
+    contract_id: int | None
+    contract_name: str
+    party: str
+    payments: int
+    interval: int
+    price: decimal.Decimal
+    since: datetime.date
+    last: datetime.date
+    pricing_id: int | None
+    old_price: decimal.Decimal | None
+    old_interval: int | None
+
+
+# statements repeat the same payees and dates over and over, both are parsed once
+@functools.lru_cache(maxsize=65536)
+def normalize(text: str) -> str:
+    # lower case words without umlauts, punctuation and legal forms
+    text = text.lower().translate(UMLAUTS)
+    words = re.sub(r'[\W_]+', ' ', text).split()
+    return ' '.join(word for word in words if word not in STOP_WORDS)
+
+
+def _trigrams(key: str) -> set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def parse_amount(text: str) -> decimal.Decimal:
+    text = text.replace('€', '').replace('EUR', '').replace(' ', '').replace('\xa0', '')
+    if ',' in text:
+        # german notation, the dot separates thousands
+        text = text.replace('.', '').replace(',', '.')
+    return decimal.Decimal(text)
+
+
+@functools.lru_cache(maxsize=65536)
+def parse_date(text: str) -> datetime.date:
+    text = text.strip()
+    for fmt in ('%d.%m.%Y', '%d.%m.%y', '%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(text)
+
+
+def read_statement(path: str) -> Iterator[Payment]:
+    # the payments of a bank statement export, line by line; lines before the header are skipped
+    with open(path, 'rb') as file:
+        sample = file.read(65536)
+    try:
+        sample.decode('utf-8-sig')
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError:
+        encoding = 'cp1252'
+    text = sample.decode(encoding, errors='replace')
+    delimiter = max(';,\t', key=text.count)
+
+    with open(path, encoding=encoding, errors='replace', newline='') as file:
+        rows = csv.reader(file, delimiter=delimiter)
+        columns = None
+        for row in rows:
+            if columns is None:
+                columns = _columns(row)
+                continue
+            try:
+                date, amount = parse_date(row[columns[0]]), parse_amount(row[columns[1]])
+            except (IndexError, ValueError, decimal.InvalidOperation):
+                # summary lines and the like
+                continue
+            party = row[columns[2]].strip() if columns[2] is not None and columns[2] < len(row) else ''
+            purpose = row[columns[3]].strip() if columns[3] is not None and columns[3] < len(row) else ''
+            yield Payment(date, amount, party, purpose)
+        if columns is None:
+            raise ValueError(f"Keine Spalten für Datum und Betrag gefunden: {path}")
+
+
+def _columns(row: list[str]) -> tuple[int, int, int | None, int | None] | None:
+    # positions of date, amount, party and purpose, if the row is the header
+    names = [cell.strip().strip('"').lower() for cell in row]
+
+    def find(candidates: tuple[str, ...]) -> int | None:
+        for candidate in candidates:
+            if candidate in names:
+                return names.index(candidate)
+        return None
+
+    date, amount = find(DATE_COLUMNS), find(AMOUNT_COLUMNS)
+    if date is None or amount is None:
+        return None
+    return date, amount, find(PARTY_COLUMNS), find(PURPOSE_COLUMNS)
+
+
+class ContractIndex:
+    # finds the contract of a payee by the normalized company and name of the contracts: exact, by all words of the
+    # company being part of the payee, or by similar trigrams (typing errors, abbreviations)
+    max_candidates = 50
+
+    def __init__(self, contracts: Iterable[tuple[int, str, str]]):
+        self._exact: dict[str, set[int]] = defaultdict(set)
+        self._words: dict[str, set[int]] = defaultdict(set)
+        self._trigrams: dict[str, set[int]] = defaultdict(set)
+        self._keys: dict[int, list[tuple[str, set[str]]]] = defaultdict(list)
+        for contract_id, name, company in contracts:
+            for key in {normalize(company), normalize(name)} - {''}:
+                self._exact[key].add(contract_id)
+                for word in key.split():
+                    self._words[word].add(contract_id)
+                grams = _trigrams(key)
+                for gram in grams:
+                    self._trigrams[gram].add(contract_id)
+                self._keys[contract_id].append((key, grams))
+
+    def match(self, party: str) -> dict[int, float]:
+        # candidate contracts with their score between MIN_SCORE and 1
+        key = normalize(party)
+        if not key:
+            return {}
+        if key in self._exact:
+            return dict.fromkeys(self._exact[key], 1.0)
+        words = set(key.split())
+        grams = _trigrams(key)
+        # only the contracts sharing the most trigrams or words are compared, common ones are shared by thousands
+        by_grams = Counter(contract_id for gram in grams for contract_id in self._trigrams.get(gram, ()))
+        by_words = Counter(contract_id for word in words for contract_id in self._words.get(word, ()))
+        candidates = {contract_id for contract_id, _ in by_grams.most_common(self.max_candidates)}
+        candidates.update(contract_id for contract_id, _ in by_words.most_common(self.max_candidates))
+        scores = {}
+        for contract_id in candidates:
+            score = 0.0
+            for contract_key, contract_grams in self._keys[contract_id]:
+                if set(contract_key.split()) <= words:
+                    score = max(score, 0.9)
+                score = max(score, 2 * len(grams & contract_grams) / (len(grams) + len(contract_grams)))
+            if score >= MIN_SCORE:
+                scores[contract_id] = score
+        return scores
+
+
+def detect_interval(dates: list[datetime.date], known: int | None = None) -> int | None:
+    # the interval of regular payments, None if they are not regular; the known interval (e.g. of the pricing,
+    # a month may be stored as 28 or 31 days) is kept as long as the payments fit it
+    gaps = [(later - earlier).days for earlier, later in zip(dates, dates[1:])]
+    if not gaps or (len(gaps) < 2 and gaps[0] < 300):
+        # yearly payments are found with two payments, all others need at least three
+        return None
+    median = statistics.median(gaps)
+    if known is not None and _fits(gaps, median, known):
+        return known
+    interval = min(INTERVALS, key=lambda days: abs(days - median) / days)
+    return interval if _fits(gaps, median, interval) else None
+
+
+def _fits(gaps: list[int], median: float, interval: int) -> bool:
+    if interval <= 0 or abs(interval - median) > interval * 0.2:
+        return False
+    regular = sum(1 for gap in gaps if abs(gap - interval) <= interval * 0.25)
+    return regular >= len(gaps) * 0.75
+
+
+def recurring_payments(payments: Iterable[Payment]) -> list[tuple[str, list[tuple[datetime.date, decimal.Decimal]]]]:
+    # outgoing payments grouped by payee in one pass over the statements, only the regular groups are kept;
+    # a payee paid irregularly or several times a day is split up by amount, e.g. for several contracts with
+    # the same company
+    groups: dict[str, list[tuple[datetime.date, decimal.Decimal]]] = defaultdict(list)
+    names: dict[str, str] = {}
+    for payment in payments:
+        if payment.amount >= 0:
+            continue
+        key = normalize(payment.party)
+        if key:
+            groups[key].append((payment.date, -payment.amount))
+            names.setdefault(key, payment.party)
+
+    recurring = []
+    for key, group in groups.items():
+        group.sort()
+        dates = sorted({date for date, _ in group})
+        if len(dates) == len(group) and detect_interval(dates) is not None:
+            recurring.append((names[key], group))
+            continue
+        by_amount = defaultdict(list)
+        for date, amount in group:
+            by_amount[amount].append((date, amount))
+        # at least three payments, two equal amounts a year apart are a coincidence among the irregular ones
+        recurring.extend((names[key], subgroup) for subgroup in by_amount.values()
+                         if len(subgroup) > 2 and detect_interval([date for date, _ in subgroup]) is not None)
+    return recurring
+
+
+def propose(paths: Iterable[str]) -> list[Proposal]:
+    # read all statements and propose pricings for the recurring payments; runs in a reader thread
+    payments = (payment for path in paths for payment in read_statement(path))
+    end = datetime.date.min
+
+    def tracked() -> Iterator[Payment]:
+        nonlocal end
+        for payment in payments:
+            end = max(end, payment.date)
+            yield payment
+
+    recurring = recurring_payments(tracked())
+    contracts = {}
+    index = ContractIndex((contract_id, contracts.setdefault(contract_id, name), company) for contract_id, name, company
+                          in Contract.select(Contract.id, Contract.name, Contract.company).tuples())
+    matches = [(party, group, index.match(party)) for party, group in recurring]
+    # only the pricings of matched contracts are loaded
+    pricings = defaultdict(list)
+    for chunk in chunked(list({contract_id for _, _, scores in matches for contract_id in scores}), 500):
+        for pricing in ContractPricing.select().where(ContractPricing.contract.in_(chunk)) \
+                .order_by(ContractPricing.start_date):
+            pricings[pricing.contract_id].append(pricing)
+
+    def active(contract_id: int, date: datetime.date) -> ContractPricing | None:
+        candidates = [pricing for pricing in pricings[contract_id] if pricing.start_date <= date
+                      and (pricing.end_date is None or pricing.end_date >= date)]
+        return candidates[-1] if candidates else None
+
+    runs = []
+    for party, group, scores in matches:
+        price = group[-1][1].quantize(decimal.Decimal('0.01'))
+        last = group[-1][0]
+        # the matching contracts, best first, the one with the most similar price among equally good ones
+        ranked = []
+        for contract_id, score in scores.items():
+            pricing = active(contract_id, last)
+            ranked.append((-score, abs(pricing.price - price) if pricing is not None else price, contract_id))
+        ranked.sort()
+        runs.append((ranked[0][:2] if ranked else (0, 0), party, group, price, last, ranked))
+
+    # payments of one payee split up by amount may match the same contract, every contract goes to the payments
+    # matching it best, so that the proposals never change a pricing twice
+    taken = set()
+    proposals = []
+    for _, party, group, price, last, ranked in sorted(runs, key=lambda run: run[0]):
+        dates = [date for date, _ in group]
+        interval = detect_interval(dates)
+        # the current amount is paid since the first payment of the last run of equal amounts
+        since = dates[-1]
+        for date, amount in reversed(group):
+            if amount.quantize(decimal.Decimal('0.01')) != price:
+                break
+            since = date
+
+        stopped = last + datetime.timedelta(days=interval * 3 // 2) < end
+        candidates = [contract_id for _, _, contract_id in ranked if contract_id not in taken]
+        if not candidates:
+            if not stopped:
+                proposals.append(Proposal(None, None, "", party, len(group), interval, price, since, last,
+                                          None, None, None))
+            continue
+        contract_id = candidates[0]
+        taken.add(contract_id)
+        pricing = active(contract_id, last)
+        if pricing is not None:
+            interval = detect_interval(dates, pricing.payment_interval_days)
+        if pricing is None:
+            action = None if stopped else 'new'
+        elif stopped:
+            action = 'end' if pricing.end_date is None else None
+        elif pricing.price.quantize(decimal.Decimal('0.01')) != price or pricing.payment_interval_days != interval:
+            action = 'change'
+        else:
+            # up to date
+            continue
+        if action is None:
+            continue
+        proposals.append(Proposal(action, contract_id, contracts[contract_id], party, len(group), interval, price,
+                                  since, last, pricing and pricing.id, pricing and pricing.price,
+                                  pricing and pricing.payment_interval_days))
+    proposals.sort(key=lambda proposal: (proposal.action is None, proposal.contract_name, proposal.party))
+    return proposals
+
+
+def apply_proposals(proposals: list[Proposal]) -> int:
+    # write the accepted proposals, all in the transaction of the calling write; returns their number
+    contract_ids = [proposal.contract_id for proposal in proposals]
+    if len(set(contract_ids)) < len(contract_ids):
+        # they would end the same pricing twice and overlap each other
+        raise ValueError("Mehrere Vorschläge für denselben Vertrag")
+    for proposal in proposals:
+        if proposal.action == 'new':
+            ContractPricing(contract=proposal.contract_id, price=proposal.price,
+                            payment_interval_days=proposal.interval, start_date=proposal.since).save()
+            continue
+        pricing = ContractPricing.get_by_id(proposal.pricing_id)
+        if proposal.action == 'end':
+            # paid until the end of the last interval
+            pricing.end_date = proposal.last + datetime.timedelta(days=proposal.interval - 1)
+            pricing.save()
+        elif pricing.start_date >= proposal.since:
+            pricing.price, pricing.payment_interval_days = proposal.price, proposal.interval
+            pricing.save()
+        else:
+            pricing.end_date = proposal.since - datetime.timedelta(days=1)
+            pricing.save()
+            ContractPricing(contract=proposal.contract_id, price=proposal.price,
+                            payment_interval_days=proposal.interval, start_date=proposal.since).save()
+    return len(proposals)
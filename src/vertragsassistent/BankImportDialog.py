@@ -0,0 +1,86 @@
+from PySide6.QtWidgets import *
+from PySide6 import QtCore
+from Data import *
+from BankImport import Proposal, propose, apply_proposals
+from Executor import executor
+
+ACTIONS = {'new': "neuer Preis", 'change': "Preis ändern", 'end': "Preis beenden", None: "kein Vertrag"}
+
+
+class BankImportDialog(QDialog):
+    def __init__(self, paths: list[str], /):
+        super().__init__()
+        self._proposals: list[Proposal] = []
+        self.setWindowTitle("Kontoauszug importieren")
+        self.setMinimumSize(900, 500)
+        layout = QGridLayout(self)
+        self.setLayout(layout)
+
+        self._table_proposals = QTableWidget(0, 0)
+        self._table_proposals.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self._table_proposals.itemChanged.connect(self.update_summary)
+        layout.addWidget(self._table_proposals, 0, 0, 1, 2)
+        self._label_summary = QLabel(f"{len(paths)} Kontoauszüge werden gelesen...")
+        layout.addWidget(self._label_summary, 1, 0)
+        self._btn_apply = QPushButton("Übernehmen")
+        self._btn_apply.setDefault(True)
+        self._btn_apply.setEnabled(False)
+        self._btn_apply.clicked.connect(self.accept)
+        layout.addWidget(self._btn_apply, 1, 1)
+
+        def load() -> list[Proposal] | str:
+            try:
+                return propose(paths)
+            except (OSError, ValueError) as e:
+                return str(e)
+
+        executor().read(load, self.show_proposals, context=self)
+
+    def show_proposals(self, proposals: list[Proposal] | str):
+        if isinstance(proposals, str):
+            self._label_summary.setText(f"Fehler: {proposals}")
+            return
+        self._proposals = proposals
+        table = self._table_proposals
+        table.blockSignals(True)
+        table.setColumnCount(8)
+        table.setHorizontalHeaderLabels(["Vertrag", "Empfänger", "Zahlungen", "Intervall (Tage)", "Betrag",
+                                         "Bisher", "Vorschlag", "Ab"])
+        table.setRowCount(len(proposals))
+        for row, proposal in enumerate(proposals):
+            previous = f"{proposal.old_price:.2f} € / {proposal.old_interval}" if proposal.pricing_id else ""
+            date = proposal.last if proposal.action == 'end' else proposal.since
+            values = (proposal.contract_name, proposal.party, str(proposal.payments), str(proposal.interval),
+                      f"{proposal.price:.2f} €", previous, ACTIONS[proposal.action], date.strftime('%d.%m.%Y'))
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column == 0:
+                    # payments without contract are only listed, e.g. to add the contract by hand
+                    if proposal.action is None:
+                        item.setFlags(item.flags() & ~QtCore.Qt.ItemFlag.ItemIsUserCheckable)
+                    else:
+                        item.setCheckState(QtCore.Qt.CheckState.Checked)
+                table.setItem(row, column, item)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        table.blockSignals(False)
+        self.update_summary()
+
+    def _selected(self) -> list[Proposal]:
+        return [proposal for row, proposal in enumerate(self._proposals) if proposal.action is not None
+                and self._table_proposals.item(row, 0).checkState() == QtCore.Qt.CheckState.Checked]
+
+    @QtCore.Slot()
+    def update_summary(self):
+        selected = len(self._selected())
+        unmatched = sum(1 for proposal in self._proposals if proposal.action is None)
+        self._label_summary.setText(f"{len(self._proposals)} regelmäßige Zahlungen, davon {unmatched} ohne Vertrag; "
+                                    f"{selected} Änderungen ausgewählt")
+        self._btn_apply.setEnabled(selected > 0)
+
+    @QtCore.Slot()
+    def accept(self):
+        # all accepted proposals are written in one transaction, the views update themselves from the changes
+        selected = self._selected()
+        executor().write(lambda: apply_proposals(selected))
+        super().accept()
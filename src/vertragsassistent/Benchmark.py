@@ -0,0 +1,159 @@
+import os
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import argparse
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from PySide6 import QtCore, QtWidgets
+from Data import *
+from Generator import generate
+from Executor import executor
+
+ROLES = [QtCore.Qt.ItemDataRole.DisplayRole, QtCore.Qt.ItemDataRole.EditRole, QtCore.Qt.ItemDataRole.UserRole,
+         QtCore.Qt.ItemDataRole.CheckStateRole, QtCore.Qt.ItemDataRole.ForegroundRole,
+         QtCore.Qt.ItemDataRole.BackgroundRole]
+
+
+def wait_for(signals: list[QtCore.SignalInstance], trigger, timeout: int = 60000):
+    # run trigger and process events until all signals were emitted
+    loop = QtCore.QEventLoop()
+    outstanding = set(range(len(signals)))
+
+    def emitted(number: int):
+        outstanding.discard(number)
+        if not outstanding:
+            loop.quit()
+
+    slots = [lambda *_, n=number: emitted(n) for number in range(len(signals))]
+    for signal, slot in zip(signals, slots):
+        signal.connect(slot)
+    QtCore.QTimer.singleShot(timeout, loop.quit)
+    trigger()
+    if outstanding:
+        loop.exec()
+    for signal, slot in zip(signals, slots):
+        signal.disconnect(slot)
+
+
+def paint(model: QtCore.QAbstractItemModel):
+    # request everything a view would request for all cells
+    columns = 1 if isinstance(model, QtCore.QAbstractListModel) else model.columnCount(QtCore.QModelIndex())
+    for row in range(model.rowCount(QtCore.QModelIndex())):
+        for column in range(columns):
+            index = model.index(row, column)
+            for role in ROLES:
+                model.data(index, role)
+
+
+def measure(func, runs: int) -> dict:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return {'best_ms': round(min(times), 3), 'median_ms': round(statistics.median(times), 3), 'runs': runs}
+
+
+def startup(filename: str, runs: int) -> dict:
+    # cold starts in fresh interpreters: imports, first paint and complete contract list, as median of the runs
+    probe = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'StartupProbe.py')
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, probe, filename], capture_output=True, text=True, check=True).stdout
+        samples.append({**json.loads(output), 'process_ms': (time.perf_counter() - start) * 1000})
+    return {name: round(statistics.median(sample[name] for sample in samples), 1) for name in samples[0]}
+
+
+def run(filename: str, runs: int) -> dict:
+    import MainWindow
+    import ContractDialog
+    from TagListView import TagListModel
+
+    window = MainWindow.MainWindow(filename)
+    contracts = window._table_contracts_model
+    tags = list(ContractTag.select().order_by(ContractTag.name).limit(3))
+    contract = Contract.select().order_by(Contract.id).first()
+    results = {}
+
+    def refresh(tag_list: list[ContractTag], match_any: bool):
+        window._tag_list = tag_list
+        window._radio_tag_sort_or.setChecked(match_any)
+        window._radio_tag_sort_and.setChecked(not match_any)
+        wait_for([contracts.modelReset], window.refresh)
+
+    results['refresh'] = measure(lambda: refresh([], False), runs)
+    results['filter_and'] = measure(lambda: refresh(tags, False), runs)
+    results['filter_or'] = measure(lambda: refresh(tags, True), runs)
+
+    refresh([], False)
+    contracts.fetch_all()
+    results['paint_contracts'] = measure(lambda: paint(contracts), runs)
+
+    for name, bound in (('paint_tags', None), ('paint_contract_tags', contract)):
+        model = TagListModel(bound)
+        wait_for([model.modelReset], lambda: None)
+        results[name] = measure(lambda: paint(model), runs)
+
+    def open_dialog():
+        dialog = ContractDialog.ContractDialog(contract)
+        wait_for([dialog._tag_list.model().modelReset, dialog._table_pricing_model.modelReset,
+                  dialog._table_docs_model.modelReset], lambda: None)
+        return dialog
+
+    results['open_dialog'] = measure(open_dialog, runs)
+    dialog = open_dialog()
+    results['paint_pricings'] = measure(lambda: paint(dialog._table_pricing_model), runs)
+    results['paint_documents'] = measure(lambda: paint(dialog._table_docs_model), runs)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Misst die Laufzeit von Datenzugriff und Qt Modellen")
+    parser.add_argument('--file', help="vorhandene Datenbank statt einer erzeugten verwenden")
+    parser.add_argument('--output', help="Ergebnisse als JSON in diese Datei schreiben")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--contracts', type=int, default=10000)
+    parser.add_argument('--pricings', type=int, default=10)
+    parser.add_argument('--tags', type=int, default=30)
+    parser.add_argument('--tag-density', type=float, default=0.1)
+    parser.add_argument('--documents', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--startup-budget', type=float,
+                        help="Fehler, wenn der Start bis zur ersten Darstellung im Median länger dauert (ms)")
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication([])
+    parameters = {'runs': args.runs}
+    with tempfile.TemporaryDirectory() as directory:
+        filename = args.file
+        if filename is None:
+            filename = os.path.join(directory, 'benchmark.db')
+            parameters.update(contracts=args.contracts, pricings=args.pricings, tags=args.tags,
+                              tag_density=args.tag_density, documents=args.documents, seed=args.seed)
+            generate(filename, args.contracts, args.pricings, args.tags, args.tag_density, args.documents, args.seed)
+        else:
+            open_database(filename)
+            parameters.update(file=filename)
+        db.close_all()
+        results = {'startup': startup(filename, args.runs)}
+        results.update(run(filename, args.runs))
+        executor().wait()
+        db.close_all()
+
+    report = json.dumps({'parameters': parameters, 'python': platform.python_version(),
+                         'sqlite': sqlite3.sqlite_version, 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    else:
+        print(report)
+    if args.startup_budget is not None and results['startup']['first_paint_ms'] > args.startup_budget:
+        sys.exit(f"Start bis zur ersten Darstellung {results['startup']['first_paint_ms']} ms, "
+                 f"erlaubt sind {args.startup_budget} ms")
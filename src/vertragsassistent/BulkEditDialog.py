@@ -0,0 +1,120 @@
+from PySide6.QtWidgets import *
+from PySide6 import QtCore
+import decimal
+from Data import *
+from Executor import executor
+
+
+class BulkEditDialog(QDialog):
+    def __init__(self, contract_ids: list[int], /):
+        super().__init__()
+        self._contract_ids = contract_ids
+        self._tags: list[ContractTag] = []
+        self.setWindowTitle(f"Sammelbearbeitung ({len(contract_ids)} Verträge)")
+        self.setMinimumSize(600, 500)
+        layout = QGridLayout(self)
+        self.setLayout(layout)
+
+        self._tabs = QTabWidget()
+        layout.addWidget(self._tabs, 0, 0, 1, 2)
+
+        # new pricing from a date on, changed by a percentage
+        tab_prices = QWidget()
+        tab_prices_layout = QGridLayout(tab_prices)
+        self._tabs.addTab(tab_prices, "Preise")
+        tab_prices_layout.addWidget(QLabel("Gültig ab:"), 0, 0)
+        self._input_date = QDateEdit(date=datetime.date.today(), calendarPopup=True)
+        self._input_date.dateChanged.connect(self.update_preview)
+        tab_prices_layout.addWidget(self._input_date, 0, 1)
+        tab_prices_layout.addWidget(QLabel("Änderung:"), 1, 0)
+        self._input_percent = QDoubleSpinBox(minimum=-100, maximum=1000, decimals=2, suffix=" %")
+        self._input_percent.valueChanged.connect(self.update_preview)
+        tab_prices_layout.addWidget(self._input_percent, 1, 1)
+        tab_prices_layout.addWidget(QLabel("Der bisherige Preis endet am Vortag, Verträge ohne gültigen Preis "
+                                           "bleiben unverändert."), 2, 0, 1, 2)
+
+        # add or remove a tag
+        tab_tags = QWidget()
+        tab_tags_layout = QGridLayout(tab_tags)
+        self._tabs.addTab(tab_tags, "Tags")
+        tab_tags_layout.addWidget(QLabel("Tag:"), 0, 0)
+        self._input_tag = QComboBox()
+        self._input_tag.currentIndexChanged.connect(self.update_preview)
+        tab_tags_layout.addWidget(self._input_tag, 0, 1, 1, 2)
+        self._radio_add = QRadioButton("Hinzufügen", checked=True)
+        self._radio_add.toggled.connect(self.update_preview)
+        tab_tags_layout.addWidget(self._radio_add, 1, 1)
+        tab_tags_layout.addWidget(QRadioButton("Entfernen"), 1, 2)
+
+        # affected contracts
+        self._table_preview = QTableWidget(0, 0)
+        self._table_preview.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self._table_preview, 1, 0, 1, 2)
+        self._label_summary = QLabel()
+        layout.addWidget(self._label_summary, 2, 0)
+        self._btn_apply = QPushButton("Ausführen")
+        self._btn_apply.setDefault(True)
+        self._btn_apply.clicked.connect(self.accept)
+        layout.addWidget(self._btn_apply, 2, 1)
+
+        self._tabs.currentChanged.connect(self.update_preview)
+        executor().read(lambda: list(ContractTag.select().order_by(ContractTag.name)), self.set_tags, context=self)
+        self.update_preview()
+
+    def set_tags(self, tags: list[ContractTag]):
+        self._tags = tags
+        self._input_tag.addItems([tag.name for tag in tags])
+
+    @property
+    def _editing_prices(self) -> bool:
+        return self._tabs.currentIndex() == 0
+
+    @QtCore.Slot()
+    def update_preview(self):
+        # the preview follows every edit, only the latest one is shown
+        ids = self._contract_ids
+        if self._editing_prices:
+            date, percent = self._input_date.date().toPython(), self._input_percent.value()
+            executor().read(lambda: price_change_preview(ids, date, percent), self.show_price_preview,
+                            key=self, context=self)
+        elif self._input_tag.currentIndex() >= 0:
+            tag = self._tags[self._input_tag.currentIndex()]
+            executor().read(lambda: tag_change_preview(ids, tag), self.show_tag_preview, key=self, context=self)
+        else:
+            self._fill([], [], 0)
+
+    def show_price_preview(self, rows: list[tuple]):
+        changed = len(rows) if self._input_percent.value() != 0 else 0
+        self._fill(["Vertrag", "Anbieter", "Intervall (Tage)", "Preis", "Neuer Preis"],
+                   [(name, company, str(interval), f"{price:.2f} €", f"{decimal.Decimal(new_price):.2f} €")
+                    for _, name, company, interval, price, new_price in rows], changed)
+
+    def show_tag_preview(self, rows: list[tuple]):
+        add = self._radio_add.isChecked()
+        self._fill(["Vertrag", "Anbieter", "Änderung"],
+                   [(name, company, "-" if tagged == add else "hinzufügen" if add else "entfernen")
+                    for _, name, company, tagged in rows], sum(1 for row in rows if row[3] != add))
+
+    def _fill(self, headers: list[str], rows: list[tuple], changed: int):
+        self._table_preview.clear()
+        self._table_preview.setColumnCount(len(headers))
+        self._table_preview.setHorizontalHeaderLabels(headers)
+        self._table_preview.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                self._table_preview.setItem(row, column, QTableWidgetItem(value))
+        self._table_preview.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self._label_summary.setText(f"{changed} von {len(self._contract_ids)} Verträgen werden geändert")
+        self._btn_apply.setEnabled(changed > 0)
+
+    @QtCore.Slot()
+    def accept(self):
+        # all contracts are changed in one transaction, the views update themselves from the changes
+        ids = self._contract_ids
+        if self._editing_prices:
+            date, percent = self._input_date.date().toPython(), self._input_percent.value()
+            executor().write(lambda: change_prices(ids, date, percent))
+        else:
+            tag, add = self._tags[self._input_tag.currentIndex()], self._radio_add.isChecked()
+            executor().write(lambda: change_tags(ids, tag, add))
+        super().accept()
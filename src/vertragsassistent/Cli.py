@@ -0,0 +1,165 @@
+import argparse
+import decimal
+import os
+from Data import *
+
+
+def report(filename: str, args: argparse.Namespace):
+    today = datetime.date.today()
+    contracts = {}
+    total_price_month = decimal.Decimal(0)
+    total_price_year = decimal.Decimal(0)
+    # the file is opened read only, the cached pricings may be outdated
+    for contract_id, price, interval in contract_overview(today)\
+            .select(Contract.id, ContractPricing.price, ContractPricing.payment_interval_days).tuples():
+        per_month, per_year = costs(price, interval)
+        contracts[contract_id] = (decimal.Decimal(per_month), decimal.Decimal(per_year))
+        total_price_month += contracts[contract_id][0]
+        total_price_year += contracts[contract_id][1]
+
+    print(f"{filename}: {len(contracts)} Verträge")
+    print(f"Preis / Monat: {round(total_price_month, 2)} €")
+    print(f"Preis / Jahr: {round(total_price_year, 2)} €")
+    from Projection import CostProjection
+    costs_year = CostProjection.load().total(datetime.date(today.year, 1, 1), datetime.date(today.year, 12, 31))
+    print(f"Kosten {today.year}: {costs_year:.2f} €")
+
+    # sum up per tag, contracts with several tags count for each of them
+    through = ContractTag.contracts.get_through_model()
+    tags = {tag_id: [name, 0, decimal.Decimal(0), decimal.Decimal(0)]
+            for tag_id, name in ContractTag.select(ContractTag.id, ContractTag.name).tuples()}
+    # links of deleted contracts may be left in older files
+    for tag_id, contract_id in through.select(through.contracttag, through.contract)\
+            .join(Contract, on=(Contract.id == through.contract)).tuples():
+        tag = tags[tag_id]
+        tag[1] += 1
+        tag[2] += contracts[contract_id][0]
+        tag[3] += contracts[contract_id][1]
+    for name, count, per_month, per_year in sorted(tags.values()):
+        print(f"  {name}: {round(per_month, 2)} € / Monat, {round(per_year, 2)} € / Jahr ({count} Verträge)")
+
+
+def due(filename: str, args: argparse.Namespace):
+    contracts = Contract.select(Contract.name, Contract.company, Contract.reminder)\
+        .where(Contract.reminder <= datetime.date.today())\
+        .order_by(Contract.reminder, Contract.name)\
+        .tuples()
+    for name, company, reminder in contracts:
+        print(f"{filename}: {reminder} {name} ({company})")
+
+
+def timeline(filename: str, args: argparse.Namespace):
+    from Projection import CostProjection
+    first, last = timeline_range(args)
+    periods, keys, costs = CostProjection.load().costs(first, last, args.unit, 'tag' if args.tags else None)
+    names = dict(ContractTag.select(ContractTag.id, ContractTag.name).tuples())
+    print(f"{filename}: Kosten von {first} bis {last}")
+    for key, row in sorted(zip(keys, costs.tolist()), key=lambda item: names.get(item[0], '')):
+        if key is not None:
+            print(f"  {names[key]}:")
+        for period, value in zip(periods, row):
+            print(f"    {period}: {value:.2f} €")
+
+
+def timeline_range(args: argparse.Namespace) -> tuple[datetime.date, datetime.date]:
+    # by default the current year, with --from only up to the end of its year
+    first = args.first or datetime.date(datetime.date.today().year, 1, 1)
+    return first, args.last or datetime.date(first.year, 12, 31)
+
+
+def export(filename: str, args: argparse.Namespace):
+    from Export import FORMATS, export as export_files
+    tags = list(ContractTag.select().where(ContractTag.name.in_(args.tag))) if args.tag else None
+    if args.tag and len(tags) < len(set(args.tag)):
+        raise SystemExit(f"{filename}: Tag nicht gefunden")
+    prefix = os.path.splitext(os.path.basename(filename))[0] + '_'
+    output = args.output or '.'
+    os.makedirs(output, exist_ok=True)
+    for name, count in export_files(output, prefix, args.format, tags, not args.any).items():
+        print(f"{filename}: {count} Zeilen nach {os.path.join(output, prefix + name + FORMATS[args.format])}")
+
+
+def backup(filename: str, args: argparse.Namespace):
+    from Backup import backup as backup_database
+    # one folder per database, the snapshots are named by their time only
+    directory = os.path.join(args.output, os.path.splitext(os.path.basename(filename))[0]) if args.output else None
+    print(f"{filename}: gesichert nach {backup_database(directory, args.documents, args.keep)}")
+
+
+def workspace(sources: list, args: argparse.Namespace):
+    # all files in one statement per sum, attached to a single connection
+    from Workspace import workspace_tags, workspace_totals
+    print(f"Arbeitsbereich mit {len(sources)} Dateien" + (f", Tags: {', '.join(args.tag)}" if args.tag else ""))
+    # the tags are looked up by name in every file
+    tag_names = {number: args.tag for number in range(len(sources))} if args.tag else None
+    for source, count, per_month, per_year in workspace_totals(sources, tag_names=tag_names, match_all=not args.any):
+        name = "Gesamt" if source is None else sources[source].file
+        print(f"  {name}: {per_month or 0:.2f} € / Monat, {per_year or 0:.2f} € / Jahr ({count} Verträge)")
+    if not args.tag:
+        for source, name, count, per_month, per_year in workspace_tags(sources):
+            print(f"  {name} ({sources[source].file}): {per_month:.2f} € / Monat, {per_year:.2f} € / Jahr "
+                  f"({count} Verträge)")
+
+
+COMMANDS = {'report': report, 'due': due, 'timeline': timeline, 'export': export, 'backup': backup,
+            'workspace': workspace}
+# commands that leave the file as it is, also while the application has it open
+READ_ONLY = {'report', 'due', 'timeline', 'export'}
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog='vertragsassistent',
+                                     description="Auswertungen ohne grafische Oberfläche")
+    parser.add_argument('command', choices=COMMANDS,
+                        help="report: Summen gesamt und je Tag, due: fällige Erinnerungen, "
+                             "timeline: Kostenverlauf nach allen Preisen, export: alle Daten als CSV oder JSON Lines, "
+                             "backup: Sicherung im laufenden Betrieb, workspace: Summen über alle Dateien zusammen")
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--from', dest='first', type=datetime.date.fromisoformat,
+                        help="timeline: erster Tag (JJJJ-MM-TT), Standard: Anfang des laufenden Jahres")
+    parser.add_argument('--to', dest='last', type=datetime.date.fromisoformat,
+                        help="timeline: letzter Tag (JJJJ-MM-TT), Standard: Ende des Jahres von --from")
+    parser.add_argument('--unit', choices=('day', 'month', 'year'), default='month', help="timeline: Zeitraum")
+    parser.add_argument('--tags', action='store_true', help="timeline: je Tag aufschlüsseln")
+    parser.add_argument('--output', help="export: Zielordner (Standard: aktueller Ordner), "
+                                         "backup: Ordner der Sicherungen (Standard: <datei>.sicherungen)")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), default='csv', help="export: Dateiformat")
+    parser.add_argument('--tag', action='append',
+                        help="export, workspace: nur Verträge mit diesem Tag, mehrfach möglich")
+    parser.add_argument('--any', action='store_true', help="export, workspace: einer der Tags genügt (ODER)")
+    parser.add_argument('--keep', type=int, default=10, help="backup: Anzahl der aufbewahrten Sicherungen")
+    parser.add_argument('--documents', action='store_true', help="backup: geänderte Dokumente mit archivieren")
+    args = parser.parse_args(argv)
+
+    if args.command == 'timeline':
+        first, last = timeline_range(args)
+        if first > last:
+            parser.error(f"--from ({first}) liegt nach --to ({last})")
+    profile = os.environ.get('VERTRAGSASSISTENT_PRAGMAS', 'default')
+    for filename in args.files:
+        if not os.path.isfile(filename):
+            parser.error(f"Datei nicht gefunden: {filename}")
+    if args.command == 'workspace':
+        from Workspace import close_workspace, open_workspace
+        try:
+            sources = open_workspace(args.files, profile)
+        except ValueError as e:
+            parser.error(str(e))
+        try:
+            workspace(sources, args)
+        finally:
+            close_workspace(sources)
+        return 0
+    for filename in args.files:
+        if args.command in READ_ONLY:
+            try:
+                open_database_read_only(filename, profile)
+            except ValueError as e:
+                parser.error(str(e))
+        else:
+            open_database(filename, profile=profile)
+        try:
+            COMMANDS[args.command](filename, args)
+        finally:
+            db.close_all()
+    return 0
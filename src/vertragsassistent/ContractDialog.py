@@ -4,8 +4,10 @@ import decimal
 from Data import *
 from TagListView import TagListView
 import DocumentDialog
-import subprocess
-import platform
+from FileStatus import file_status
+from DocumentStore import document_store, folder_files
+from Preview import previews, PREVIEW_SIZE, THUMBNAIL_SIZE
+from Executor import executor
 import os
 
 
@@ -117,7 +119,16 @@ class ContractDialog(QDialog):
         self._table_docs = QTableView(self)
         self._table_docs.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
         self._table_docs.doubleClicked.connect(self.open_doc)
-        layout_docs.addWidget(self._table_docs, 0, 0, 1, 3)
+        self._table_docs.setIconSize(QtCore.QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self._table_docs.verticalHeader().setDefaultSectionSize(THUMBNAIL_SIZE + 4)
+        layout_docs.addWidget(self._table_docs, 0, 0, 1, 4)
+
+        # preview of the selected document, rendered in the background
+        self._label_preview = QLabel()
+        self._label_preview.setFixedWidth(PREVIEW_SIZE)
+        self._label_preview.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        layout_docs.addWidget(self._label_preview, 0, 4)
+        previews().ready.connect(self.preview_ready)
 
         btn_add_doc = QPushButton("Neues Dokument")
         btn_add_doc.clicked.connect(self.new_doc)
@@ -128,6 +139,9 @@ class ContractDialog(QDialog):
         btn_del_doc = QPushButton("Dokument Löschen")
         btn_del_doc.clicked.connect(self.delete_doc)
         layout_docs.addWidget(btn_del_doc, 1, 2)
+        btn_import_docs = QPushButton("Ordner importieren")
+        btn_import_docs.clicked.connect(self.import_docs)
+        layout_docs.addWidget(btn_import_docs, 1, 3)
 
         self.contract_changed()
 
@@ -147,7 +161,9 @@ class ContractDialog(QDialog):
 
             self._table_docs_model = DocumentModel(self._contract)
             self._table_docs.setModel(self._table_docs_model)
-            self._table_docs.horizontalHeader().setStretchLastSection(True)
+            self._table_docs.horizontalHeader().setSectionResizeMode(DocumentModel.col_description,
+                                                                     QHeaderView.ResizeMode.Stretch)
+            self._table_docs.selectionModel().currentRowChanged.connect(self.show_preview)
 
     @QtCore.Slot()
     def save_contract(self):
@@ -157,21 +173,25 @@ class ContractDialog(QDialog):
             self._contract = Contract()
             changed = True
 
-        self._contract.name = self._input_name.text()
-        self._contract.company = self._input_company.text()
-        self._contract.notes = self._input_notes.toPlainText()
-        self._contract.reminder = None if not self._input_reminder.isEnabled()\
-            else self._input_reminder.date().toPython()
-        self._contract.save()
+        values = (self._input_name.text(), self._input_company.text(), self._input_notes.toPlainText(),
+                  None if not self._input_reminder.isEnabled() else self._input_reminder.date().toPython())
+        if not changed and values == (self._contract.name, self._contract.company, self._contract.notes,
+                                      self._contract.reminder):
+            # nothing to save
+            return
+        self._contract.name, self._contract.company, self._contract.notes, self._contract.reminder = values
         if changed:
-            self.contract_changed()
+            # the new contract can only be referenced once it got its id
+            executor().write(self._contract.save, lambda _: self.contract_changed(), context=self)
+        else:
+            executor().write(self._contract.save)
 
     @QtCore.Slot()
     def delete_contract(self):
         if QMessageBox.question(self, "Vertrag löschen", "Wirklich Vertrag löschen?")\
                 != QMessageBox.StandardButton.Yes:
             return
-        self._contract.delete_instance()
+        executor().write(self._contract.delete_instance)
         self.accept()
 
     @QtCore.Slot()
@@ -184,10 +204,8 @@ class ContractDialog(QDialog):
         pricing.end_date = None
         pricing.price = 10
         pricing.payment_interval_days = 365
-        pricing.save()
-
-        # inform the view about some change
-        self._table_pricing_model.reload()
+        # the model inserts the pricing once it got saved
+        executor().write(pricing.save)
 
     @QtCore.Slot()
     def delete_pricing(self):
@@ -202,7 +220,6 @@ class ContractDialog(QDialog):
     @QtCore.Slot()
     def new_doc(self):
         DocumentDialog.DocumentDialog(self._contract, None).exec()
-        self._table_docs_model.reload()
 
     @QtCore.Slot()
     def edit_doc(self):
@@ -211,7 +228,6 @@ class ContractDialog(QDialog):
             return
         doc = self._table_docs_model.get_row_item(idx.row())
         DocumentDialog.DocumentDialog(self._contract, doc).exec()
-        self._table_docs_model.reload()
 
     @QtCore.Slot()
     def delete_doc(self):
@@ -223,17 +239,67 @@ class ContractDialog(QDialog):
             return
         self._table_docs_model.removeRow(self._table_docs.currentIndex().row())
 
+    @QtCore.Slot()
+    def import_docs(self):
+        folder = QFileDialog.getExistingDirectory(self, "Ordner importieren", os.path.dirname(db.database))
+        if len(folder) == 0:
+            return
+        files = folder_files(folder)
+        if not files:
+            QMessageBox.information(self, "Ordner importieren", "Der Ordner enthält keine Dateien.")
+            return
+        answer = QMessageBox.question(
+            self, "Ordner importieren", f"{len(files)} Dateien in der Dokumentenablage speichern?\n"
+            "Ohne Kopie werden die Dateien an ihrem Ort verknüpft.",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No | QMessageBox.StandardButton.Cancel)
+        if answer == QMessageBox.StandardButton.Cancel:
+            return
+
+        # files are hashed in the background, identical contents are attached only once
+        progress = QProgressDialog("Dateien werden eingelesen...", "Abbrechen", 0, len(files), self)
+        progress.setWindowModality(QtCore.Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(500)
+
+        def imported(count: int):
+            progress.canceled.disconnect(cancel)
+            progress.close()
+            progress.deleteLater()
+            QMessageBox.information(self, "Ordner importieren", f"{count} von {len(files)} Dateien importiert.")
+
+        ticket = document_store().import_files(self._contract, files, imported,
+                                               copy=answer == QMessageBox.StandardButton.Yes,
+                                               progress=progress.setValue)
+
+        def cancel():
+            # only this import, documents attached meanwhile are hashed on
+            document_store().cancel(ticket)
+
+        progress.canceled.connect(cancel)
+
     @QtCore.Slot()
     def open_doc(self, idx: QtCore.QModelIndex):
         if not idx.isValid():
             return
+        # the viewer is started detached, the dialog stays responsive
         path = self._table_docs_model.get_row_item(idx.row()).absolute_file
-        if platform.system() == 'Windows':
-            os.startfile(path)
-        elif platform.system() == 'Darwin':
-            subprocess.run(['open', path])
+        QtGui.QDesktopServices.openUrl(QtCore.QUrl.fromLocalFile(path))
+
+    @QtCore.Slot()
+    def show_preview(self):
+        idx = self._table_docs.currentIndex()
+        image = None
+        if idx.isValid():
+            image = previews().preview(self._table_docs_model.get_row_file(idx.row()))
+        if image is None:
+            self._label_preview.clear()
         else:
-            subprocess.run(['xdg-open', path])
+            self._label_preview.setPixmap(QtGui.QPixmap.fromImage(image))
+
+    @QtCore.Slot(str)
+    def preview_ready(self, path: str):
+        idx = self._table_docs.currentIndex()
+        if idx.isValid() and self._table_docs_model.get_row_file(idx.row()) == path:
+            self.show_preview()
 
 
 class ContractModel(QtCore.QAbstractTableModel):
@@ -244,21 +310,88 @@ class ContractModel(QtCore.QAbstractTableModel):
 
     def __init__(self, contract: Contract, **kwargs):
         super().__init__(**kwargs)
-        self._pricings = None
+        # rows are kept as (pricing, display strings, gap to previous pricing, active)
+        self._rows: list[tuple] = []
         self._contract = contract
+        executor().changed.connect(self.apply_changes)
         self.reload()
 
     def reload(self):
-        self._pricings = ContractPricing.select(ContractPricing)\
+        executor().read(self._load, self._set_rows, key=self, context=self)
+
+    @QtCore.Slot(object)
+    def apply_changes(self, changes: list[Change]):
+        changes = [change for change in changes
+                   if change.model is ContractPricing and change.contract == self._contract.id]
+        deleted = {change.id for change in changes if change.action == 'deleted'}
+        for row in reversed(range(len(self._rows))):
+            if self._rows[row][0].id in deleted:
+                self._remove(row)
+        pricing_ids = list({change.id for change in changes} - deleted)
+        if pricing_ids:
+            executor().read(lambda: list(ContractPricing.select().where(ContractPricing.id.in_(pricing_ids))),
+                            self._patch_rows, context=self)
+
+    def _load(self) -> list[tuple]:
+        pricings = ContractPricing.select(ContractPricing)\
             .where(ContractPricing.contract == self._contract)\
             .order_by(ContractPricing.start_date)
-        self.layoutChanged.emit()
+        return self._snapshot(list(pricings))
+
+    def _set_rows(self, rows: list[tuple]):
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
+
+    def _patch_rows(self, pricings: list[ContractPricing]):
+        items = [row[0] for row in self._rows]
+        for pricing in pricings:
+            positions = [row for row, item in enumerate(items) if item.id == pricing.id]
+            if positions:
+                items[positions[0]] = pricing
+            else:
+                row = sum(1 for item in items if item.start_date <= pricing.start_date)
+                self.beginInsertRows(QtCore.QModelIndex(), row, row)
+                items.insert(row, pricing)
+                self._rows = self._snapshot(items)
+                self.endInsertRows()
+        self._update(items)
+
+    def _remove(self, row: int):
+        self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+        del self._rows[row]
+        self.endRemoveRows()
+        self._update([row[0] for row in self._rows])
+
+    def _update(self, items: list[ContractPricing]):
+        # gaps and order depend on the neighbouring pricings
+        rows = self._snapshot(sorted(items, key=lambda item: item.start_date))
+        if [row[0] for row in rows] != [row[0] for row in self._rows]:
+            self.layoutAboutToBeChanged.emit()
+            self._rows = rows
+            self.layoutChanged.emit()
+        changed = [row for row in range(len(rows)) if rows[row][1:] != self._rows[row][1:]]
+        self._rows = rows
+        if changed:
+            self.dataChanged.emit(self.index(changed[0], 0), self.index(changed[-1], self.columnCount() - 1))
+
+    @staticmethod
+    def _snapshot(pricings: list[ContractPricing]) -> list[tuple]:
+        rows = []
+        for row, item in enumerate(pricings):
+            prev = pricings[row - 1] if row > 0 else None
+            gap = prev is not None\
+                and (prev.end_date is None or (prev.end_date + datetime.timedelta(days=1)) != item.start_date)
+            display = (str(item.start_date), "Keins" if item.end_date is None else str(item.end_date),
+                       f"{item.payment_interval_days} Tage", f"{round(item.price, 2)} €")
+            rows.append((item, display, gap, item.is_active))
+        return rows
 
     def columnCount(self, /, parent: QtCore.QModelIndex | QtCore.QPersistentModelIndex = ...):
         return 4
 
     def rowCount(self, /, parent: QtCore.QModelIndex | QtCore.QPersistentModelIndex = ...):
-        return len(self._pricings)
+        return len(self._rows)
 
     def flags(self, index: QtCore.QModelIndex | QtCore.QPersistentModelIndex, /):
         return QtCore.Qt.ItemFlag.ItemIsEnabled | QtCore.Qt.ItemFlag.ItemIsEditable\
@@ -280,16 +413,9 @@ class ContractModel(QtCore.QAbstractTableModel):
             return section + 1
 
     def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
-        item: ContractPricing = self._pricings[index.row()]
+        item, display, gap, active = self._rows[index.row()]
         if role == QtCore.Qt.ItemDataRole.DisplayRole:
-            if index.column() == self.col_start:
-                return str(item.start_date)
-            if index.column() == self.col_end:
-                return "Keins" if item.end_date is None else str(item.end_date)
-            if index.column() == self.col_interval:
-                return f"{item.payment_interval_days} Tage"
-            if index.column() == self.col_price:
-                return f"{round(item.price, 2)} €"
+            return display[index.column()]
         if role == QtCore.Qt.ItemDataRole.EditRole:
             if index.column() == self.col_start:
                 return QtCore.QDate.fromString(str(item.start_date), 'yyyy-MM-dd')
@@ -299,15 +425,13 @@ class ContractModel(QtCore.QAbstractTableModel):
                 return item.payment_interval_days
             if index.column() == self.col_price:
                 return round(item.price, 2)
-        if role == QtCore.Qt.ItemDataRole.ForegroundRole and index.column() == self.col_start and index.row() > 0:
-            prev: ContractPricing = self._pricings[index.row() - 1]
-            if prev.end_date is None or (prev.end_date + datetime.timedelta(days=1)) != item.start_date:
-                return QtGui.QColor(180, 0, 0)
-        if role == QtCore.Qt.ItemDataRole.ForegroundRole and item.is_active:
+        if role == QtCore.Qt.ItemDataRole.ForegroundRole and index.column() == self.col_start and gap:
+            return QtGui.QColor(180, 0, 0)
+        if role == QtCore.Qt.ItemDataRole.ForegroundRole and active:
             return QtGui.QColor(0, 180, 0)
 
     def setData(self, index: QtCore.QModelIndex | QtCore.QPersistentModelIndex, value, /, role: int = ...) -> bool:
-        item: ContractPricing = self._pricings[index.row()]
+        item: ContractPricing = self._rows[index.row()][0]
         if index.column() == self.col_start:
             item.start_date = value.toPython()
         if index.column() == self.col_end:
@@ -317,42 +441,112 @@ class ContractModel(QtCore.QAbstractTableModel):
             item.payment_interval_days = value
         if index.column() == self.col_price:
             item.price = decimal.Decimal(value)
-        item.save()
+        executor().write(item.save)
 
         # inform about changes
+        self.layoutAboutToBeChanged.emit()
+        self._rows = self._snapshot([row[0] for row in self._rows])
         self.layoutChanged.emit()
         return True
 
     def removeRow(self, row: int, /, parent: QtCore.QModelIndex | QtCore.QPersistentModelIndex = ...) -> bool:
-        self._pricings[row].delete_instance()
-        self.reload()
+        executor().write(self._rows[row][0].delete_instance)
+        self._remove(row)
         return True
 
 
 class DocumentModel(QtCore.QAbstractTableModel):
     col_date = 0
     col_description = 1
+    col_preview = 2
 
     def __init__(self, contract: Contract, **kwargs):
         super().__init__(**kwargs)
-        self._docs = None
+        # rows are kept as (document, display strings, absolute file path)
+        self._rows: list[tuple] = []
         self._contract = contract
+        file_status().status_changed.connect(self.file_status_changed)
+        previews().ready.connect(self.preview_ready)
+        executor().changed.connect(self.apply_changes)
         self.reload()
 
     def reload(self):
-        self._docs = ContractDocument.select(ContractDocument)\
+        executor().read(self._load, self._set_rows, key=self, context=self)
+
+    @QtCore.Slot(object)
+    def apply_changes(self, changes: list[Change]):
+        changes = [change for change in changes
+                   if change.model is ContractDocument and change.contract == self._contract.id]
+        deleted = {change.id for change in changes if change.action == 'deleted'}
+        for row in reversed(range(len(self._rows))):
+            if self._rows[row][0].id in deleted:
+                self._remove(row)
+        doc_ids = list({change.id for change in changes} - deleted)
+        if doc_ids:
+            executor().read(lambda: self._load(doc_ids), self._patch_rows, context=self)
+
+    def _load(self, doc_ids: list[int] | None = None) -> list[tuple]:
+        docs = ContractDocument.select(ContractDocument)\
             .where(ContractDocument.contract == self._contract)\
             .order_by(ContractDocument.date, ContractDocument.description)
+        if doc_ids is not None:
+            docs = docs.where(ContractDocument.id.in_(doc_ids))
+        return [(item, (str(item.date), item.description), os.path.normpath(item.absolute_file)) for item in docs]
+
+    def _set_rows(self, rows: list[tuple]):
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
+
+        # existence of the files is checked in the background and colored when known
+        file_status().request(row[2] for row in self._rows)
+
+    def _patch_rows(self, rows: list[tuple]):
+        positions = {row[0].id: position for position, row in enumerate(self._rows)}
+        for row in rows:
+            position = positions.get(row[0].id)
+            if position is None:
+                self.beginInsertRows(QtCore.QModelIndex(), len(self._rows), len(self._rows))
+                self._rows.append(row)
+                self.endInsertRows()
+            else:
+                self._rows[position] = row
+                self.dataChanged.emit(self.index(position, 0), self.index(position, self.columnCount() - 1))
+        self.layoutAboutToBeChanged.emit()
+        self._rows.sort(key=lambda row: (row[0].date, row[0].description))
         self.layoutChanged.emit()
+        file_status().request(row[2] for row in rows)
+
+    def _remove(self, row: int):
+        self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+        del self._rows[row]
+        self.endRemoveRows()
+
+    @QtCore.Slot(str, bool)
+    def file_status_changed(self, path: str, _: bool):
+        previews().forget(path)
+        for row, (_, _, file) in enumerate(self._rows):
+            if file == path:
+                self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+    @QtCore.Slot(str)
+    def preview_ready(self, path: str):
+        for row, (_, _, file) in enumerate(self._rows):
+            if file == path:
+                self.dataChanged.emit(self.index(row, self.col_preview), self.index(row, self.col_preview),
+                                      [QtCore.Qt.ItemDataRole.DecorationRole])
 
     def get_row_item(self, row: int) -> ContractDocument:
-        return self._docs[row]
+        return self._rows[row][0]
+
+    def get_row_file(self, row: int) -> str:
+        return self._rows[row][2]
 
     def columnCount(self, /, parent: QtCore.QModelIndex | QtCore.QPersistentModelIndex = ...):
-        return 2
+        return 3
 
     def rowCount(self, /, parent: QtCore.QModelIndex | QtCore.QPersistentModelIndex = ...):
-        return len(self._docs)
+        return len(self._rows)
 
     def flags(self, index: QtCore.QModelIndex | QtCore.QPersistentModelIndex, /):
         return QtCore.Qt.ItemFlag.ItemIsEnabled | QtCore.Qt.ItemFlag.ItemIsSelectable
@@ -365,21 +559,25 @@ class DocumentModel(QtCore.QAbstractTableModel):
                 return "Datum"
             if section == self.col_description:
                 return "Bezeichnung"
+            if section == self.col_preview:
+                return "Vorschau"
         else:
             return section + 1
 
     def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
-        item: ContractDocument = self._docs[index.row()]
+        item, display, file = self._rows[index.row()]
+        if index.column() == self.col_preview:
+            # only visible rows ask for their thumbnail, it is rendered in the background
+            if role == QtCore.Qt.ItemDataRole.DecorationRole:
+                return previews().thumbnail(file)
+            return None
         if role == QtCore.Qt.ItemDataRole.DisplayRole:
-            if index.column() == self.col_date:
-                return str(item.date)
-            if index.column() == self.col_description:
-                return item.description
+            return display[index.column()]
         if role == QtCore.Qt.ItemDataRole.ForegroundRole:
-            if not item.file_exists:
+            if file_status().exists(file) is False:
                 return QtGui.QColor(180, 0, 0)
 
     def removeRow(self, row: int, /, parent: QtCore.QModelIndex | QtCore.QPersistentModelIndex = ...) -> bool:
-        self._docs[row].delete_instance()
-        self.reload()
+        executor().write(self._rows[row][0].delete_instance)
+        self._remove(row)
         return True
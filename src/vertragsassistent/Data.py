@@ -1,20 +1,258 @@
 from peewee import *
+from playhouse.pool import PooledSqliteDatabase
+from playhouse.sqlite_ext import FTS5Model, RowIDField, SearchField
+from typing import NamedTuple
+import contextlib
 import datetime
 import os.path
+import threading
+import urllib.request
 
 
-db = SqliteDatabase(None)
+# closed connections are kept for the next job of the executor, with their pragmas and page cache; a connection
+# may serve another worker thread next time
+db = PooledSqliteDatabase(None, check_same_thread=False)
+
+# pragmas applied to every connection, selectable per installation
+PRAGMA_PROFILES = {
+    'default': {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'cache_size': -64 * 1024,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'memory',
+    },
+    # WAL and memory mapping do not work reliably for files on network shares
+    'network': {
+        'journal_mode': 'delete',
+        'cache_size': -64 * 1024,
+        'temp_store': 'memory',
+    },
+    'sqlite': {},
+}
+
+
+class Change(NamedTuple):
+    # a row of model was 'created', 'updated' or 'deleted'; contract is the id of the contract it belongs to;
+    # tag assignments are changes of the through model with the tag as id
+    model: type
+    action: str
+    id: int
+    contract: int | None
+
+
+class ChangeBus:
+    # changes are delivered by the changed signal of the executor after their write committed, changes published
+    # outside of a write are not delivered
+    def __init__(self):
+        self._local = threading.local()
+
+    def publish(self, change: Change):
+        pending = getattr(self._local, 'pending', None)
+        if pending is not None:
+            pending.append(change)
+
+    @contextlib.contextmanager
+    def collect(self):
+        # collect the changes published by this thread within the block, so that they can be delivered once the
+        # surrounding transaction committed
+        self._local.pending = []
+        try:
+            yield self._local.pending
+        finally:
+            self._local.pending = None
+
+
+_changes = ChangeBus()
+
+
+def changes() -> ChangeBus:
+    return _changes
+
+
+def init_database(database: str, **kwargs) -> None:
+    # the pooled connections of the previous file are not reused
+    if not db.deferred:
+        db.close_all()
+    db.init(database, **kwargs)
+
+
+def open_database(filename: str, create: bool = False, profile: str = 'default') -> None:
+    init_database(filename, pragmas=PRAGMA_PROFILES[profile])
+    if create:
+        create_tables()
+    migrate()
+
+
+def read_only_uri(filename: str) -> str:
+    return f"file:{urllib.request.pathname2url(os.path.abspath(filename))}?mode=ro"
+
+
+def read_pragmas(profile: str = 'default') -> dict:
+    # the journal settings would change the file, only the read settings of the profile apply
+    return {key: value for key, value in PRAGMA_PROFILES[profile].items() if key not in ('journal_mode', 'synchronous')}
+
+
+def open_database_read_only(filename: str, profile: str = 'default') -> None:
+    # for reports, e.g. by cron next to a running application: the file is neither migrated nor changed, files of
+    # older versions have to be opened by the application once
+    init_database(read_only_uri(filename), pragmas=read_pragmas(profile), uri=True)
+    try:
+        current = schema_version() >= len(MIGRATIONS)
+    except DatabaseError:
+        current = False
+    if not current:
+        db.close_all()
+        raise ValueError(f"Datei einer älteren Version oder keine Datei des Vertragsassistenten, bitte zuerst mit "
+                         f"der Anwendung öffnen: {filename}")
 
 
 def create_tables() -> None:
-    db.create_tables([Contract, ContractPricing, ContractDocument, ContractTag,
-                      ContractTag.contracts.get_through_model()])
+    db.create_tables(_models())
+
+
+def create_indexes() -> None:
+    # the tables of files created before versioning, later tables come with their indexes
+    for statement in (
+            'CREATE INDEX IF NOT EXISTS "contract_name_company" ON "contract" ("name", "company")',
+            'CREATE INDEX IF NOT EXISTS "contractpricing_contract_id_start_date_end_date" '
+            'ON "contractpricing" ("contract_id", "start_date", "end_date")',
+            'CREATE INDEX IF NOT EXISTS "contractdocument_contract_id_date_description" '
+            'ON "contractdocument" ("contract_id", "date", "description")'):
+        db.execute_sql(statement)
+
+
+def create_current_pricing() -> None:
+    # filled by migrate() once the schema is complete
+    for statement in (
+            'CREATE TABLE IF NOT EXISTS "current_pricing" ("contract_id" INTEGER NOT NULL PRIMARY KEY, '
+            '"pricing_id" INTEGER, "per_day" REAL NOT NULL, "per_month" DECIMAL(10, 5) NOT NULL, '
+            '"per_year" DECIMAL(10, 5) NOT NULL, "valid_from" DATE NOT NULL, "valid_until" DATE, '
+            'FOREIGN KEY ("contract_id") REFERENCES "contract" ("id"), '
+            'FOREIGN KEY ("pricing_id") REFERENCES "contractpricing" ("id"))',
+            'CREATE INDEX IF NOT EXISTS "currentpricing_pricing_id" ON "current_pricing" ("pricing_id")',
+            'CREATE INDEX IF NOT EXISTS "currentpricing_valid_until" ON "current_pricing" ("valid_until")'):
+        db.execute_sql(statement)
+
+
+def create_search_index() -> None:
+    # one row per contract (rowid is the contract id), the descriptions of its documents in one column;
+    # triggers keep it in sync with every write, no matter where it comes from
+    db.execute_sql('CREATE VIRTUAL TABLE IF NOT EXISTS "contract_search" USING fts5 '
+                   '("name", "company", "notes", "documents", prefix=\'2 3\', '
+                   'tokenize="unicode61 remove_diacritics 2")')
+    documents = "(SELECT group_concat(description, ' ') FROM contractdocument WHERE contract_id = {}.{})"
+    insert = "INSERT INTO contract_search (rowid, name, company, notes, documents) " \
+             "VALUES (new.id, new.name, new.company, new.notes, " + documents.format('new', 'id') + ");"
+    update_documents = "UPDATE contract_search SET documents = " + documents.format('{0}', 'contract_id') \
+                       + " WHERE rowid = {0}.contract_id;"
+    triggers = {
+        'contract_search_insert': ('AFTER INSERT ON contract', insert),
+        'contract_search_update': ('AFTER UPDATE ON contract',
+                                   "DELETE FROM contract_search WHERE rowid = old.id; " + insert),
+        'contract_search_delete': ('AFTER DELETE ON contract', "DELETE FROM contract_search WHERE rowid = old.id;"),
+        'contract_search_document_insert': ('AFTER INSERT ON contractdocument', update_documents.format('new')),
+        'contract_search_document_update': ('AFTER UPDATE ON contractdocument',
+                                            update_documents.format('old') + ' ' + update_documents.format('new')),
+        'contract_search_document_delete': ('AFTER DELETE ON contractdocument', update_documents.format('old')),
+    }
+    for name, (event, statements) in triggers.items():
+        db.execute_sql(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {statements} END")
+
+    db.execute_sql("DELETE FROM contract_search")
+    db.execute_sql("INSERT INTO contract_search (rowid, name, company, notes, documents) "
+                   "SELECT id, name, company, notes, " + documents.format('contract', 'id') + " FROM contract")
+
+
+def add_document_hash() -> None:
+    # new files have the column from the model already
+    if 'hash' not in {column.name for column in db.get_columns('contractdocument')}:
+        db.execute_sql("ALTER TABLE contractdocument ADD COLUMN hash VARCHAR(64)")
+    db.execute_sql("CREATE INDEX IF NOT EXISTS contractdocument_hash ON contractdocument (hash)")
+
+
+def create_document_text() -> None:
+    # filled by the text indexer, rows of deleted documents go with them
+    db.execute_sql('CREATE VIRTUAL TABLE IF NOT EXISTS "document_text" USING fts5 '
+                   '("text", "file" UNINDEXED, "size" UNINDEXED, "mtime" UNINDEXED, "hash" UNINDEXED, '
+                   'prefix=\'2 3\', tokenize="unicode61 remove_diacritics 2")')
+    db.execute_sql("CREATE TRIGGER IF NOT EXISTS document_text_delete AFTER DELETE ON contractdocument "
+                   "BEGIN DELETE FROM document_text WHERE rowid = old.id; END")
+
+
+def delete_orphans() -> None:
+    # earlier versions deleted contracts only, their pricings, documents and tag links stayed behind
+    for table in ('current_pricing', 'contractpricing', 'contractdocument', 'contracttag_contract_through'):
+        db.execute_sql(f'DELETE FROM "{table}" WHERE "contract_id" NOT IN (SELECT "id" FROM "contract")')
+
+
+# ordered schema changes, the n-th entry brings a file to version n; every migration has to be idempotent,
+# because new files run them on top of freshly created tables; migrations spell out their statements instead of
+# using the models, which describe the latest schema and would change what an old migration does
+MIGRATIONS = [
+    create_indexes,  # 1: indexes on pricings, documents and contract names
+    create_current_pricing,  # 2: cache of the pricing active today
+    create_search_index,  # 3: full text index over contracts and document descriptions
+    add_document_hash,  # 4: content hash of the documents
+    create_document_text,  # 5: full text index over the contents of the documents
+    delete_orphans,  # 6: rows of deleted contracts
+]
+
+
+def migrate() -> None:
+    # bring the file to the latest schema version, a single read if it is up to date
+    if schema_version() >= len(MIGRATIONS):
+        return
+    with db.atomic('IMMEDIATE'):
+        db.execute_sql('CREATE TABLE IF NOT EXISTS "schema_version" ("id" INTEGER NOT NULL PRIMARY KEY, '
+                       '"version" INTEGER NOT NULL)')
+        version = schema_version()
+        for migration in MIGRATIONS[version:]:
+            migration()
+        # derived data is rebuilt with the models once the schema matches them
+        refresh_current_pricing()
+        SchemaVersion.delete().execute()
+        SchemaVersion.create(version=max(version, len(MIGRATIONS)))
+
+
+def schema_version() -> int:
+    try:
+        return SchemaVersion.select(fn.MAX(SchemaVersion.version)).scalar() or 0
+    except OperationalError:
+        # files created before versioning have no version table
+        return 0
+
+
+def _models() -> list:
+    return [Contract, ContractPricing, ContractDocument, ContractTag, ContractTag.contracts.get_through_model(),
+            CurrentPricing]
 
 
 class BaseModel(Model):
     class Meta:
         database = db
 
+    def save(self, *args, **kwargs):
+        action = 'created' if self._pk is None or kwargs.get('force_insert') else 'updated'
+        result = super().save(*args, **kwargs)
+        changes().publish(Change(type(self), action, self._pk, self.changed_contract()))
+        return result
+
+    def delete_instance(self, *args, **kwargs):
+        result = super().delete_instance(*args, **kwargs)
+        changes().publish(Change(type(self), 'deleted', self._pk, self.changed_contract()))
+        return result
+
+    def changed_contract(self) -> int | None:
+        return getattr(self, 'contract_id', None)
+
+
+class SchemaVersion(BaseModel):
+    version = IntegerField()
+
+    class Meta:
+        table_name = 'schema_version'
+
 
 class Contract(BaseModel):
     name = CharField()
@@ -22,6 +260,30 @@ class Contract(BaseModel):
     notes = TextField()
     reminder = DateField(null=True)
 
+    class Meta:
+        indexes = (
+            (('name', 'company'), False),
+        )
+
+    def changed_contract(self) -> int | None:
+        return self.id
+
+    def delete_instance(self, *args, **kwargs):
+        # ids may be reused by sqlite, do not leave anything of the contract behind
+        through = ContractTag.contracts.get_through_model()
+        with db.atomic():
+            # the removed rows are published like deletes of their own, e.g. for the numbers of tagged contracts
+            removed = [Change(model, 'deleted', row_id, self.id)
+                       for model, column in ((ContractPricing, ContractPricing.id),
+                                             (ContractDocument, ContractDocument.id), (through, through.contracttag))
+                       for row_id, in model.select(column).where(model.contract == self.id).tuples()]
+            for model in (CurrentPricing, ContractPricing, ContractDocument, through):
+                model.delete().where(model.contract == self.id).execute()
+            result = super().delete_instance(*args, **kwargs)
+        for change in removed:
+            changes().publish(change)
+        return result
+
 
 class ContractPricing(BaseModel):
     contract = ForeignKeyField(Contract, backref='contract')
@@ -30,22 +292,90 @@ class ContractPricing(BaseModel):
     start_date = DateField()
     end_date = DateField(null=True)
 
+    class Meta:
+        indexes = (
+            (('contract', 'start_date', 'end_date'), False),
+        )
+
+    def save(self, *args, **kwargs):
+        with db.atomic():
+            result = super().save(*args, **kwargs)
+            refresh_current_pricing([self.contract_id])
+        return result
+
+    def delete_instance(self, *args, **kwargs):
+        with db.atomic():
+            result = super().delete_instance(*args, **kwargs)
+            refresh_current_pricing([self.contract_id])
+        return result
+
     @property
     def is_active(self) -> bool:
         today = datetime.date.today()
         return today >= self.start_date and (self.end_date is None or today <= self.end_date)
 
+    @classmethod
+    def active_on(cls, date: datetime.date):
+        return (cls.start_date <= date) & ((cls.end_date >> None) | (cls.end_date >= date))
+
+
+class CurrentPricing(BaseModel):
+    # the pricing active on valid_from and its costs, still active until valid_until (forever, if None)
+    contract = ForeignKeyField(Contract, primary_key=True)
+    pricing = ForeignKeyField(ContractPricing, null=True)
+    per_day = FloatField()
+    per_month = DecimalField()
+    per_year = DecimalField()
+    valid_from = DateField()
+    valid_until = DateField(null=True)
+
+    class Meta:
+        table_name = 'current_pricing'
+        indexes = (
+            (('valid_until',), False),
+        )
+
+
+class ContractSearch(FTS5Model):
+    # maintained by triggers, see create_search_index
+    rowid = RowIDField()
+    name = SearchField()
+    company = SearchField()
+    notes = SearchField()
+    documents = SearchField()
+
+    class Meta:
+        database = db
+        table_name = 'contract_search'
+        # prefix indexes keep searches for the first few typed characters fast
+        options = {'prefix': '2 3', 'tokenize': 'unicode61 remove_diacritics 2'}
+
 
 class ContractTag(BaseModel):
     name = CharField()
     contracts = ManyToManyField(Contract, backref='tags')
 
+    def add_contract(self, contract: Contract):
+        self.contracts.add(contract)
+        changes().publish(Change(ContractTag.contracts.get_through_model(), 'created', self.id, contract.id))
+
+    def remove_contract(self, contract: Contract):
+        self.contracts.remove(contract)
+        changes().publish(Change(ContractTag.contracts.get_through_model(), 'deleted', self.id, contract.id))
+
 
 class ContractDocument(BaseModel):
     contract = ForeignKeyField(Contract, backref='contract')
     file = TextField()
     description = CharField()
     date = DateField()
+    # sha256 of the contents, None until known
+    hash = CharField(max_length=64, null=True)
+
+    class Meta:
+        indexes = (
+            (('contract', 'date', 'description'), False),
+        )
 
     @property
     def absolute_file(self):
@@ -54,3 +384,253 @@ class ContractDocument(BaseModel):
     @property
     def file_exists(self):
         return os.path.isfile(self.absolute_file)
+
+
+class DocumentText(FTS5Model):
+    # extracted text of a document (rowid is the document id) and the state of the file it was extracted from
+    rowid = RowIDField()
+    text = SearchField()
+    file = SearchField(unindexed=True)
+    size = SearchField(unindexed=True)
+    mtime = SearchField(unindexed=True)
+    hash = SearchField(unindexed=True)
+
+    class Meta:
+        database = db
+        table_name = 'document_text'
+        options = {'prefix': '2 3', 'tokenize': 'unicode61 remove_diacritics 2'}
+
+
+def store_directory() -> str:
+    # the managed document store next to the database, files are kept under their content hash
+    base, _ = os.path.splitext(os.path.abspath(db.database))
+    return base + '.dokumente'
+
+
+def relative_file(path: str) -> str:
+    # paths of documents are stored relative to the database, absolute on another drive
+    try:
+        return os.path.relpath(path, os.path.dirname(os.path.abspath(db.database))).replace('\\', '/')
+    except ValueError:
+        return os.path.abspath(path)
+
+
+def costs(price, payment_interval_days: int | None) -> tuple:
+    # price per month (30 days) and per year (365 days) of a pricing, zero without a pricing
+    price = 0 if price is None else price
+    interval = 365 if payment_interval_days is None else payment_interval_days
+    per_day = price / interval
+    return round(per_day * 30, 2), round(per_day * 365, 2)
+
+
+def contracts_by_tags(tags: list[ContractTag], match_all: bool = True):
+    # select the ids of all contracts having all (match_all) or any of the given tags
+    through = ContractTag.contracts.get_through_model()
+    tag_ids = {tag.id for tag in tags}
+    query = through.select(through.contract)\
+        .where(through.contracttag.in_(list(tag_ids)))\
+        .group_by(through.contract)
+    if match_all:
+        query = query.having(fn.COUNT(fn.DISTINCT(through.contracttag)) == len(tag_ids))
+    return query
+
+
+def contract_overview(date: datetime.date | None = None, tags: list[ContractTag] | None = None,
+                      match_all: bool = True):
+    # select all contracts together with the pricing active on the given date in a single statement;
+    # the active pricing is available as contract.pricing (None, if there is no active pricing)
+    date = datetime.date.today() if date is None else date
+    ranked = ContractPricing.select(
+        ContractPricing.id, ContractPricing.contract,
+        fn.ROW_NUMBER().over(partition_by=[ContractPricing.contract],
+                             order_by=[ContractPricing.start_date.desc()]).alias('position'))\
+        .where(ContractPricing.active_on(date))\
+        .alias('ranked')
+    query = Contract.select(Contract, ContractPricing)\
+        .join(ranked, JOIN.LEFT_OUTER, on=((ranked.c.contract_id == Contract.id) & (ranked.c.position == 1)))\
+        .switch(Contract)\
+        .join(ContractPricing, JOIN.LEFT_OUTER, on=(ContractPricing.id == ranked.c.id), attr='pricing')\
+        .order_by(Contract.name, Contract.company)
+    if tags:
+        query = query.where(Contract.id.in_(contracts_by_tags(tags, match_all)))
+    return query
+
+
+RANKED_MATCHES = 2000
+
+
+def search_expression(text: str) -> str | None:
+    # every word of the text has to match the beginning of a word, None if there is nothing to search for
+    words = [word for word in text.split() if any(character.isalnum() for character in word)]
+    if not words:
+        return None
+    return ' '.join('"' + word.replace('"', '""') + '"*' for word in words)
+
+
+def search_contracts(text: str, contract_ids: list[int] | None = None) -> tuple[list[int], bool] | None:
+    # ids of the contracts matching the search text and whether they are ranked (best first), None if there is
+    # nothing to search for; ranking is expensive for many matches and means little there, so they stay unranked;
+    # contracts found only by the contents of their documents follow the others
+    expression = search_expression(text)
+    if expression is None:
+        return None
+    query = ContractSearch.select(ContractSearch.rowid).where(ContractSearch.match(expression))
+    contents = DocumentText.select(ContractDocument.contract)\
+        .join(ContractDocument, on=(ContractDocument.id == DocumentText.rowid))\
+        .where(DocumentText.match(expression))
+    if contract_ids is not None:
+        query = query.where(ContractSearch.rowid.in_(contract_ids))
+        contents = contents.where(ContractDocument.contract.in_(contract_ids))
+    ids = [contract_id for contract_id, in db.execute(query).fetchall()]
+    found = set(ids)
+    content_ids = [contract_id for contract_id, in db.execute(contents.distinct()).fetchall()
+                   if contract_id not in found]
+    if len(ids) + len(content_ids) > RANKED_MATCHES:
+        return ids + content_ids, False
+    # names weigh most, then companies, then notes and document descriptions
+    ranked = query.order_by(ContractSearch.bm25(10.0, 5.0, 1.0, 1.0))
+    ids = [contract_id for contract_id, in db.execute(ranked).fetchall()]
+    if content_ids:
+        # a contract ranks by its best matching document
+        ranked_contents = contents.where(ContractDocument.contract.in_(content_ids)).order_by(DocumentText.rank())
+        ids.extend(dict.fromkeys(contract_id for contract_id, in db.execute(ranked_contents).fetchall()))
+    return ids, True
+
+
+def current_overview(tags: list[ContractTag] | None = None, match_all: bool = True):
+    # like contract_overview for today, but reading the cached pricing (CurrentPricing fields, None without pricing)
+    query = Contract.select(Contract, CurrentPricing)\
+        .join(CurrentPricing, JOIN.LEFT_OUTER, on=(CurrentPricing.contract == Contract.id))\
+        .order_by(Contract.name, Contract.company)
+    if tags:
+        query = query.where(Contract.id.in_(contracts_by_tags(tags, match_all)))
+    return query
+
+
+def refresh_current_pricing(contract_ids: list[int] | None = None, date: datetime.date | None = None) -> None:
+    # recompute the cached pricing of the given contracts (all, if None) as of the date
+    date = datetime.date.today() if date is None else date
+    overview = contract_overview(date)\
+        .select(Contract.id, ContractPricing.id, ContractPricing.price, ContractPricing.payment_interval_days)
+    # the active pricing may change the day before the next pricing starts or on the day an active one ends
+    boundaries = ContractPricing.select(ContractPricing.contract, fn.MIN(Case(None, (
+        (ContractPricing.start_date > date, fn.date(ContractPricing.start_date, '-1 day')),
+        (ContractPricing.end_date >= date, ContractPricing.end_date)))))\
+        .group_by(ContractPricing.contract)
+    delete = CurrentPricing.delete()
+    if contract_ids is not None:
+        overview = overview.where(Contract.id.in_(contract_ids))
+        boundaries = boundaries.where(ContractPricing.contract.in_(contract_ids))
+        delete = delete.where(CurrentPricing.contract.in_(contract_ids))
+
+    valid_until = {contract_id: boundary and datetime.date.fromisoformat(str(boundary))
+                   for contract_id, boundary in boundaries.tuples()}
+    rows = []
+    for contract_id, pricing_id, price, interval in overview.tuples():
+        per_month, per_year = costs(price, interval)
+        rows.append({'contract': contract_id, 'pricing': pricing_id,
+                     'per_day': 0 if pricing_id is None else float(price) / interval,
+                     'per_month': per_month, 'per_year': per_year,
+                     'valid_from': date, 'valid_until': valid_until.get(contract_id)})
+    with db.atomic():
+        delete.execute()
+        for chunk in chunked(rows, 1000):
+            CurrentPricing.insert_many(chunk).execute()
+
+
+def roll_current_pricing(date: datetime.date | None = None) -> int:
+    # recompute only the cached pricings whose validity does not cover the date, returns their number
+    date = datetime.date.today() if date is None else date
+    stale = [contract_id for contract_id, in CurrentPricing.select(CurrentPricing.contract)
+             .where((CurrentPricing.valid_until < date) | (CurrentPricing.valid_from > date)).tuples()]
+    for chunk in chunked(stale, 500):
+        refresh_current_pricing(chunk, date)
+    return len(stale)
+
+
+def _changed_price(percent: float):
+    return fn.ROUND(ContractPricing.price * (1 + percent / 100), 2)
+
+
+def price_change_preview(contract_ids: list[int], date: datetime.date, percent: float) -> list[tuple]:
+    # contracts with the pricing active on the date as id, name, company, interval, price and changed price;
+    # contracts without pricing on the date are left out
+    rows = []
+    for chunk in chunked(contract_ids, 500):
+        query = contract_overview(date)\
+            .select(Contract.id, Contract.name, Contract.company, ContractPricing.payment_interval_days,
+                    ContractPricing.price, _changed_price(percent))\
+            .where(Contract.id.in_(chunk) & ContractPricing.id.is_null(False))
+        rows.extend(query.tuples())
+    rows.sort(key=lambda row: (row[1], row[2]))
+    return rows
+
+
+def change_prices(contract_ids: list[int], date: datetime.date, percent: float) -> int:
+    # end the pricings active on the date the day before and continue them from the date at the changed price,
+    # pricings starting on the date are changed in place; returns the number of changed contracts
+    pricings = []
+    for chunk in chunked(contract_ids, 500):
+        pricings.extend(contract_overview(date)
+                        .select(ContractPricing.id, Contract.id, ContractPricing.start_date)
+                        .where(Contract.id.in_(chunk) & ContractPricing.id.is_null(False)).tuples())
+    with db.atomic():
+        last_id = ContractPricing.select(fn.MAX(ContractPricing.id)).scalar() or 0
+        for chunk in chunked(pricings, 500):
+            continued = [pricing_id for pricing_id, _, start_date in chunk if start_date < date]
+            in_place = [pricing_id for pricing_id, _, start_date in chunk if start_date >= date]
+            ContractPricing.insert_from(
+                ContractPricing.select(ContractPricing.contract, _changed_price(percent),
+                                       ContractPricing.payment_interval_days, Value(date.isoformat()),
+                                       ContractPricing.end_date)
+                .where(ContractPricing.id.in_(continued)),
+                [ContractPricing.contract, ContractPricing.price, ContractPricing.payment_interval_days,
+                 ContractPricing.start_date, ContractPricing.end_date]).execute()
+            ContractPricing.update(end_date=date - datetime.timedelta(days=1))\
+                .where(ContractPricing.id.in_(continued)).execute()
+            ContractPricing.update(price=_changed_price(percent)).where(ContractPricing.id.in_(in_place)).execute()
+        changed = [contract_id for _, contract_id, _ in pricings]
+        for chunk in chunked(changed, 500):
+            refresh_current_pricing(chunk)
+
+    for pricing_id, contract_id, _ in pricings:
+        changes().publish(Change(ContractPricing, 'updated', pricing_id, contract_id))
+    for pricing_id, contract_id in ContractPricing.select(ContractPricing.id, ContractPricing.contract)\
+            .where(ContractPricing.id > last_id).tuples():
+        changes().publish(Change(ContractPricing, 'created', pricing_id, contract_id))
+    return len(changed)
+
+
+def tag_change_preview(contract_ids: list[int], tag: ContractTag) -> list[tuple]:
+    # contracts as id, name, company and whether they have the tag
+    through = ContractTag.contracts.get_through_model()
+    tagged = through.select(through.contract).where(through.contracttag == tag.id)
+    rows = []
+    for chunk in chunked(contract_ids, 500):
+        rows.extend(Contract.select(Contract.id, Contract.name, Contract.company, Contract.id.in_(tagged))
+                    .where(Contract.id.in_(chunk)).tuples())
+    rows.sort(key=lambda row: (row[1], row[2]))
+    return rows
+
+
+def change_tags(contract_ids: list[int], tag: ContractTag, add: bool) -> int:
+    # add the tag to or remove it from all contracts, returns the number of changed contracts
+    through = ContractTag.contracts.get_through_model()
+    changed = []
+    with db.atomic():
+        for chunk in chunked(contract_ids, 500):
+            tagged = {contract_id for contract_id, in through.select(through.contract)
+                      .where((through.contracttag == tag.id) & through.contract.in_(chunk)).tuples()}
+            if add:
+                chunk = [contract_id for contract_id in chunk if contract_id not in tagged]
+                if chunk:
+                    through.insert_many([{'contracttag': tag.id, 'contract': contract_id} for contract_id in chunk])\
+                        .execute()
+            else:
+                chunk = [contract_id for contract_id in chunk if contract_id in tagged]
+                through.delete().where((through.contracttag == tag.id) & through.contract.in_(chunk)).execute()
+            changed.extend(chunk)
+
+    for contract_id in changed:
+        changes().publish(Change(through, 'created' if add else 'deleted', tag.id, contract_id))
+    return len(changed)
@@ -1,6 +1,8 @@
 from PySide6.QtWidgets import *
 from PySide6 import QtCore
 from Data import *
+from DocumentStore import document_store
+from Executor import executor
 
 
 class DocumentDialog(QDialog):
@@ -31,11 +33,16 @@ class DocumentDialog(QDialog):
         btn_select_path.clicked.connect(self.path_selector)
         layout.addWidget(btn_select_path, 2, 2)
 
+        # copy into the document store, preselected once the store is in use
+        self._input_copy = QCheckBox("Kopie in der Dokumentenablage speichern")
+        self._input_copy.setChecked(os.path.isdir(store_directory()))
+        layout.addWidget(self._input_copy, 3, 1, 1, 2)
+
         # add final button
         btn_save = QPushButton("Speichern")
         btn_save.setDefault(True)
         btn_save.clicked.connect(self.accept)
-        layout.addWidget(btn_save, 3, 0, 1, 3)
+        layout.addWidget(btn_save, 4, 0, 1, 3)
 
     @QtCore.Slot()
     def path_selector(self):
@@ -53,6 +60,12 @@ class DocumentDialog(QDialog):
         self._document.contract = self._contract
         self._document.description = self._input_description.text()
         self._document.date = self._input_date.date().toPython()
-        self._document.file = self._input_path.text()
-        self._document.save()
+        file = self._input_path.text()
+        path = os.path.join(os.path.dirname(os.path.abspath(db.database)), file)
+        copy = self._input_copy.isChecked() and not path.startswith(store_directory() + os.sep)
+        if file != self._document.file or copy:
+            # the contents are new, hash (and copy) them in the background before saving
+            document_store().attach(self._document, path, copy=copy)
+        else:
+            executor().write(self._document.save)
         super().accept()
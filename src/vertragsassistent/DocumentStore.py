@@ -0,0 +1,239 @@
+from PySide6 import QtCore
+from collections.abc import Callable, Iterable
+from Data import *
+from Executor import executor
+import hashlib
+import itertools
+import os
+import queue
+import tempfile
+import threading
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class Cancelled(Exception):
+    pass
+
+
+def hash_file(path: str, store: str | None = None, cancelled: threading.Event | None = None)\
+        -> tuple[str, str, datetime.date]:
+    # sha256 of the file, read in chunks; with a store directory the file is copied into it while reading, unless
+    # the store holds the same contents already; returns the hash, the file to link and the modification date
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        modified = datetime.date.fromtimestamp(os.fstat(source.fileno()).st_mtime)
+        target = None
+        if store is not None:
+            os.makedirs(store, exist_ok=True)
+            target = tempfile.NamedTemporaryFile(dir=store, prefix='.import-', delete=False)
+        try:
+            while chunk := source.read(CHUNK_SIZE):
+                if cancelled is not None and cancelled.is_set():
+                    raise Cancelled(path)
+                digest.update(chunk)
+                if target is not None:
+                    target.write(chunk)
+        except BaseException:
+            if target is not None:
+                target.close()
+                os.remove(target.name)
+            raise
+
+    if target is None:
+        return digest.hexdigest(), path, modified
+    target.close()
+    stored = os.path.join(store, digest.hexdigest()[:2], digest.hexdigest() + os.path.splitext(path)[1].lower())
+    if os.path.exists(stored):
+        os.remove(target.name)
+    else:
+        os.makedirs(os.path.dirname(stored), exist_ok=True)
+        os.replace(target.name, stored)
+    return digest.hexdigest(), stored, modified
+
+
+def folder_files(folder: str) -> list[str]:
+    # all files below the folder, without hidden ones
+    files = []
+    for directory, directories, names in os.walk(folder):
+        directories[:] = [name for name in directories if not name.startswith('.')]
+        files.extend(os.path.join(directory, name) for name in sorted(names) if not name.startswith('.'))
+    return files
+
+
+def store_documents(contract_id: int, results: dict[str, tuple]) -> int:
+    # attach the hashed files to the contract, contents it has already are skipped; returns the number attached
+    digests = list({result[0] for result in results.values()})
+    known = set()
+    for chunk in chunked(digests, 500):
+        known.update(digest for digest, in ContractDocument.select(ContractDocument.hash)
+                     .where((ContractDocument.contract == contract_id) & ContractDocument.hash.in_(chunk)).tuples())
+    attached = 0
+    for path, (digest, file, modified) in sorted(results.items()):
+        if digest in known:
+            continue
+        known.add(digest)
+        ContractDocument(contract=contract_id, file=relative_file(file), hash=digest, date=modified,
+                         description=os.path.splitext(os.path.basename(path))[0]).save()
+        attached += 1
+    relink_documents(results)
+    return attached
+
+
+def relink_documents(results: dict[str, tuple]) -> int:
+    # point documents whose file went missing to a found file with the same contents; returns their number
+    found = {digest: file for digest, file, _ in results.values()}
+    relinked = 0
+    for chunk in chunked(list(found), 500):
+        for document in ContractDocument.select().where(ContractDocument.hash.in_(chunk)):
+            if not document.file_exists:
+                document.file = relative_file(found[document.hash])
+                document.save()
+                relinked += 1
+    return relinked
+
+
+class DocumentStore(QtCore.QObject):
+    _hashed = QtCore.Signal(int, str, object)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._tickets = itertools.count()
+        # per batch: callback, number of files, number of files done, results, progress callback, cancel event
+        self._batches: dict[int, list] = {}
+        # files waiting to be hashed, as ticket, path, store directory and the cancel event of their batch
+        self._queue = queue.SimpleQueue()
+        self._hashed.connect(self._collect)
+
+        # reading is the bottleneck, hashlib releases the GIL while hashing
+        self._pool = QtCore.QThreadPool(self)
+        self._pool.setMaxThreadCount(max(2, min(8, QtCore.QThread.idealThreadCount())))
+
+    def hash_files(self, paths: Iterable[str], callback: Callable[[dict[str, tuple]], None], /, copy: bool = False,
+                   progress: Callable[[int, int], None] | None = None) -> int:
+        # hash (and copy into the store) all files in parallel; once all are done callback gets
+        # path -> (hash, file to link, modification date) for every file which could be read; progress gets the
+        # number of done and of all files of this batch; returns the ticket of the batch to cancel it
+        paths = list(dict.fromkeys(paths))
+        ticket = next(self._tickets)
+        if not paths:
+            callback({})
+            return ticket
+        cancelled = threading.Event()
+        self._batches[ticket] = [callback, len(paths), 0, {}, progress, cancelled]
+        store = store_directory() if copy else None
+        for path in paths:
+            self._queue.put((ticket, path, store, cancelled))
+        # a few workers take the files from the queue, surplus ones find it empty and finish at once
+        for _ in range(min(len(paths), self._pool.maxThreadCount())):
+            self._pool.start(_HashWorker(self._queue, self._hashed))
+        return ticket
+
+    def attach(self, document: ContractDocument, path: str, /, copy: bool = False):
+        # the document is saved at once, linked to the file where it is; the hash and the copy in the store follow,
+        # a document whose hashing is cancelled keeps its link and is hashed by the next backfill
+        document.file = relative_file(path)
+        document.hash = None
+        executor().write(document.save)
+
+        def hashed(results: dict[str, tuple]):
+            if path not in results:
+                return
+            digest, file, _ = results[path]
+
+            def update():
+                document.file, document.hash = relative_file(file), digest
+                document.save()
+            executor().write(update)
+
+        self.hash_files([path], hashed, copy=copy)
+
+    def import_files(self, contract: Contract, paths: Iterable[str], callback: Callable[[int], None], /,
+                     copy: bool = False, progress: Callable[[int, int], None] | None = None) -> int:
+        # attach many files at once, callback gets the number of attached documents; returns the ticket to cancel
+        contract_id = contract.id
+        return self.hash_files(paths, lambda results: executor().write(lambda: store_documents(contract_id, results),
+                                                                       callback, context=self),
+                               copy=copy, progress=progress)
+
+    def relink(self, folder: str, callback: Callable[[int], None]):
+        # search the folder for moved files of missing documents, callback gets the number of relinked documents
+        self.hash_files(folder_files(folder),
+                        lambda results: executor().write(lambda: relink_documents(results), callback, context=self))
+
+    def backfill(self):
+        # hash existing documents stored before hashes were known, so that they can be found once they are moved
+        def load() -> list[tuple[int, str]]:
+            documents = ContractDocument.select().where(ContractDocument.hash >> None)
+            return [(document.id, document.absolute_file) for document in documents if document.file_exists]
+
+        def hashed(documents: list[tuple[int, str]], results: dict[str, tuple]):
+            def write():
+                for document_id, path in documents:
+                    if path in results:
+                        ContractDocument.update(hash=results[path][0])\
+                            .where(ContractDocument.id == document_id).execute()
+            executor().write(write)
+
+        executor().read(load, lambda documents: self.hash_files((path for _, path in documents),
+                                                                lambda results: hashed(documents, results)),
+                        context=self)
+
+    def cancel(self, ticket: int | None = None):
+        # drop the batch of the ticket, its queued files are skipped; without a ticket drop all batches and wait for
+        # the running files, e.g. when closing
+        batches = list(self._batches) if ticket is None else [ticket]
+        for batch in batches:
+            if batch in self._batches:
+                self._batches.pop(batch)[5].set()
+        if ticket is None:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._pool.waitForDone()
+
+    @QtCore.Slot(int, str, object)
+    def _collect(self, ticket: int, path: str, result: tuple | None):
+        if ticket not in self._batches:
+            # cancelled
+            return
+        batch = self._batches[ticket]
+        callback, total, done, results, progress, _ = batch
+        if result is not None:
+            results[path] = result
+        batch[2] = done = done + 1
+        if progress is not None:
+            progress(done, total)
+        if done == total:
+            del self._batches[ticket]
+            callback(results)
+
+
+class _HashWorker(QtCore.QRunnable):
+    def __init__(self, files: queue.SimpleQueue, hashed: QtCore.SignalInstance):
+        super().__init__()
+        self._files = files
+        self._hashed = hashed
+
+    def run(self):
+        while True:
+            try:
+                ticket, path, store, cancelled = self._files.get_nowait()
+            except queue.Empty:
+                return
+            if cancelled.is_set():
+                continue
+            try:
+                result = hash_file(path, store, cancelled)
+            except (OSError, Cancelled):
+                result = None
+            self._hashed.emit(ticket, path, result)
+
+
+_store: DocumentStore | None = None
+
+
+def document_store() -> DocumentStore:
+    global _store
+    if _store is None:
+        _store = DocumentStore()
+    return _store
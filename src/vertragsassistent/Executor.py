@@ -0,0 +1,127 @@
+from PySide6 import QtCore
+from shiboken6 import isValid
+from collections.abc import Callable, Hashable
+from Data import db, changes
+import itertools
+import threading
+
+
+class QueryExecutor(QtCore.QObject):
+    # changes committed by a write, emitted in the GUI thread before the callback of the write
+    changed = QtCore.Signal(object)
+    # exception of a job, emitted in the GUI thread instead of calling its callback
+    failed = QtCore.Signal(object)
+    _finished = QtCore.Signal(int, object, object, object)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._tickets = itertools.count()
+        self._jobs: dict[int, tuple[Callable | None, QtCore.QObject | None, Hashable | None]] = {}
+        self._latest: dict[Hashable, int] = {}
+        self._finished.connect(self._deliver)
+
+        # reads run in parallel, writes one after another in the order they were issued
+        self._read_pool = QtCore.QThreadPool(self)
+        self._read_pool.setMaxThreadCount(4)
+        self._write_pool = QtCore.QThreadPool(self)
+        self._write_pool.setMaxThreadCount(1)
+        self._write_state = threading.Condition()
+        self._writes_issued = 0
+        self._writes_done = 0
+
+    def read(self, func: Callable, callback: Callable | None = None, /, key: Hashable | None = None,
+             context: QtCore.QObject | None = None):
+        # run func in a worker thread and hand its result to callback in the GUI thread;
+        # a newer read with the same key supersedes all earlier ones
+        ticket = self._issue(callback, context, key)
+        if key is not None:
+            self._latest[key] = ticket
+        self._read_pool.start(_Job(self, ticket, func, key, self._writes_issued))
+
+    def write(self, func: Callable, callback: Callable | None = None, /, context: QtCore.QObject | None = None):
+        # run func in a transaction after all earlier writes; reads issued later see its changes
+        ticket = self._issue(callback, context, None)
+        self._writes_issued += 1
+        self._write_pool.start(_Job(self, ticket, func, None, self._writes_issued - 1, write=True))
+
+    def wait(self):
+        self._write_pool.waitForDone()
+        self._read_pool.waitForDone()
+
+    def _issue(self, callback: Callable | None, context: QtCore.QObject | None, key: Hashable | None) -> int:
+        ticket = next(self._tickets)
+        self._jobs[ticket] = (callback, context, key)
+        return ticket
+
+    def _is_current(self, ticket: int, key: Hashable | None) -> bool:
+        return key is None or self._latest.get(key) == ticket
+
+    def _wait_for_writes(self, count: int):
+        with self._write_state:
+            self._write_state.wait_for(lambda: self._writes_done >= count)
+
+    def _write_done(self):
+        with self._write_state:
+            self._writes_done += 1
+            self._write_state.notify_all()
+
+    @QtCore.Slot(int, object, object, object)
+    def _deliver(self, ticket: int, result, error: BaseException | None, committed: list):
+        callback, context, key = self._jobs.pop(ticket)
+        if committed:
+            self.changed.emit(committed)
+        if not self._is_current(ticket, key):
+            # a newer read with the same key was issued meanwhile
+            return
+        if key is not None:
+            del self._latest[key]
+        if error is not None:
+            self.failed.emit(error)
+            return
+        if result is _superseded or callback is None or (context is not None and not isValid(context)):
+            return
+        callback(result)
+
+
+_superseded = object()
+
+
+class _Job(QtCore.QRunnable):
+    def __init__(self, executor: QueryExecutor, ticket: int, func: Callable, key: Hashable | None,
+                 writes: int, /, write: bool = False):
+        super().__init__()
+        self._executor = executor
+        self._ticket = ticket
+        self._func = func
+        self._key = key
+        self._writes = writes
+        self._write = write
+
+    def run(self):
+        result, error, committed = _superseded, None, []
+        try:
+            self._executor._wait_for_writes(self._writes)
+            if self._write:
+                with changes().collect() as collected, db.atomic():
+                    result = self._func()
+                committed = collected
+            elif self._executor._is_current(self._ticket, self._key):
+                result = self._func()
+        except Exception as e:
+            error = e
+        finally:
+            # back to the pool, the thread state holding it ends with the job
+            db.close()
+            if self._write:
+                self._executor._write_done()
+        self._executor._finished.emit(self._ticket, result, error, committed)
+
+
+_executor: QueryExecutor | None = None
+
+
+def executor() -> QueryExecutor:
+    global _executor
+    if _executor is None:
+        _executor = QueryExecutor()
+    return _executor
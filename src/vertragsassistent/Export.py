@@ -0,0 +1,77 @@
+import csv
+import os
+from Data import *
+
+# file extension per format
+FORMATS = {'csv': '.csv', 'jsonl': '.jsonl'}
+# rows fetched at once, memory use does not grow with the database
+FETCH_SIZE = 10000
+
+
+def export_queries(tags: list[ContractTag] | None = None, match_all: bool = True) -> dict:
+    # one query per exported file, each in the order of the table so that sqlite streams the rows without sorting;
+    # rows are joined to their contract so that leftovers of deleted contracts are not exported
+    through = ContractTag.contracts.get_through_model()
+    queries = {
+        'contracts': Contract.select(Contract.id, Contract.name, Contract.company, Contract.notes, Contract.reminder)
+        .order_by(Contract.id),
+        'pricings': ContractPricing.select(ContractPricing.id, ContractPricing.contract.alias('contract'),
+                                           ContractPricing.price, ContractPricing.payment_interval_days,
+                                           ContractPricing.start_date, ContractPricing.end_date)
+        .join(Contract)
+        .order_by(ContractPricing.id),
+        'tags': through.select(through.contract.alias('contract'), ContractTag.name.alias('tag'))
+        .join(ContractTag)
+        .switch(through)
+        .join(Contract)
+        .order_by(through.id),
+        'documents': ContractDocument.select(ContractDocument.id, ContractDocument.contract.alias('contract'),
+                                             ContractDocument.file, ContractDocument.description,
+                                             ContractDocument.date, ContractDocument.hash)
+        .join(Contract)
+        .order_by(ContractDocument.id),
+    }
+    if tags:
+        contract_ids = contracts_by_tags(tags, match_all)
+        queries['contracts'] = queries['contracts'].where(Contract.id.in_(contract_ids))
+        queries['pricings'] = queries['pricings'].where(ContractPricing.contract.in_(contract_ids))
+        queries['tags'] = queries['tags'].where(through.contract.in_(contract_ids))
+        queries['documents'] = queries['documents'].where(ContractDocument.contract.in_(contract_ids))
+    return queries
+
+
+def export(directory: str, prefix: str = '', fmt: str = 'csv', tags: list[ContractTag] | None = None,
+           match_all: bool = True) -> dict[str, int]:
+    # write contracts, pricings, tag assignments and documents into one file each, named
+    # <prefix><table><extension>; all files show the same state of the database; returns the rows per file
+    counts = {}
+    with db.atomic():
+        for name, query in export_queries(tags, match_all).items():
+            with open(os.path.join(directory, prefix + name + FORMATS[fmt]), 'w', newline='',
+                      encoding='utf-8') as file:
+                counts[name] = _write_csv(file, query) if fmt == 'csv' else _write_jsonl(file, query)
+    return counts
+
+
+def _write_csv(file, query) -> int:
+    cursor = db.execute(query)
+    writer = csv.writer(file)
+    writer.writerow(column[0] for column in cursor.description)
+    count = 0
+    for rows in iter(lambda: cursor.fetchmany(FETCH_SIZE), []):
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+
+def _write_jsonl(file, query) -> int:
+    # sqlite encodes the rows itself, much faster than doing it row by row in python
+    columns = [column[0] for column in db.execute(query.limit(0)).description]
+    sql, params = query.sql()
+    objects = ', '.join(f"'{column}', \"{column}\"" for column in columns)
+    cursor = db.execute_sql(f"SELECT json_object({objects}) FROM ({sql})", params)
+    count = 0
+    for rows in iter(lambda: cursor.fetchmany(FETCH_SIZE), []):
+        file.writelines(row + '\n' for row, in rows)
+        count += len(rows)
+    return count
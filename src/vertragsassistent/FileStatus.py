@@ -0,0 +1,99 @@
+from PySide6 import QtCore
+from collections.abc import Callable, Iterable
+import os.path
+
+
+class FileStatusCache(QtCore.QObject):
+    status_changed = QtCore.Signal(str, bool)
+    # path, whether the file exists and whether its directory exists
+    _checked = QtCore.Signal(str, bool, bool)
+    poll_interval = 60000
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._status: dict[str, bool] = {}
+        self._pending: set[str] = set()
+        self._watched: set[str] = set()
+        self._waiters: list[tuple[set[str], Callable[[], None]]] = []
+        self._pool = QtCore.QThreadPool(self)
+        self._checked.connect(self._store)
+
+        # watch directories for changes, poll regularly where no notifications arrive (e.g. network shares)
+        self._watcher = QtCore.QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._directory_changed)
+        self._timer = QtCore.QTimer(self)
+        self._timer.timeout.connect(lambda: self._check(list(self._status)))
+        self._timer.start(self.poll_interval)
+
+    def exists(self, path: str) -> bool | None:
+        # cached state of the file, None if unknown yet
+        return self._status.get(os.path.normpath(path))
+
+    def request(self, paths: Iterable[str]):
+        # check all files not known yet in the background
+        paths = {os.path.normpath(path) for path in paths}
+        self._check([path for path in paths if path not in self._status])
+
+    def when_checked(self, paths: Iterable[str], callback: Callable[[], None]):
+        # call back as soon as the state of all files is known
+        paths = {os.path.normpath(path) for path in paths}
+        outstanding = {path for path in paths if path not in self._status}
+        if not outstanding:
+            callback()
+            return
+        self._waiters.append((outstanding, callback))
+        self._check(outstanding)
+
+    def _check(self, paths: Iterable[str]):
+        # the file system is only touched by the workers, network shares may take long to answer
+        for path in paths:
+            if path in self._pending:
+                continue
+            self._pending.add(path)
+            self._pool.start(_FileCheck(path, self._checked))
+
+    @QtCore.Slot(str, bool, bool)
+    def _store(self, path: str, exists: bool, directory_exists: bool):
+        self._pending.discard(path)
+        directory = os.path.dirname(path)
+        if directory_exists and directory not in self._watched:
+            # every directory is registered once
+            self._watched.add(directory)
+            self._watcher.addPath(directory)
+        changed = self._status.get(path) != exists
+        self._status[path] = exists
+        if changed:
+            self.status_changed.emit(path, exists)
+
+        # inform everyone waiting for this file
+        for outstanding, callback in list(self._waiters):
+            outstanding.discard(path)
+            if not outstanding:
+                self._waiters.remove((outstanding, callback))
+                callback()
+
+    @QtCore.Slot(str)
+    def _directory_changed(self, directory: str):
+        directory = os.path.normpath(directory)
+        self._check([path for path in self._status if os.path.dirname(path) == directory])
+
+
+class _FileCheck(QtCore.QRunnable):
+    def __init__(self, path: str, checked: QtCore.SignalInstance):
+        super().__init__()
+        self._path = path
+        self._checked = checked
+
+    def run(self):
+        exists = os.path.isfile(self._path)
+        self._checked.emit(self._path, exists, exists or os.path.isdir(os.path.dirname(self._path)))
+
+
+_cache: FileStatusCache | None = None
+
+
+def file_status() -> FileStatusCache:
+    global _cache
+    if _cache is None:
+        _cache = FileStatusCache()
+    return _cache
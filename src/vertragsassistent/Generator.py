@@ -0,0 +1,68 @@
+import argparse
+import datetime
+import decimal
+import random
+from Data import *
+
+# all dates are relative to this one, so that the same seed gives the same file on every day
+REFERENCE_DATE = datetime.date(2026, 1, 1)
+
+
+def generate(filename: str, contracts: int = 10000, pricings: int = 10, tags: int = 30, tag_density: float = 0.1,
+             documents: int = 5, seed: int = 0, today: datetime.date = REFERENCE_DATE) -> None:
+    # create a new database with reproducible synthetic contents
+    rnd = random.Random(seed)
+    open_database(filename, create=True)
+    through = ContractTag.contracts.get_through_model()
+
+    with db.atomic():
+        tag_ids = [ContractTag.insert(name=f"Tag {i}").execute() for i in range(tags)]
+        for first in range(0, contracts, 1000):
+            contract_rows = []
+            for i in range(first, min(first + 1000, contracts)):
+                reminder = today + datetime.timedelta(days=rnd.randint(-60, 300)) if rnd.random() < 0.1 else None
+                company = f"Anbieter {rnd.randrange(contracts // 10 + 1)}"
+                contract_rows.append({'name': f"Vertrag {i}", 'company': company, 'notes': f"Notiz zu Vertrag {i}",
+                                      'reminder': reminder})
+            first_id = Contract.insert_many(contract_rows).execute() - len(contract_rows) + 1
+
+            pricing_rows, document_rows, tag_rows = [], [], []
+            for contract_id in range(first_id, first_id + len(contract_rows)):
+                start = today - datetime.timedelta(days=rnd.randint(0, 365 * 5))
+                for number in range(pricings):
+                    # mostly consecutive pricings, sometimes with gaps, the last one is open-ended
+                    end = None if number == pricings - 1 else start + datetime.timedelta(days=rnd.randint(30, 400))
+                    pricing_rows.append({'contract': contract_id, 'start_date': start, 'end_date': end,
+                                         'price': decimal.Decimal(rnd.randint(100, 20000)) / 100,
+                                         'payment_interval_days': rnd.choice((7, 30, 90, 365))})
+                    if end is not None:
+                        start = end + datetime.timedelta(days=1 if rnd.random() < 0.9 else rnd.randint(2, 30))
+                for number in range(documents):
+                    document_rows.append({'contract': contract_id, 'file': f"dokumente/{contract_id}/{number}.pdf",
+                                          'description': f"Dokument {number}",
+                                          'date': today - datetime.timedelta(days=rnd.randint(0, 365 * 5))})
+                tag_rows.extend({'contracttag': tag_id, 'contract': contract_id}
+                                for tag_id in tag_ids if rnd.random() < tag_density)
+            for model, rows in ((ContractPricing, pricing_rows), (ContractDocument, document_rows),
+                                (through, tag_rows)):
+                for chunk in chunked(rows, 1000):
+                    model.insert_many(chunk).execute()
+        # bulk inserts bypass ContractPricing.save, which keeps the cache up to date otherwise
+        refresh_current_pricing()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Erzeugt eine Datenbank mit synthetischen Verträgen")
+    parser.add_argument('file')
+    parser.add_argument('--contracts', type=int, default=10000)
+    parser.add_argument('--pricings', type=int, default=10, help="Preise je Vertrag")
+    parser.add_argument('--tags', type=int, default=30)
+    parser.add_argument('--tag-density', type=float, default=0.1, help="Wahrscheinlichkeit je Vertrag und Tag")
+    parser.add_argument('--documents', type=int, default=5, help="Dokumente je Vertrag")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--date', type=datetime.date.fromisoformat, default=REFERENCE_DATE,
+                        help="Stichtag der erzeugten Daten (JJJJ-MM-TT)")
+    args = parser.parse_args()
+    generate(args.file, args.contracts, args.pricings, args.tags, args.tag_density, args.documents, args.seed,
+             args.date)
+    db.close_all()
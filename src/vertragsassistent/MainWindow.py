@@ -1,16 +1,22 @@
 import decimal
 
-from PySide6.QtWidgets import *
+# the main window is on the path to the first paint: named imports only (a wildcard import of QtWidgets loads all
+# of its classes), dialogs and rarely used modules are imported on first use
+from PySide6.QtWidgets import QFileDialog, QGridLayout, QGroupBox, QHeaderView, QInputDialog, QLabel, QLineEdit, \
+    QMainWindow, QMessageBox, QPushButton, QRadioButton, QTableView, QWidget
 from PySide6 import QtCore, QtGui
 from Data import *
-from ContractDialog import ContractDialog
 from TagListView import TagListView
+from FileStatus import file_status
+from DocumentStore import document_store
+from TextIndex import text_indexer
+from Executor import executor
+from BackupScheduler import backups
 
 
 class MainWindow(QMainWindow):
     def __init__(self, file: str):
         super().__init__()
-        self._contracts = []
         self._tag_list = []
         self.setWindowTitle(f"Vertragsassistenz ({file})")
         self.setMinimumSize(500, 300)
@@ -29,10 +35,25 @@ class MainWindow(QMainWindow):
         btn_refresh = QPushButton("Neu laden", self)
         window_layout.addWidget(btn_refresh, 0, 1)
         btn_refresh.clicked.connect(self.refresh)
+        btn_missing_docs = QPushButton("Fehlende Dokumente", self)
+        window_layout.addWidget(btn_missing_docs, 0, 2)
+        btn_missing_docs.clicked.connect(self.find_missing_documents)
+        btn_bulk_edit = QPushButton("Sammelbearbeitung", self)
+        window_layout.addWidget(btn_bulk_edit, 0, 3)
+        btn_bulk_edit.clicked.connect(self.bulk_edit)
+        btn_export = QPushButton("Exportieren", self)
+        window_layout.addWidget(btn_export, 0, 4)
+        btn_export.clicked.connect(self.export)
+        btn_bank_import = QPushButton("Kontoauszug importieren", self)
+        window_layout.addWidget(btn_bank_import, 0, 5)
+        btn_bank_import.clicked.connect(self.import_bank_statements)
+        btn_backup = QPushButton("Sichern", self)
+        window_layout.addWidget(btn_backup, 0, 6)
+        btn_backup.clicked.connect(backups().backup_now)
 
         # add list view for the contract tags
         group_contract_tags = QGroupBox("Vertrags Tags", self)
-        window_layout.addWidget(group_contract_tags, 1, 0, 1, 2)
+        window_layout.addWidget(group_contract_tags, 1, 0, 1, 7)
         group_contract_tags_layout = QGridLayout()
         group_contract_tags.setLayout(group_contract_tags_layout)
         self._contract_tags = TagListView()
@@ -52,47 +73,208 @@ class MainWindow(QMainWindow):
 
         # add table for contracts
         group_contracts = QGroupBox("Verträge", self)
-        window_layout.addWidget(group_contracts, 2, 0, 1, 2)
+        window_layout.addWidget(group_contracts, 2, 0, 1, 7)
         window_layout.setRowStretch(2, 1)
         group_contracts_layout = QGridLayout()
         group_contracts.setLayout(group_contracts_layout)
-        group_contracts_layout.addWidget(QLabel("Nur aktuell gültige Preise werden angezeigt"), 0, 0, 1, 0)
-
-        self._table_contracts = QTableWidget()
-        group_contracts_layout.addWidget(self._table_contracts, 1, 0, 1, 0)
-        self._table_contracts.setColumnCount(4)
-        self._table_contracts.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self._table_contracts.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self._table_contracts.cellDoubleClicked.connect(self.open_contract)
-        self._table_contracts.setHorizontalHeaderLabels(["Bezeichnung", "Anbieter", "Preis / Monat", "Preis / Jahr"])
+        group_contracts_layout.addWidget(QLabel("Suche:"), 0, 0)
+        self._input_search = QLineEdit(self, placeholderText="Name, Anbieter, Notizen oder Dokumente",
+                                       clearButtonEnabled=True)
+        self._input_search.textChanged.connect(self.search)
+        group_contracts_layout.addWidget(self._input_search, 0, 1)
+        group_contracts_layout.addWidget(QLabel("Nur aktuell gültige Preise werden angezeigt"), 1, 0, 1, 0)
+
+        self._table_contracts_model = ContractListModel()
+        self._table_contracts_model.totals_changed.connect(self.update_totals)
+        self._table_contracts_proxy = ContractSortModel()
+        self._table_contracts_proxy.setSourceModel(self._table_contracts_model)
+        self._table_contracts = QTableView()
+        self._table_contracts.setModel(self._table_contracts_proxy)
+        group_contracts_layout.addWidget(self._table_contracts, 2, 0, 1, 0)
+        self._table_contracts.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self._table_contracts.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self._table_contracts.setSelectionMode(QTableView.SelectionMode.ExtendedSelection)
+        self._table_contracts.doubleClicked.connect(self.open_contract)
         for col, val in enumerate([QHeaderView.ResizeMode.Interactive, QHeaderView.ResizeMode.Stretch,
                                    QHeaderView.ResizeMode.ResizeToContents, QHeaderView.ResizeMode.ResizeToContents]):
             self._table_contracts.horizontalHeader().setSectionResizeMode(col, val)
+        self._table_contracts.horizontalHeader().setSortIndicator(ContractListModel.col_name,
+                                                                  QtCore.Qt.SortOrder.AscendingOrder)
         self._table_contracts.setSortingEnabled(True)
 
         # add labels for the widget
         font_bold = self.font()
         font_bold.setBold(True)
-        group_contracts_layout.addWidget(QLabel("Selektierter Preis / Monat:"), 2, 0)
+        group_contracts_layout.addWidget(QLabel("Selektierter Preis / Monat:"), 3, 0)
         self._label_price_month = QLabel()
         self._label_price_month.setFont(font_bold)
-        group_contracts_layout.addWidget(self._label_price_month, 2, 1)
-        group_contracts_layout.addWidget(QLabel("Selektierter Preis / Jahr:"), 3, 0)
+        group_contracts_layout.addWidget(self._label_price_month, 3, 1)
+        group_contracts_layout.addWidget(QLabel("Selektierter Preis / Jahr:"), 4, 0)
         self._label_price_year = QLabel()
         self._label_price_year.setFont(font_bold)
-        group_contracts_layout.addWidget(self._label_price_year, 3, 1)
+        group_contracts_layout.addWidget(self._label_price_year, 4, 1)
+        group_contracts_layout.addWidget(QLabel(f"Selektierte Kosten {datetime.date.today().year}:"), 5, 0)
+        self._label_costs_year = QLabel()
+        self._label_costs_year.setFont(font_bold)
+        group_contracts_layout.addWidget(self._label_costs_year, 5, 1)
 
-        self.refresh()
+        executor().changed.connect(self.apply_changes)
+        executor().failed.connect(self.show_error)
+        text_indexer().progress.connect(self.show_indexing)
+        backups().progress.connect(self.show_backup)
+        backups().finished.connect(self.backed_up)
+        # nothing is loaded before the window is painted for the first time
+        self._started = False
+
+    def showEvent(self, event: QtGui.QShowEvent):
+        super().showEvent(event)
+        if not self._started:
+            self._started = True
+            # the first page of contracts follows the first paint, the complete list and the rest after it
+            QtCore.QTimer.singleShot(0, self.start)
+
+    @QtCore.Slot()
+    def start(self):
+        self._table_contracts_model.loaded.connect(self.start_background)
+        self.refresh(first=ContractListModel.fetch_size)
+
+    @QtCore.Slot()
+    def start_background(self):
+        self._table_contracts_model.loaded.disconnect(self.start_background)
+        # documents attached before hashes were known can only be found again with one
+        document_store().backfill()
+        # extract the texts of new and changed documents, continuing where the last session stopped
+        text_indexer().update()
 
     @QtCore.Slot()
     def new_contract(self):
+        # the models update themselves from the changes made in the dialog
+        from ContractDialog import ContractDialog
         ContractDialog().exec()
-        self.refresh()
 
     @QtCore.Slot()
-    def open_contract(self, row: int, _: int):
-        ContractDialog(self._contracts[row]).exec()
-        self.refresh()
+    def open_contract(self, idx: QtCore.QModelIndex):
+        if not idx.isValid():
+            return
+        contract_id = self._table_contracts_model.get_row_id(self._table_contracts_proxy.mapToSource(idx).row())
+        executor().read(lambda: Contract.get_by_id(contract_id), self.edit_contract, context=self)
+
+    def edit_contract(self, contract: Contract):
+        from ContractDialog import ContractDialog
+        ContractDialog(contract).exec()
+
+    @QtCore.Slot()
+    def bulk_edit(self):
+        # the selected contracts, all shown ones without selection
+        rows = self._table_contracts.selectionModel().selectedRows()
+        if rows:
+            contract_ids = [self._table_contracts_model.get_row_id(self._table_contracts_proxy.mapToSource(idx).row())
+                            for idx in rows]
+        else:
+            contract_ids = self._table_contracts_model.get_ids()
+        if contract_ids:
+            from BulkEditDialog import BulkEditDialog
+            BulkEditDialog(contract_ids).exec()
+
+    @QtCore.Slot()
+    def export(self):
+        # all contracts matching the tag filter with their pricings, tags and documents, one file each
+        formats = {"CSV": 'csv', "JSON Lines": 'jsonl'}
+        fmt, ok = QInputDialog.getItem(self, "Exportieren", "Format:", list(formats), editable=False)
+        if not ok:
+            return
+        directory = QFileDialog.getExistingDirectory(self, "Exportieren nach", os.path.dirname(db.database))
+        if len(directory) == 0:
+            return
+        prefix = os.path.splitext(os.path.basename(db.database))[0] + '_'
+        tags, match_all = self._tag_list, not self._radio_tag_sort_or.isChecked()
+        self.statusBar().showMessage("Export läuft...")
+        from Export import export as export_files
+
+        def export() -> dict[str, int] | str:
+            try:
+                return export_files(directory, prefix, formats[fmt], tags, match_all)
+            except OSError as e:
+                return str(e)
+
+        executor().read(export, self.exported, context=self)
+
+    def exported(self, counts: dict[str, int] | str):
+        if isinstance(counts, str):
+            self.statusBar().clearMessage()
+            QMessageBox.warning(self, "Exportieren", f"Export fehlgeschlagen: {counts}")
+            return
+        self.statusBar().showMessage(f"{counts['contracts']} Verträge exportiert", 5000)
+
+    @QtCore.Slot(object)
+    def show_error(self, error: Exception):
+        # a read or write failed in the background, e.g. a locked or damaged file
+        import traceback
+        self.statusBar().clearMessage()
+        box = QMessageBox(QMessageBox.Icon.Critical, "Fehler", f"Die Aktion ist fehlgeschlagen: {error}", parent=self)
+        box.setDetailedText(''.join(traceback.format_exception(error)))
+        box.exec()
+
+    @QtCore.Slot()
+    def import_bank_statements(self):
+        # recurring payments of the statements become proposals for the pricings of the matching contracts
+        paths, _ = QFileDialog.getOpenFileNames(self, "Kontoauszüge importieren", filter="CSV (*.csv *.txt)")
+        if paths:
+            from BankImportDialog import BankImportDialog
+            BankImportDialog(paths).exec()
+
+    @QtCore.Slot()
+    def find_missing_documents(self):
+        executor().read(lambda: list(ContractDocument.select(ContractDocument, Contract)
+                                     .join(Contract)
+                                     .order_by(Contract.name, ContractDocument.date, ContractDocument.description)),
+                        self.report_missing_documents, context=self)
+
+    def report_missing_documents(self, docs: list[ContractDocument]):
+        def report():
+            missing = [doc for doc in docs if file_status().exists(doc.absolute_file) is False]
+            box = QMessageBox(QMessageBox.Icon.Information, "Fehlende Dokumente",
+                              f"{len(missing)} von {len(docs)} Dokumenten fehlen.", parent=self)
+            btn_relink = None
+            if missing:
+                box.setDetailedText('\n'.join(f"{doc.contract.name}: {doc.description} ({doc.file})"
+                                               for doc in missing))
+                btn_relink = box.addButton("Ordner durchsuchen...", QMessageBox.ButtonRole.ActionRole)
+                box.addButton(QMessageBox.StandardButton.Ok)
+            box.exec()
+            if btn_relink is not None and box.clickedButton() == btn_relink:
+                self.relink_documents()
+
+        # the existence of the files is checked in the background, report as soon as all are known
+        file_status().when_checked((doc.absolute_file for doc in docs), report)
+
+    def relink_documents(self):
+        # moved files are recognized by their contents
+        folder = QFileDialog.getExistingDirectory(self, "Verschobene Dokumente suchen", os.path.dirname(db.database))
+        if len(folder) == 0:
+            return
+        document_store().relink(folder, lambda count: QMessageBox.information(
+            self, "Fehlende Dokumente", f"{count} Dokumente wurden wiedergefunden."))
+
+    @QtCore.Slot(int, int)
+    def show_indexing(self, done: int, total: int):
+        if done < total:
+            self.statusBar().showMessage(f"Texte der Dokumente werden erfasst: {done} von {total}")
+        else:
+            self.statusBar().clearMessage()
+
+    @QtCore.Slot(int, int)
+    def show_backup(self, done: int, total: int):
+        self.statusBar().showMessage(f"Sicherung läuft: {done * 100 // max(total, 1)} %")
+
+    @QtCore.Slot(str, str)
+    def backed_up(self, file: str, error: str):
+        if error:
+            QMessageBox.warning(self, "Sicherung", f"Die Sicherung ist fehlgeschlagen:\n{error}")
+        elif file:
+            self.statusBar().showMessage(f"Gesichert nach {file}", 5000)
+        else:
+            self.statusBar().clearMessage()
 
     @QtCore.Slot(object)
     def apply_tag_filter(self, tag_list: list[ContractTag]):
@@ -100,46 +282,292 @@ class MainWindow(QMainWindow):
         self.refresh()
 
     @QtCore.Slot()
-    def refresh(self):
+    def refresh(self, first: int = 0):
+        # the cached pricings may have expired since the last refresh, reads issued afterwards wait for this
+        executor().write(roll_current_pricing)
+        # select all items, where all selected tags match (UND) or any tag is in the list of tags (ODER)
+        self._table_contracts_model.reload(self._tag_list, not self._radio_tag_sort_or.isChecked(), first)
         self._contract_tags.reload()
-        self._table_contracts.clearContents()
-        self._table_contracts.setRowCount(0)
-        self._contracts.clear()
-
-        query = Contract.select().order_by(Contract.name, Contract.company)
-        total_price_month = decimal.Decimal(0)
-        total_price_year = decimal.Decimal(0)
-        if self._tag_list:
-            if self._radio_tag_sort_or.isChecked():
-                # select all items, where any tag is in the list of tags
-                sel = any
+        self.reload_costs_year()
+
+    @QtCore.Slot(str)
+    def search(self, text: str):
+        # show the best matches first while searching, otherwise order by name
+        header = self._table_contracts.horizontalHeader()
+        if text.strip() and not self._table_contracts_model.searching:
+            header.setSortIndicator(-1, QtCore.Qt.SortOrder.AscendingOrder)
+        elif not text.strip() and self._table_contracts_model.searching:
+            header.setSortIndicator(ContractListModel.col_name, QtCore.Qt.SortOrder.AscendingOrder)
+        self._table_contracts_model.search(text)
+
+    @QtCore.Slot(object)
+    def apply_changes(self, changes: list[Change]):
+        if any(change.model in (Contract, ContractPricing, ContractTag.contracts.get_through_model())
+               for change in changes):
+            self.reload_costs_year()
+
+    def reload_costs_year(self):
+        # costs of the calendar year according to all pricings, not only the currently active ones
+        tags, match_all, year = self._tag_list, not self._radio_tag_sort_or.isChecked(), datetime.date.today().year
+        executor().read(lambda: costs_of_year(tags, match_all, year), self.update_costs_year,
+                        key=self._label_costs_year, context=self)
+
+    @QtCore.Slot()
+    def update_totals(self):
+        self._label_price_month.setText(f"{round(self._table_contracts_model.total_price_month, 2)} €")
+        self._label_price_year.setText(f"{round(self._table_contracts_model.total_price_year, 2)} €")
+
+    def update_costs_year(self, total: float):
+        self._label_costs_year.setText(f"{total:.2f} €")
+
+
+def costs_of_year(tags: list[ContractTag], match_all: bool, year: int) -> float:
+    # numpy is loaded by the first call, in the worker thread instead of before the first paint
+    from Projection import CostProjection
+    return CostProjection.load(tags, match_all).total(datetime.date(year, 1, 1), datetime.date(year, 12, 31))
+
+
+class ContractListModel(QtCore.QAbstractTableModel):
+    totals_changed = QtCore.Signal()
+    # all rows matching the filter arrived
+    loaded = QtCore.Signal()
+    col_name = 0
+    col_company = 1
+    col_price_month = 2
+    col_price_year = 3
+    fetch_size = 256
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # rows are kept as (id, name, company, price / month, price / year, reminder due)
+        self._rows: list[tuple] = []
+        self._fetched = 0
+        self.total_price_month = decimal.Decimal(0)
+        self.total_price_year = decimal.Decimal(0)
+        self._tags: list[ContractTag] = []
+        self._match_all = True
+        self._search = ''
+        # all rows matching the tag filter ordered by name, and the contracts matching the search (with their rank)
+        self._loaded: list[tuple] = []
+        self._matches: dict[int, int] | None = None
+        self._ranked = False
+        # the first rows belong to the latest reload only and are not shown once all rows are there
+        self._reloads = 0
+        self._complete = 0
+        executor().changed.connect(self.apply_changes)
+
+    def reload(self, tags: list[ContractTag] | None = None, match_all: bool = True, first: int = 0):
+        # with first, that many rows are shown on their own before all of them, e.g. while starting
+        self._tags, self._match_all = list(tags or []), match_all
+        tags = self._tags
+        self._reloads += 1
+        if first:
+            reload = self._reloads
+            executor().read(lambda: self._load(tags, match_all, limit=first),
+                            lambda rows: self._set_first(rows, reload), key=(self, 'first'), context=self)
+        executor().read(lambda: self._load(tags, match_all), self._set_loaded, key=self, context=self)
+
+    @property
+    def searching(self) -> bool:
+        return bool(self._search.strip())
+
+    def search(self, text: str):
+        # the search only narrows down the loaded rows, every keystroke runs a single full text query
+        self._search = text
+        executor().read(lambda: search_contracts(text), self._set_matches, key=(self, 'search'), context=self)
+
+    @QtCore.Slot(object)
+    def apply_changes(self, changes: list[Change]):
+        # reload only the rows of affected contracts, they may also have entered or left the filters
+        through = ContractTag.contracts.get_through_model()
+        # document descriptions only matter for the search
+        models = (Contract, ContractPricing, through) + ((ContractDocument,) if self.searching else ())
+        deleted = {change.id for change in changes if change.model is Contract and change.action == 'deleted'}
+        affected = {change.contract for change in changes
+                    if change.model in models and change.contract not in deleted}
+        if deleted:
+            self._patch(deleted, [], None)
+        if affected:
+            tags, match_all, search = self._tags, self._match_all, self._search
+            executor().read(lambda: (self._load(tags, match_all, list(affected)),
+                                     search_contracts(search, list(affected))),
+                            lambda result: self._patch(affected, *result), context=self)
+
+    @staticmethod
+    def _load(tags: list[ContractTag], match_all: bool, contract_ids: list[int] | None = None,
+              limit: int | None = None) -> list[tuple]:
+        today = datetime.date.today().isoformat()
+        query = current_overview(tags, match_all)\
+            .select(Contract.id, Contract.name, Contract.company, Contract.reminder,
+                    CurrentPricing.pricing, CurrentPricing.per_month, CurrentPricing.per_year)
+        if contract_ids is not None:
+            query = query.where(Contract.id.in_(contract_ids))
+        if limit is not None:
+            query = query.limit(limit)
+        # plain cursor rows, converting every value in peewee takes longer than the query itself
+        rows = []
+        no_costs = tuple(decimal.Decimal(str(value)) for value in costs(None, None))
+        for contract_id, name, company, reminder, pricing_id, per_month, per_year in db.execute(query).fetchall():
+            if pricing_id is None:
+                per_month, per_year = no_costs
+            else:
+                per_month, per_year = decimal.Decimal(f"{per_month:.2f}"), decimal.Decimal(f"{per_year:.2f}")
+            rows.append((contract_id, name, company, per_month, per_year, reminder is not None and reminder <= today))
+        return rows
+
+    def _set_first(self, rows: list[tuple], reload: int):
+        if reload == self._reloads and self._complete != reload:
+            self._loaded = rows
+            self._show()
+
+    def _set_loaded(self, rows: list[tuple]):
+        self._complete = self._reloads
+        self._loaded = rows
+        self._show()
+        self.loaded.emit()
+
+    def _set_matches(self, result: tuple[list[int], bool] | None):
+        if result is None:
+            self._matches = None
+        else:
+            ids, ranked = result
+            self._matches = {contract_id: position if ranked else 0 for position, contract_id in enumerate(ids)}
+            self._ranked = ranked
+        self._show()
+
+    def _show(self):
+        self.beginResetModel()
+        if self._matches is None:
+            self._rows = list(self._loaded)
+        else:
+            self._rows = [row for row in self._loaded if row[0] in self._matches]
+            if self._ranked:
+                self._rows.sort(key=lambda row: self._matches[row[0]])
+        self._fetched = min(len(self._rows), self.fetch_size)
+        self.endResetModel()
+        self._update_totals()
+
+    def _update_totals(self):
+        self.total_price_month = sum((row[3] for row in self._rows), decimal.Decimal(0))
+        self.total_price_year = sum((row[4] for row in self._rows), decimal.Decimal(0))
+        self.totals_changed.emit()
+
+    def _patch(self, contract_ids: set[int], rows: list[tuple], matching: tuple[list[int], bool] | None):
+        # rows are the ones of the given contracts still matching the tag filter, matching the ones matching the search
+        patched = {row[0]: row for row in rows}
+        self._loaded = [patched.pop(row[0], row) for row in self._loaded
+                        if row[0] not in contract_ids or row[0] in patched] + list(patched.values())
+        if self._matches is not None:
+            matching = set() if matching is None else set(matching[0])
+            for contract_id in contract_ids:
+                if contract_id in matching:
+                    self._matches.setdefault(contract_id, len(self._matches))
+                else:
+                    self._matches.pop(contract_id, None)
+            rows = [row for row in rows if row[0] in self._matches]
+        self._patch_rows(contract_ids, rows)
+
+    def _patch_rows(self, contract_ids: set[int], rows: list[tuple]):
+        # replace, insert or remove the shown rows of the given contracts
+        positions = {row[0]: position for position, row in enumerate(self._rows) if row[0] in contract_ids}
+        for row in rows:
+            position = positions.pop(row[0], None)
+            if position is None:
+                # new rows are shown right away, the proxy sorts them in
+                self.beginInsertRows(QtCore.QModelIndex(), self._fetched, self._fetched)
+                self._rows.insert(self._fetched, row)
+                self._fetched += 1
+                self.endInsertRows()
+                positions = {key: value + 1 if value >= self._fetched - 1 else value
+                             for key, value in positions.items()}
+            elif self._rows[position] != row:
+                self._rows[position] = row
+                if position < self._fetched:
+                    self.dataChanged.emit(self.index(position, 0), self.index(position, self.columnCount() - 1))
+        for position in sorted(positions.values(), reverse=True):
+            if position < self._fetched:
+                self.beginRemoveRows(QtCore.QModelIndex(), position, position)
+                del self._rows[position]
+                self._fetched -= 1
+                self.endRemoveRows()
             else:
-                # select all items, where all selected tags match
-                sel = all
-            query = filter(lambda con: sel((sel_tag in con.tags) for sel_tag in self._tag_list), query)
-        for row, contract in enumerate(query):
-            today = datetime.date.today()
-            active_pricing_query = ContractPricing.select()\
-                .where((ContractPricing.contract == contract) & (ContractPricing.start_date <= today)
-                       & ((ContractPricing.end_date >> None) | (ContractPricing.end_date >= today)))\
-                .order_by(ContractPricing.start_date.desc()).limit(1)
-            pricing = None if len(active_pricing_query) == 0 else active_pricing_query[0]
-
-            self._table_contracts.setRowCount(row + 1)
-            self._contracts.append(contract)
-            price = 0 if pricing is None else pricing.price
-            interval = 365 if pricing is None else pricing.payment_interval_days
-            per_day = price / interval
-            per_month = round(per_day * 30, 2)
-            per_year = round(per_day * 365, 2)
-            total_price_month += decimal.Decimal(per_month)
-            total_price_year += decimal.Decimal(per_year)
-            first_item = QTableWidgetItem(contract.name)
-            if contract.reminder is not None and contract.reminder <= today:
-                first_item.setData(QtCore.Qt.ItemDataRole.BackgroundRole, QtGui.QColor(180, 180, 255))
-            self._table_contracts.setItem(row, 0, first_item)
-            self._table_contracts.setItem(row, 1, QTableWidgetItem(contract.company))
-            self._table_contracts.setItem(row, 2, QTableWidgetItem(str(per_month)))
-            self._table_contracts.setItem(row, 3, QTableWidgetItem(str(per_year)))
-        self._label_price_month.setText(f"{round(total_price_month, 2)} €")
-        self._label_price_year.setText(f"{round(total_price_year, 2)} €")
+                del self._rows[position]
+        self._update_totals()
+
+    def get_row_id(self, row: int) -> int:
+        return self._rows[row][0]
+
+    def get_ids(self) -> list[int]:
+        # all shown contracts, including the ones not fetched yet
+        return [row[0] for row in self._rows]
+
+    def fetch_all(self):
+        if self.canFetchMore(QtCore.QModelIndex()):
+            self.beginInsertRows(QtCore.QModelIndex(), self._fetched, len(self._rows) - 1)
+            self._fetched = len(self._rows)
+            self.endInsertRows()
+
+    def canFetchMore(self, parent: QtCore.QModelIndex | QtCore.QPersistentModelIndex, /) -> bool:
+        return not parent.isValid() and self._fetched < len(self._rows)
+
+    def fetchMore(self, parent: QtCore.QModelIndex | QtCore.QPersistentModelIndex, /):
+        if not self.canFetchMore(parent):
+            return
+        count = min(self.fetch_size, len(self._rows) - self._fetched)
+        self.beginInsertRows(QtCore.QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
+
+    def columnCount(self, /, parent: QtCore.QModelIndex | QtCore.QPersistentModelIndex = ...):
+        return 4
+
+    def rowCount(self, /, parent: QtCore.QModelIndex | QtCore.QPersistentModelIndex = ...):
+        return self._fetched
+
+    def flags(self, index: QtCore.QModelIndex | QtCore.QPersistentModelIndex, /):
+        return QtCore.Qt.ItemFlag.ItemIsEnabled | QtCore.Qt.ItemFlag.ItemIsSelectable
+
+    def headerData(self, section: int, orientation: QtCore.Qt.Orientation, /, role: int = ...):
+        if role != QtCore.Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == QtCore.Qt.Orientation.Horizontal:
+            if section == self.col_name:
+                return "Bezeichnung"
+            if section == self.col_company:
+                return "Anbieter"
+            if section == self.col_price_month:
+                return "Preis / Monat"
+            if section == self.col_price_year:
+                return "Preis / Jahr"
+        else:
+            return section + 1
+
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        row = self._rows[index.row()]
+        if role == QtCore.Qt.ItemDataRole.DisplayRole:
+            if index.column() in (self.col_price_month, self.col_price_year):
+                return str(row[index.column() + 1])
+            return row[index.column() + 1]
+        if role == QtCore.Qt.ItemDataRole.UserRole:
+            # sort prices by their numeric value
+            if index.column() in (self.col_price_month, self.col_price_year):
+                return float(row[index.column() + 1])
+            return row[index.column() + 1]
+        if role == QtCore.Qt.ItemDataRole.BackgroundRole and index.column() == self.col_name and row[5]:
+            return QtGui.QColor(180, 180, 255)
+
+
+class ContractSortModel(QtCore.QSortFilterProxyModel):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.setSortRole(QtCore.Qt.ItemDataRole.UserRole)
+
+    def setSourceModel(self, source_model: ContractListModel, /):
+        super().setSourceModel(source_model)
+        source_model.modelReset.connect(lambda: self.sort(self.sortColumn(), self.sortOrder()))
+
+    def sort(self, column: int, /, order: QtCore.Qt.SortOrder = QtCore.Qt.SortOrder.AscendingOrder):
+        # rows are fetched ordered by name, every other order needs all rows to be known
+        if column >= 0 and (column != ContractListModel.col_name or order != QtCore.Qt.SortOrder.AscendingOrder):
+            self.sourceModel().fetch_all()
+        super().sort(column, order)
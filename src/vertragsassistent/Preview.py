@@ -0,0 +1,233 @@
+from PySide6 import QtCore, QtGui
+from collections import OrderedDict
+import hashlib
+import os
+import queue
+import threading
+
+try:
+    from PySide6 import QtPdf
+except ImportError:
+    # part of the optional addons, pdf files get no preview without it
+    QtPdf = None
+
+# edge length of previews, thumbnails are scaled down from them
+PREVIEW_SIZE = 256
+THUMBNAIL_SIZE = 48
+TEXT_EXTENSIONS = {'.txt', '.text', '.md', '.csv', '.log'}
+# text is drawn by one worker at a time, painting in several workers at once crashes PySide6
+_text_lock = threading.Lock()
+
+
+def can_preview(path: str) -> bool:
+    extension = os.path.splitext(path)[1].lower()
+    return extension in TEXT_EXTENSIONS or (extension == '.pdf' and QtPdf is not None) \
+        or extension[1:].encode() in QtGui.QImageReader.supportedImageFormats()
+
+
+def render_preview(path: str) -> QtGui.QImage | None:
+    # render the first page of the file into an image of at most PREVIEW_SIZE, safe outside of the GUI thread
+    extension = os.path.splitext(path)[1].lower()
+    if extension in TEXT_EXTENSIONS:
+        return _render_text(path)
+    if extension == '.pdf':
+        if QtPdf is None:
+            return None
+        document = QtPdf.QPdfDocument()
+        document.load(path)
+        if document.pageCount() == 0:
+            return None
+        size = document.pagePointSize(0).toSize().scaled(PREVIEW_SIZE, PREVIEW_SIZE,
+                                                         QtCore.Qt.AspectRatioMode.KeepAspectRatio)
+        image = document.render(0, size)
+        document.close()
+    else:
+        reader = QtGui.QImageReader(path)
+        reader.setAutoTransform(True)
+        # large photos are decoded at the reduced size where the format supports it
+        if reader.size().isValid():
+            reader.setScaledSize(reader.size().scaled(PREVIEW_SIZE, PREVIEW_SIZE,
+                                                      QtCore.Qt.AspectRatioMode.KeepAspectRatio))
+        image = reader.read()
+    return None if image.isNull() else image
+
+
+def _render_text(path: str) -> QtGui.QImage | None:
+    try:
+        with open(path, 'rb') as file:
+            lines = file.read(4096).decode('utf-8', errors='replace').splitlines()[:30]
+    except OSError:
+        return None
+    with _text_lock:
+        image = QtGui.QImage(PREVIEW_SIZE * 3 // 4, PREVIEW_SIZE, QtGui.QImage.Format.Format_RGB32)
+        image.fill(QtGui.QColor(255, 255, 255))
+        painter = QtGui.QPainter(image)
+        font = painter.font()
+        font.setPixelSize(8)
+        painter.setFont(font)
+        painter.setPen(QtGui.QColor(60, 60, 60))
+        for number, line in enumerate(lines):
+            painter.drawText(4, 10 + number * 8, line)
+        painter.end()
+    return image
+
+
+class PreviewCache(QtCore.QObject):
+    # the preview of the file is known now
+    ready = QtCore.Signal(str)
+    _rendered = QtCore.Signal(str, object)
+    # previews kept on disk and in memory
+    max_bytes = 64 * 1024 * 1024
+    max_images = 200
+
+    def __init__(self, directory: str | None = None, **kwargs):
+        super().__init__(**kwargs)
+        if directory is None:
+            location = QtCore.QStandardPaths.StandardLocation.CacheLocation
+            directory = os.path.join(QtCore.QStandardPaths.writableLocation(location), 'vorschau')
+        self._directory = directory
+        # least recently used first; None for files without preview
+        self._images: OrderedDict[str, QtGui.QImage | None] = OrderedDict()
+        self._thumbnails: OrderedDict[str, QtGui.QPixmap] = OrderedDict()
+        self._pending: set[str] = set()
+        self._queue = queue.SimpleQueue()
+        self._cancelled = threading.Event()
+        # bytes on disk, None until counted
+        self._disk_bytes: int | None = None
+        self._disk_lock = threading.Lock()
+        self._rendered.connect(self._store)
+
+        self._pool = QtCore.QThreadPool(self)
+        self._pool.setMaxThreadCount(2)
+
+    def preview(self, path: str) -> QtGui.QImage | None:
+        # the preview if known, otherwise it is rendered in the background and announced by ready
+        if path in self._images:
+            self._images.move_to_end(path)
+            return self._images[path]
+        if can_preview(path) and path not in self._pending:
+            self._pending.add(path)
+            self._queue.put(path)
+            self._pool.start(_PreviewWorker(self, self._queue, self._cancelled, self._rendered))
+        return None
+
+    def thumbnail(self, path: str) -> QtGui.QPixmap | None:
+        if path in self._thumbnails:
+            self._thumbnails.move_to_end(path)
+            return self._thumbnails[path]
+        image = self.preview(path)
+        if image is None:
+            return None
+        thumbnail = QtGui.QPixmap.fromImage(image.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE,
+                                                         QtCore.Qt.AspectRatioMode.KeepAspectRatio,
+                                                         QtCore.Qt.TransformationMode.SmoothTransformation))
+        self._thumbnails[path] = thumbnail
+        if len(self._thumbnails) > self.max_images:
+            self._thumbnails.popitem(last=False)
+        return thumbnail
+
+    def forget(self, path: str):
+        # the file changed, render it again on the next request
+        self._images.pop(path, None)
+        self._thumbnails.pop(path, None)
+
+    def cancel(self):
+        self._cancelled.set()
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._pool.waitForDone()
+        self._cancelled.clear()
+        self._pending.clear()
+
+    def cached_image(self, path: str) -> QtGui.QImage | None:
+        # the preview from the disk cache or rendered and stored there, called by the workers
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = hashlib.sha1(f"{path}\0{stat.st_mtime_ns}\0{stat.st_size}".encode()).hexdigest()
+        cached = os.path.join(self._directory, key[:2], key + '.png')
+        if os.path.isfile(cached):
+            image = QtGui.QImage(cached)
+            if not image.isNull():
+                # the modification time orders the entries for eviction
+                os.utime(cached)
+                return image
+        image = render_preview(path)
+        if image is not None:
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            temporary = cached + f".{threading.get_ident()}.tmp"
+            if image.save(temporary, 'PNG'):
+                os.replace(temporary, cached)
+                self._account(os.path.getsize(cached))
+        return image
+
+    def _account(self, size: int):
+        # drop the least recently used previews once the cache exceeds its size
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(entry.stat().st_size for entry in self._entries())
+            else:
+                self._disk_bytes += size
+            if self._disk_bytes <= self.max_bytes:
+                return
+            entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+            self._disk_bytes = sum(entry.stat().st_size for entry in entries)
+            for entry in entries:
+                if self._disk_bytes <= self.max_bytes * 3 // 4:
+                    break
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    continue
+                self._disk_bytes -= entry.stat().st_size
+
+    def _entries(self) -> list[os.DirEntry]:
+        entries = []
+        for directory in os.scandir(self._directory):
+            if directory.is_dir():
+                entries.extend(entry for entry in os.scandir(directory.path) if entry.name.endswith('.png'))
+        return entries
+
+    @QtCore.Slot(str, object)
+    def _store(self, path: str, image: QtGui.QImage | None):
+        if path not in self._pending:
+            # cancelled
+            return
+        self._pending.discard(path)
+        self._images[path] = image
+        if len(self._images) > self.max_images:
+            self._images.popitem(last=False)
+        self.ready.emit(path)
+
+
+class _PreviewWorker(QtCore.QRunnable):
+    def __init__(self, cache: PreviewCache, paths: queue.SimpleQueue, cancelled: threading.Event,
+                 rendered: QtCore.SignalInstance):
+        super().__init__()
+        self._cache = cache
+        self._paths = paths
+        self._cancelled = cancelled
+        self._rendered = rendered
+
+    def run(self):
+        while not self._cancelled.is_set():
+            try:
+                path = self._paths.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                image = self._cache.cached_image(path)
+            except OSError:
+                image = None
+            self._rendered.emit(path, image)
+
+
+_cache: PreviewCache | None = None
+
+
+def previews() -> PreviewCache:
+    global _cache
+    if _cache is None:
+        _cache = PreviewCache()
+    return _cache
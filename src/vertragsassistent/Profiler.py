@@ -0,0 +1,176 @@
+from collections.abc import Callable
+from Data import db
+import functools
+import json
+import threading
+import time
+
+
+class Action:
+    __slots__ = ('name', 'parent', 'start', 'end', 'queries')
+
+    def __init__(self, name: str, parent: 'Action | None' = None):
+        self.name = name
+        self.parent = parent
+        self.start = time.time()
+        self.end = self.start
+        self.queries: list[dict] = []
+
+    def finish(self):
+        # an action lasts until the work of all nested actions is done
+        self.end = max(self.end, time.time())
+        if self.parent is not None:
+            self.parent.finish()
+
+    def to_dict(self) -> dict:
+        return {'action': self.name, 'parent': None if self.parent is None else self.parent.name,
+                'start': self.start, 'wall_ms': round((self.end - self.start) * 1000, 3),
+                'statements': len(self.queries), 'rows': sum(query['rows'] for query in self.queries),
+                'queries': self.queries}
+
+
+class Profiler:
+    def __init__(self, filename: str):
+        self._filename = filename
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._actions: list[Action] = []
+        self._other = Action('(ohne Aktion)')
+
+    def current(self) -> Action | None:
+        return getattr(self._local, 'action', None)
+
+    def run(self, action: Action | None, func: Callable, *args, **kwargs):
+        # run func with all its statements attributed to the action
+        previous = self.current()
+        self._local.action = action
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._local.action = previous
+
+    def action(self, name: str, func: Callable, *args, **kwargs):
+        action = Action(name, self.current())
+        with self._lock:
+            self._actions.append(action)
+        try:
+            return self.run(action, func, *args, **kwargs)
+        finally:
+            action.finish()
+
+    def record(self, sql: str, duration: float) -> dict:
+        query = {'sql': sql, 'ms': round(duration * 1000, 3), 'rows': 0, 'thread': threading.current_thread().name}
+        action = self.current() or self._other
+        with self._lock:
+            action.queries.append(query)
+        return query
+
+    def dump(self):
+        with self._lock, open(self._filename, 'w') as f:
+            for action in self._actions + [self._other]:
+                f.write(json.dumps(action.to_dict()) + '\n')
+
+
+class _CountingCursor:
+    # counts fetched rows and the time spent fetching them for the recorded statement
+    def __init__(self, cursor, query: dict):
+        self._cursor = cursor
+        self._query = query
+
+    def __getattr__(self, item):
+        return getattr(self._cursor, item)
+
+    def __iter__(self):
+        while (row := self.fetchone()) is not None:
+            yield row
+
+    def _fetch(self, func: Callable, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self._query['ms'] = round(self._query['ms'] + (time.perf_counter() - start) * 1000, 3)
+        return result
+
+    def fetchone(self):
+        row = self._fetch(self._cursor.fetchone)
+        if row is not None:
+            self._query['rows'] += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._fetch(self._cursor.fetchmany, *args)
+        self._query['rows'] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(self._cursor.fetchall)
+        self._query['rows'] += len(rows)
+        return rows
+
+
+_profiler: Profiler | None = None
+
+
+def profiler() -> Profiler | None:
+    return _profiler
+
+
+def enable(filename: str):
+    # record all statements and the UI actions they belong to, written as JSON lines on dump()
+    global _profiler
+    _profiler = Profiler(filename)
+
+    execute_sql = db.execute_sql
+
+    def profiled_execute_sql(sql, *args, **kwargs):
+        start = time.perf_counter()
+        cursor = execute_sql(sql, *args, **kwargs)
+        return _CountingCursor(cursor, _profiler.record(sql, time.perf_counter() - start))
+
+    db.execute_sql = profiled_execute_sql
+
+    # statements running in the background belong to the action which issued them
+    from Executor import QueryExecutor
+    for name in ('read', 'write'):
+        _instrument_executor(QueryExecutor, name)
+
+    import MainWindow
+    import ContractDialog
+    import TagListView
+    for cls, names in ((MainWindow.MainWindow, ('refresh', 'apply_tag_filter', 'search', 'open_contract',
+                                                'new_contract', 'apply_changes')),
+                       (MainWindow.ContractListModel, ('reload', 'apply_changes')),
+                       (TagListView.TagListModel, ('reload', 'setData', 'apply_changes')),
+                       (ContractDialog.ContractDialog, ('save_contract', 'delete_contract', 'new_pricing')),
+                       (ContractDialog.ContractModel, ('reload', 'setData', 'removeRow', 'apply_changes')),
+                       (ContractDialog.DocumentModel, ('reload', 'removeRow', 'apply_changes'))):
+        for name in names:
+            _instrument(cls, name)
+
+
+def _instrument(cls: type, name: str):
+    method = getattr(cls, name)
+
+    @functools.wraps(method)
+    def profiled(*args, **kwargs):
+        return _profiler.action(f"{cls.__name__}.{name}", method, *args, **kwargs)
+
+    setattr(cls, name, profiled)
+
+
+def _instrument_executor(cls: type, name: str):
+    method = getattr(cls, name)
+
+    @functools.wraps(method)
+    def profiled(self, func: Callable, callback: Callable | None = None, /, **kwargs):
+        action = _profiler.current()
+        if action is None:
+            return method(self, func, callback, **kwargs)
+
+        def done(result):
+            action.finish()
+            if callback is not None:
+                _profiler.run(action, callback, result)
+
+        return method(self, lambda: _profiler.run(action, func), done, **kwargs)
+
+    setattr(cls, name, profiled)
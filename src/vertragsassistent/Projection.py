@@ -0,0 +1,159 @@
+import datetime
+import numpy
+from Data import *
+
+# julianday() of 0001-01-01 is 1721425.5, whereas its date.toordinal() is 1
+_ORDINAL_OFFSET = 1721424.5
+_OPEN_END = 1e9
+_CHUNK_CELLS = 2_000_000
+
+
+class CostProjection:
+    # all pricings as columns, resolved to non-overlapping segments per contract, sorted by contract and start;
+    # where pricings overlap, the one started last applies (like the overview does)
+
+    def __init__(self, contracts: numpy.ndarray, starts: numpy.ndarray, ends: numpy.ndarray, rates: numpy.ndarray,
+                 tag_pairs: numpy.ndarray):
+        self._contracts, self._starts, self._ends, self._rates = _resolve(contracts, starts, ends, rates)
+        # (contract id, tag id) for every tag assignment
+        self._tag_pairs = tag_pairs
+
+    @classmethod
+    def load(cls, tags: list[ContractTag] | None = None, match_all: bool = True) -> 'CostProjection':
+        query = ContractPricing.select(ContractPricing.contract,
+                                       fn.julianday(ContractPricing.start_date) - _ORDINAL_OFFSET,
+                                       fn.COALESCE(fn.julianday(ContractPricing.end_date) - _ORDINAL_OFFSET,
+                                                   _OPEN_END),
+                                       # the outer cast keeps peewee from converting the rate to an integer
+                                       (ContractPricing.price.cast('REAL') / ContractPricing.payment_interval_days)
+                                       .cast('REAL'))\
+            .order_by(ContractPricing.contract, ContractPricing.start_date, ContractPricing.id)
+        through = ContractTag.contracts.get_through_model()
+        pairs = through.select(through.contract, through.contracttag)
+        if tags:
+            query = query.where(ContractPricing.contract.in_(contracts_by_tags(tags, match_all)))
+            pairs = pairs.where(through.contract.in_(contracts_by_tags(tags, match_all)))
+
+        # plain cursor rows, converting every value in peewee would take longer than all of the computation
+        columns = numpy.array(db.execute(query).fetchall(), dtype=numpy.float64).reshape(-1, 4)
+        tag_pairs = numpy.array(db.execute(pairs).fetchall(), dtype=numpy.int64).reshape(-1, 2)
+        return cls(columns[:, 0].astype(numpy.int64), columns[:, 1], columns[:, 2], columns[:, 3], tag_pairs)
+
+    def rates_on(self, date: datetime.date) -> dict[int, float]:
+        # cost per day of every contract with a pricing on the date
+        day = date.toordinal()
+        active = (self._starts <= day) & (self._ends >= day)
+        return dict(zip(self._contracts[active].tolist(), self._rates[active].tolist()))
+
+    def total(self, first: datetime.date, last: datetime.date) -> float:
+        return float(self.costs(first, last, 'year')[2].sum())
+
+    def costs(self, first: datetime.date, last: datetime.date, unit: str = 'month', by: str | None = None)\
+            -> tuple[list[datetime.date], list, numpy.ndarray]:
+        # costs between first and last (inclusive) per day, month or year, in total or by contract or tag;
+        # returns the start of every period, the keys of the groups and a matrix groups x periods
+        periods = _periods(first, last, unit)
+        bounds = numpy.array([period.toordinal() for period in periods] + [last.toordinal() + 1], dtype=numpy.float64)
+        if by is None:
+            return periods, [None], self._total_costs(bounds)[None, :]
+        contracts, costs = self._contract_costs(bounds)
+        if by == 'contract':
+            return periods, contracts.tolist(), costs
+        if by == 'tag':
+            tags = numpy.unique(self._tag_pairs[:, 1])
+            rows = numpy.searchsorted(contracts, self._tag_pairs[:, 0])
+            known = rows < len(contracts)
+            known[known] = contracts[rows[known]] == self._tag_pairs[known, 0]
+            result = numpy.zeros((len(tags), len(periods)))
+            numpy.add.at(result, numpy.searchsorted(tags, self._tag_pairs[known, 1]), costs[rows[known]])
+            return periods, tags.tolist(), result
+        raise ValueError(f"unknown grouping {by}")
+
+    def _total_costs(self, bounds: numpy.ndarray) -> numpy.ndarray:
+        # rate per day as the cumulated changes of all segments, then summed up per period
+        first, end = bounds[0], bounds[-1]
+        starts = numpy.clip(self._starts, first, end) - first
+        ends = numpy.clip(self._ends + 1, first, end) - first
+        days = int(end - first)
+        changes = numpy.bincount(starts.astype(numpy.int64), self._rates, days + 1)\
+            - numpy.bincount(ends.astype(numpy.int64), self._rates, days + 1)
+        daily = numpy.cumsum(changes[:days])
+        return numpy.add.reduceat(daily, (bounds[:-1] - first).astype(numpy.int64))
+
+    def _contract_costs(self, bounds: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]:
+        contracts = numpy.unique(self._contracts)
+        result = numpy.zeros((len(contracts), len(bounds) - 1))
+        # cost of every segment until each bound is rate * covered days, computed in chunks to limit memory
+        chunk = max(1, _CHUNK_CELLS // len(bounds))
+        for first in range(0, len(self._rates), chunk):
+            part = slice(first, first + chunk)
+            starts, ends, rates = self._starts[part], self._ends[part], self._rates[part]
+            covered = numpy.clip(bounds[None, :] - starts[:, None], 0, (ends - starts + 1)[:, None])
+            costs = numpy.diff(covered * rates[:, None], axis=1)
+            # segments are sorted by contract, sum up runs of the same contract
+            part_contracts = self._contracts[part]
+            run_starts = numpy.flatnonzero(numpy.r_[True, part_contracts[1:] != part_contracts[:-1]])
+            rows = numpy.searchsorted(contracts, part_contracts[run_starts])
+            result[rows] += numpy.add.reduceat(costs, run_starts, axis=0)
+        return contracts, result
+
+
+def _periods(first: datetime.date, last: datetime.date, unit: str) -> list[datetime.date]:
+    # start of every period, the first one starting at first
+    if unit == 'day':
+        return [first + datetime.timedelta(days=day) for day in range((last - first).days + 1)]
+    periods = [first]
+    while True:
+        current = periods[-1]
+        if unit == 'month':
+            following = datetime.date(current.year + current.month // 12, current.month % 12 + 1, 1)
+        elif unit == 'year':
+            following = datetime.date(current.year + 1, 1, 1)
+        else:
+            raise ValueError(f"unknown unit {unit}")
+        if following > last:
+            return periods
+        periods.append(following)
+
+
+def _resolve(contracts: numpy.ndarray, starts: numpy.ndarray, ends: numpy.ndarray, rates: numpy.ndarray)\
+        -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    # pricings usually follow each other, only contracts with overlapping pricings need to be split up
+    same = contracts[1:] == contracts[:-1]
+    overlapping = numpy.unique(contracts[1:][same & (ends[:-1] >= starts[1:])])
+    if len(overlapping) == 0:
+        return contracts, starts, ends, rates
+
+    keep = ~numpy.isin(contracts, overlapping)
+    segments = []
+    for contract in overlapping.tolist():
+        rows = numpy.flatnonzero(contracts == contract)
+        segments.extend((contract, start, end, rate)
+                        for start, end, rate in _segments(starts[rows].tolist(), ends[rows].tolist(),
+                                                          rates[rows].tolist()))
+    split = numpy.array(segments, dtype=numpy.float64).reshape(-1, 4)
+    contracts = numpy.concatenate((contracts[keep], split[:, 0].astype(numpy.int64)))
+    starts = numpy.concatenate((starts[keep], split[:, 1]))
+    order = numpy.lexsort((starts, contracts))
+    return (contracts[order], starts[order], numpy.concatenate((ends[keep], split[:, 2]))[order],
+            numpy.concatenate((rates[keep], split[:, 3]))[order])
+
+
+def _segments(starts: list[float], ends: list[float], rates: list[float]) -> list[tuple[float, float, float]]:
+    # the pricing started last wins, therefore assign days starting with the latest pricing
+    segments = []
+    taken = []
+    for start, end, rate in reversed(list(zip(starts, ends, rates))):
+        position = start
+        for taken_start, taken_end in sorted(taken):
+            if taken_end < position:
+                continue
+            if taken_start > end:
+                break
+            if taken_start > position:
+                segments.append((position, taken_start - 1, rate))
+            position = taken_end + 1
+        if position <= end:
+            segments.append((position, end, rate))
+        taken.append((start, end))
+    return segments
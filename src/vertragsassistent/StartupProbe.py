@@ -0,0 +1,46 @@
+import time
+START = time.perf_counter()
+
+import json
+import os
+import sys
+
+# started by Benchmark in a fresh interpreter, so that the imports are measured cold: opens the file like __main__
+# does and prints the milliseconds until the imports are done, the window is painted first and the contracts are shown
+if __name__ == '__main__':
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6 import QtCore, QtWidgets
+    app = QtWidgets.QApplication([])
+    import MainWindow
+    from Data import open_database
+    from Executor import executor
+    imported = time.perf_counter()
+
+    times = {}
+
+    class Probe(QtCore.QObject):
+        def eventFilter(self, watched: QtCore.QObject, event: QtCore.QEvent) -> bool:
+            if event.type() == QtCore.QEvent.Type.Paint and 'first_paint_ms' not in times:
+                times['first_paint_ms'] = (time.perf_counter() - START) * 1000
+            return False
+
+    def contracts_shown():
+        if 'contracts_ms' not in times:
+            times['contracts_ms'] = (time.perf_counter() - START) * 1000
+            QtCore.QTimer.singleShot(0, app.quit)
+
+    open_database(sys.argv[1])
+    window = MainWindow.MainWindow(sys.argv[1])
+    probe = Probe()
+    window.installEventFilter(probe)
+    # the complete list, a first page shown before it is not enough
+    window._table_contracts_model.loaded.connect(contracts_shown)
+    window.show()
+    QtCore.QTimer.singleShot(60000, app.quit)
+    app.exec()
+    executor().wait()
+    print(json.dumps({'imports_ms': round((imported - START) * 1000, 1),
+                      **{name: round(value, 1) for name, value in times.items()}}))
+    sys.stdout.flush()
+    # skip the teardown of the window and the application, it is not part of the start
+    os._exit(0)
@@ -1,6 +1,7 @@
-from PySide6.QtWidgets import *
+from PySide6.QtWidgets import QListView
 from PySide6 import QtCore, QtGui
 from Data import *
+from Executor import executor
 
 
 class TagListView(QListView):
@@ -26,12 +27,66 @@ class TagListModel(QtCore.QAbstractListModel):
     def __init__(self, contract: Contract | None = None, /):
         super().__init__()
         self._contract = contract
-        self._tags = None
+        self._tags: list[ContractTag] = []
         self._selected_tags = []
+        executor().changed.connect(self.apply_changes)
         self.reload()
 
     def reload(self):
-        self._tags = ContractTag.select().order_by(ContractTag.name)
+        executor().read(self._load, self._set_tags, key=self, context=self)
+
+    @QtCore.Slot(object)
+    def apply_changes(self, changes: list[Change]):
+        # reload only the tags which were renamed, created or (un)assigned
+        through = ContractTag.contracts.get_through_model()
+        tag_ids = list({change.id for change in changes if change.model in (ContractTag, through)})
+        if tag_ids:
+            executor().read(lambda: self._load(tag_ids), self._patch_tags, context=self)
+
+    def _load(self, tag_ids: list[int] | None = None) -> list[ContractTag]:
+        # fetch all tags with their number of contracts and whether they are checked in one grouped query
+        through = ContractTag.contracts.get_through_model()
+        checked = fn.MAX(Contract.id == (0 if self._contract is None else self._contract.id))
+        # links of deleted contracts may be left in older files, only existing contracts count
+        query = ContractTag.select(ContractTag, fn.COUNT(Contract.id).alias('contract_count'),
+                                   fn.COALESCE(checked, 0).alias('checked'))\
+            .join(through, JOIN.LEFT_OUTER, on=(through.contracttag == ContractTag.id))\
+            .join(Contract, JOIN.LEFT_OUTER, on=(Contract.id == through.contract))\
+            .group_by(ContractTag.id)\
+            .order_by(ContractTag.name)
+        if tag_ids is not None:
+            query = query.where(ContractTag.id.in_(tag_ids))
+        return list(query)
+
+    def _set_tags(self, tags: list[ContractTag]):
+        self.beginResetModel()
+        self._tags = tags
+        self.endResetModel()
+
+    def _patch_tags(self, tags: list[ContractTag]):
+        positions = {tag.id: position for position, tag in enumerate(self._tags)}
+        renamed = False
+        for tag in tags:
+            position = positions.get(tag.id)
+            if position is None:
+                self.beginInsertRows(QtCore.QModelIndex(), len(self._tags), len(self._tags))
+                self._tags.append(tag)
+                self.endInsertRows()
+                renamed = True
+                continue
+            current = self._tags[position]
+            if (current.name, current.contract_count, bool(current.checked))\
+                    != (tag.name, tag.contract_count, bool(tag.checked)):
+                renamed = renamed or current.name != tag.name
+                # keep the instance, it may be referenced by the selected tags
+                current.name, current.contract_count, current.checked = tag.name, tag.contract_count, tag.checked
+                self.dataChanged.emit(self.index(position), self.index(position))
+        if renamed:
+            self._sort()
+
+    def _sort(self):
+        self.layoutAboutToBeChanged.emit()
+        self._tags.sort(key=lambda tag: tag.name)
         self.layoutChanged.emit()
 
     def rowCount(self, /, parent: QtCore.QModelIndex | QtCore.QPersistentModelIndex = ...) -> int:
@@ -47,14 +102,14 @@ class TagListModel(QtCore.QAbstractListModel):
              role: int = QtCore.Qt.ItemDataRole.DisplayRole):
         item = self._tags[index.row()] if len(self._tags) > index.row() else None
         if role == QtCore.Qt.ItemDataRole.DisplayRole:
-            return "..." if item is None else f"{item.name} ({len(item.contracts)})"
+            return "..." if item is None else f"{item.name} ({item.contract_count})"
         if role == QtCore.Qt.ItemDataRole.EditRole:
             return "" if item is None else item.name
         if role == QtCore.Qt.ItemDataRole.CheckStateRole:
             if item is None:
                 return None
             if self._contract is not None:
-                in_db = self._contract in item.contracts
+                in_db = bool(item.checked)
                 return QtCore.Qt.CheckState.Checked if in_db else QtCore.Qt.CheckState.Unchecked
             else:
                 in_list = item in self._selected_tags
@@ -67,9 +122,14 @@ class TagListModel(QtCore.QAbstractListModel):
         if role == QtCore.Qt.ItemDataRole.EditRole:
             if item is None:
                 item = ContractTag()
+                item.contract_count = 0
+                item.checked = False
+                self.beginInsertRows(QtCore.QModelIndex(), len(self._tags), len(self._tags))
+                self._tags.append(item)
+                self.endInsertRows()
             item.name = value
-            item.save()
-            self.reload()
+            executor().write(item.save)
+            self._sort()
             return True
         if role == QtCore.Qt.ItemDataRole.CheckStateRole:
             if item is None:
@@ -80,13 +140,17 @@ class TagListModel(QtCore.QAbstractListModel):
             checked = (value == QtCore.Qt.CheckState.Checked.value)
             if self._contract is not None:
                 # update database, if not already in there
-                in_db = self._contract in item.contracts
+                in_db = bool(item.checked)
                 if in_db == checked:
                     return False
+                contract = self._contract
                 if in_db:
-                    item.contracts.remove(self._contract)
+                    executor().write(lambda: item.remove_contract(contract))
+                    item.contract_count -= 1
                 else:
-                    item.contracts.add(self._contract)
+                    executor().write(lambda: item.add_contract(contract))
+                    item.contract_count += 1
+                item.checked = checked
             else:
                 in_list = item in self._selected_tags
                 if in_list == checked:
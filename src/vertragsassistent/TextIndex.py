@@ -0,0 +1,202 @@
+from PySide6 import QtCore
+from collections.abc import Callable, Iterable
+from Data import *
+from Executor import executor
+import functools
+import os
+import queue
+import shutil
+import subprocess
+import threading
+
+# longest text kept per document
+MAX_TEXT = 1000000
+
+# functions returning the text of a file, by lower case extension
+EXTRACTORS: dict[str, Callable[[str], str]] = {}
+
+
+def register_extractor(extensions: Iterable[str], extractor: Callable[[str], str]):
+    # further formats can be plugged in, e.g. by a local OCR tool
+    for extension in extensions:
+        EXTRACTORS[extension.lower()] = extractor
+
+
+def read_text(path: str) -> str:
+    with open(path, 'rb') as file:
+        contents = file.read(MAX_TEXT)
+    try:
+        return contents.decode('utf-8')
+    except UnicodeDecodeError:
+        # older files from windows
+        return contents.decode('cp1252', errors='replace')
+
+
+def read_pdf(path: str) -> str:
+    # pdftotext of poppler, runs locally without sending the files anywhere
+    result = subprocess.run(['pdftotext', '-enc', 'UTF-8', '-q', path, '-'], capture_output=True, timeout=120,
+                            check=True)
+    return result.stdout[:MAX_TEXT].decode('utf-8', errors='replace')
+
+
+register_extractor(('.txt', '.text', '.md', '.csv', '.log'), read_text)
+
+
+@functools.cache
+def extractors() -> dict[str, Callable[[str], str]]:
+    # the external tools are looked up on first use, searching the PATH would slow down the start
+    if shutil.which('pdftotext'):
+        register_extractor(('.pdf',), read_pdf)
+    return EXTRACTORS
+
+
+def extract_text(path: str) -> str:
+    # the text of the file, empty if it cannot be extracted
+    try:
+        return extractors()[os.path.splitext(path)[1].lower()](path)
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def stale_documents(document_ids: list[int] | None = None) -> list[tuple[int, str, tuple]]:
+    # documents (all, if None) whose file changed since their text was extracted, as id, path and state of the
+    # file; files without extractor are left out, missing ones keep their text until they are back
+    query = ContractDocument.select(ContractDocument.id, ContractDocument.file, ContractDocument.hash,
+                                    DocumentText.file, DocumentText.size, DocumentText.mtime, DocumentText.hash)\
+        .join(DocumentText, JOIN.LEFT_OUTER, on=(DocumentText.rowid == ContractDocument.id))
+    queries = [query] if document_ids is None else \
+        [query.where(ContractDocument.id.in_(chunk)) for chunk in chunked(document_ids, 500)]
+    base, known = os.path.dirname(db.database), extractors()
+    stale = []
+    for query in queries:
+        for document_id, file, digest, *indexed in db.execute(query).fetchall():
+            path = os.path.join(base, file)
+            if os.path.splitext(file)[1].lower() not in known:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            state = (file, str(stat.st_size), str(stat.st_mtime_ns), digest or '')
+            indexed_file, indexed_size, indexed_mtime, indexed_hash = indexed
+            # hashes are compared only where both are known, they are added to older documents later on
+            if (indexed_file, indexed_size, indexed_mtime) != state[:3] \
+                    or (digest and indexed_hash and digest != indexed_hash):
+                stale.append((document_id, path, state))
+    return stale
+
+
+def store_document_texts(rows: list[tuple[int, str, tuple]]) -> None:
+    # replace the texts of the documents, as id, text and state of the file; deleted documents are left out
+    ids = [document_id for document_id, _, _ in rows]
+    existing = set()
+    for chunk in chunked(ids, 500):
+        existing.update(document_id for document_id, in db.execute(
+            ContractDocument.select(ContractDocument.id).where(ContractDocument.id.in_(chunk))).fetchall())
+        DocumentText.delete().where(DocumentText.rowid.in_(chunk)).execute()
+    texts = [{'rowid': document_id, 'text': text, 'file': file, 'size': size, 'mtime': mtime, 'hash': digest}
+             for document_id, text, (file, size, mtime, digest) in rows if document_id in existing]
+    for chunk in chunked(texts, 100):
+        DocumentText.insert_many(chunk).execute()
+
+
+class TextIndexer(QtCore.QObject):
+    # documents done and to do of the running backlog
+    progress = QtCore.Signal(int, int)
+    _extracted = QtCore.Signal(int, object)
+    # texts are written in batches, whatever was written is not extracted again after a restart
+    flush_size = 100
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # documents waiting for extraction, as generation, id, path and state of the file
+        self._queue = queue.SimpleQueue()
+        self._cancelled = threading.Event()
+        # a cancel starts a new generation, later results of the previous one are dropped
+        self._generation = 0
+        self._done = 0
+        self._total = 0
+        self._rows: list[tuple[int, str, tuple]] = []
+        self._extracted.connect(self._collect)
+        executor().changed.connect(self.apply_changes)
+
+        # extraction mostly waits for files and external tools
+        self._pool = QtCore.QThreadPool(self)
+        self._pool.setMaxThreadCount(max(2, min(4, QtCore.QThread.idealThreadCount())))
+
+    def update(self, document_ids: list[int] | None = None):
+        # extract the texts of all (or the given) documents whose files changed since the last time
+        executor().read(lambda: stale_documents(document_ids), self._enqueue, context=self)
+
+    @QtCore.Slot(object)
+    def apply_changes(self, changes: list[Change]):
+        document_ids = [change.id for change in changes
+                        if change.model is ContractDocument and change.action != 'deleted']
+        if document_ids:
+            self.update(document_ids)
+
+    def cancel(self):
+        # stop extracting and keep the texts extracted so far, the rest follows on the next update
+        self._cancelled.set()
+        self._pool.clear()
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._pool.waitForDone()
+        self._cancelled.clear()
+        self._generation += 1
+        self._flush()
+        self._done = self._total = 0
+        self.progress.emit(0, 0)
+
+    def _enqueue(self, documents: list[tuple[int, str, tuple]]):
+        if not documents:
+            return
+        self._total += len(documents)
+        for document in documents:
+            self._queue.put((self._generation, *document))
+        self.progress.emit(self._done, self._total)
+        for _ in range(min(len(documents), self._pool.maxThreadCount())):
+            self._pool.start(_ExtractWorker(self._queue, self._cancelled, self._extracted))
+
+    @QtCore.Slot(int, object)
+    def _collect(self, generation: int, row: tuple[int, str, tuple]):
+        if generation != self._generation:
+            return
+        self._rows.append(row)
+        self._done += 1
+        if len(self._rows) >= self.flush_size or self._done == self._total:
+            self._flush()
+        self.progress.emit(self._done, self._total)
+        if self._done == self._total:
+            self._done = self._total = 0
+
+    def _flush(self):
+        rows, self._rows = self._rows, []
+        if rows:
+            executor().write(lambda: store_document_texts(rows))
+
+
+class _ExtractWorker(QtCore.QRunnable):
+    def __init__(self, documents: queue.SimpleQueue, cancelled: threading.Event, extracted: QtCore.SignalInstance):
+        super().__init__()
+        self._documents = documents
+        self._cancelled = cancelled
+        self._extracted = extracted
+
+    def run(self):
+        while not self._cancelled.is_set():
+            try:
+                generation, document_id, path, state = self._documents.get_nowait()
+            except queue.Empty:
+                return
+            self._extracted.emit(generation, (document_id, extract_text(path), state))
+
+
+_indexer: TextIndexer | None = None
+
+
+def text_indexer() -> TextIndexer:
+    global _indexer
+    if _indexer is None:
+        _indexer = TextIndexer()
+    return _indexer
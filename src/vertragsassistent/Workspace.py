@@ -0,0 +1,127 @@
+from typing import NamedTuple
+import decimal
+import functools
+import operator
+from Data import *
+
+# files of a workspace, the default limit of attached databases in sqlite
+MAX_FILES = 10
+
+
+class Source(NamedTuple):
+    # a file of the workspace and the schema it is attached as
+    schema: str
+    file: str
+
+
+def open_workspace(filenames: list[str], profile: str = 'default') -> list[Source]:
+    # all files are attached read only to an empty in-memory database on every connection; they are neither migrated
+    # nor changed, so that files of older versions can be combined as well
+    if len(filenames) > MAX_FILES:
+        raise ValueError(f"Höchstens {MAX_FILES} Dateien in einem Arbeitsbereich")
+    init_database('file::memory:', pragmas=read_pragmas(profile), uri=True)
+    sources = []
+    for number, filename in enumerate(filenames):
+        schema = f'quelle{number}'
+        db.attach(read_only_uri(filename), schema)
+        sources.append(Source(schema, filename))
+    for source in sources:
+        try:
+            # the tables of the first version are all that is read
+            db.execute_sql(f'SELECT COUNT(*) FROM "{source.schema}"."contract"')
+        except DatabaseError:
+            close_workspace(sources)
+            raise ValueError(f"Keine Datei des Vertragsassistenten: {source.file}")
+    return sources
+
+
+def close_workspace(sources: list[Source]) -> None:
+    for source in sources:
+        db.detach(source.schema)
+    db.close_all()
+
+
+@db.func('period_costs')
+def period_costs(price, payment_interval_days: int | None, days: int) -> float:
+    # costs of a pricing for the number of days, rounded like costs() does, to match the totals of single files
+    if price is None:
+        return 0.0
+    return float(round(decimal.Decimal(str(price)) / payment_interval_days * days, 2))
+
+
+def _table(model, schema: str) -> Table:
+    return Table(model._meta.table_name, [field.column_name for field in model._meta.sorted_fields], schema=schema)
+
+
+def _contracts(number: int, schema: str, date: datetime.date, tag_names: list[str], match_all: bool):
+    # the contracts of one file with the costs of the pricing active on the date, like contract_overview
+    contract, pricing = _table(Contract, schema), _table(ContractPricing, schema)
+    ranked = pricing.select(
+        pricing.contract_id, pricing.price, pricing.payment_interval_days,
+        fn.ROW_NUMBER().over(partition_by=[pricing.contract_id], order_by=[pricing.start_date.desc()])
+        .alias('position'))\
+        .where((pricing.start_date <= date) & ((pricing.end_date >> None) | (pricing.end_date >= date)))\
+        .alias(f'ranked_{number}')
+    query = contract.select(Value(number).alias('source'), contract.id, contract.name, contract.company,
+                            fn.period_costs(ranked.c.price, ranked.c.payment_interval_days, 30).alias('per_month'),
+                            fn.period_costs(ranked.c.price, ranked.c.payment_interval_days, 365).alias('per_year'),
+                            fn.COALESCE(contract.reminder <= date, False).alias('due'))\
+        .join(ranked, JOIN.LEFT_OUTER, on=((ranked.c.contract_id == contract.id) & (ranked.c.position == 1)))
+    if tag_names:
+        through, tag = _table(ContractTag.contracts.get_through_model(), schema), _table(ContractTag, schema)
+        tagged = through.select(through.contract_id)\
+            .join(tag, on=(tag.id == through.contracttag_id))\
+            .where(tag.name.in_(tag_names))\
+            .group_by(through.contract_id)
+        if match_all:
+            tagged = tagged.having(fn.COUNT(tag.name.distinct()) == len(set(tag_names)))
+        query = query.where(contract.id.in_(tagged))
+    return query
+
+
+def workspace_contracts(sources: list[Source], date: datetime.date | None = None,
+                        tag_names: dict[int, list[str]] | None = None, match_all: bool = True):
+    # the contracts of all files as a single statement, as source (position in sources), id, name, company,
+    # price / month, price / year and reminder due; with tag names (per source), only the contracts having all
+    # (match_all) or any of the names of their source, sources without names are left out
+    date = datetime.date.today() if date is None else date
+    queries = [_contracts(number, source.schema, date, tag_names[number] if tag_names else [], match_all)
+               for number, source in enumerate(sources) if not tag_names or tag_names.get(number)]
+    return functools.reduce(operator.add, queries)
+
+
+def workspace_totals(sources: list[Source], date: datetime.date | None = None,
+                     tag_names: dict[int, list[str]] | None = None, match_all: bool = True) -> list[tuple]:
+    # number of contracts, price / month and price / year per source, and of all of them with source None last
+    merged = workspace_contracts(sources, date, tag_names, match_all).cte('merged')
+    count, per_month, per_year = fn.COUNT(merged.c.id), fn.SUM(merged.c.per_month), fn.SUM(merged.c.per_year)
+    # the sums over all sources as window over the groups, one pass over the contracts
+    query = merged.select_from(merged.c.source, count, fn.ROUND(per_month, 2), fn.ROUND(per_year, 2),
+                               fn.SUM(count).over(), fn.ROUND(fn.SUM(per_month).over(), 2),
+                               fn.ROUND(fn.SUM(per_year).over(), 2))\
+        .group_by(merged.c.source)\
+        .order_by(merged.c.source)
+    rows = db.execute(query).fetchall()
+    return [row[:4] for row in rows] + [(None, *rows[0][4:]) if rows else (None, 0, 0, 0)]
+
+
+def workspace_tags(sources: list[Source], date: datetime.date | None = None) -> list[tuple]:
+    # the tags of all files as source, name, number of contracts, price / month and price / year, ordered by name
+    merged = workspace_contracts(sources, date).cte('merged')
+    assignments = []
+    for number, source in enumerate(sources):
+        through, tag = (_table(ContractTag.contracts.get_through_model(), source.schema),
+                        _table(ContractTag, source.schema))
+        assignments.append(tag.select(Value(number).alias('source'), tag.id, tag.name, through.contract_id)
+                           .join(through, JOIN.LEFT_OUTER, on=(through.contracttag_id == tag.id)))
+    tagged = functools.reduce(operator.add, assignments).cte('tagged')
+    # tags without contracts are listed as well, links of deleted contracts are not counted
+    query = tagged.select_from(tagged.c.source, tagged.c.name, fn.COUNT(merged.c.id),
+                               fn.ROUND(fn.COALESCE(fn.SUM(merged.c.per_month), 0), 2),
+                               fn.ROUND(fn.COALESCE(fn.SUM(merged.c.per_year), 0), 2))\
+        .join(merged, JOIN.LEFT_OUTER,
+              on=((merged.c.source == tagged.c.source) & (merged.c.id == tagged.c.contract_id)))\
+        .group_by(tagged.c.source, tagged.c.id)\
+        .order_by(tagged.c.name, tagged.c.source)\
+        .with_cte(merged, tagged)
+    return db.execute(query).fetchall()
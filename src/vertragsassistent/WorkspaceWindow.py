@@ -0,0 +1,212 @@
+from PySide6.QtWidgets import QAbstractItemView, QGridLayout, QGroupBox, QHeaderView, QLabel, QMainWindow, \
+    QMessageBox, QRadioButton, QTableView, QTableWidget, QTableWidgetItem, QWidget
+from PySide6 import QtCore, QtGui
+from Data import *
+from Executor import executor
+from Workspace import Source, workspace_contracts, workspace_tags, workspace_totals
+import os
+import sys
+
+
+def load_contracts(sources: list[Source], tag_names: dict[int, list[str]], match_all: bool) -> list[tuple]:
+    query = workspace_contracts(sources, tag_names=tag_names, match_all=match_all).order_by(SQL('name'), SQL('company'))
+    return db.execute(query).fetchall()
+
+
+class WorkspaceWindow(QMainWindow):
+    # the contracts of several files side by side, read only; a double click opens the file of a contract
+    def __init__(self, sources: list[Source], /):
+        super().__init__()
+        self._sources = sources
+        self.setWindowTitle(f"Vertragsassistenz (Arbeitsbereich mit {len(sources)} Dateien)")
+        self.setMinimumSize(600, 400)
+        root = QWidget(self)
+        self.setCentralWidget(root)
+        window_layout = QGridLayout(root)
+        window_layout.setContentsMargins(10, 10, 10, 10)
+        root.setLayout(window_layout)
+
+        # tags of all files, each with its file; the selected ones filter the contracts of their files
+        group_tags = QGroupBox("Vertrags Tags", self)
+        window_layout.addWidget(group_tags, 0, 0)
+        group_tags_layout = QGridLayout()
+        group_tags.setLayout(group_tags_layout)
+        self._table_tags = QTableWidget(0, 5)
+        self._table_tags.setHorizontalHeaderLabels(["Datei", "Tag", "Verträge", "Preis / Monat", "Preis / Jahr"])
+        self._table_tags.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self._table_tags.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self._table_tags.setSelectionMode(QAbstractItemView.SelectionMode.MultiSelection)
+        self._table_tags.verticalHeader().hide()
+        self._table_tags.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self._table_tags.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        self._table_tags.setFixedHeight(130)
+        self._table_tags.itemSelectionChanged.connect(self.refresh)
+        group_tags_layout.addWidget(self._table_tags, 0, 0, 1, 4)
+        group_tags_layout.setColumnStretch(3, 1)
+        group_tags_layout.addWidget(QLabel("Verknüpfen:"), 1, 0)
+        self._radio_tag_sort_and = QRadioButton("UND", group_tags)
+        self._radio_tag_sort_and.setChecked(True)
+        self._radio_tag_sort_and.clicked.connect(self.refresh)
+        group_tags_layout.addWidget(self._radio_tag_sort_and, 1, 1)
+        self._radio_tag_sort_or = QRadioButton("ODER", group_tags)
+        self._radio_tag_sort_or.clicked.connect(self.refresh)
+        group_tags_layout.addWidget(self._radio_tag_sort_or, 1, 2)
+
+        # contracts of all files
+        group_contracts = QGroupBox("Verträge", self)
+        window_layout.addWidget(group_contracts, 1, 0)
+        window_layout.setRowStretch(1, 1)
+        group_contracts_layout = QGridLayout()
+        group_contracts.setLayout(group_contracts_layout)
+        group_contracts_layout.addWidget(QLabel("Nur aktuell gültige Preise werden angezeigt, Doppelklick öffnet "
+                                                "die Datei des Vertrags"), 0, 0)
+        self._table_contracts_model = WorkspaceContractModel([os.path.basename(source.file) for source in sources])
+        self._table_contracts_proxy = QtCore.QSortFilterProxyModel()
+        self._table_contracts_proxy.setSortRole(QtCore.Qt.ItemDataRole.UserRole)
+        self._table_contracts_proxy.setSourceModel(self._table_contracts_model)
+        self._table_contracts = QTableView()
+        self._table_contracts.setModel(self._table_contracts_proxy)
+        self._table_contracts.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self._table_contracts.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self._table_contracts.setSortingEnabled(True)
+        self._table_contracts.horizontalHeader().setSortIndicator(-1, QtCore.Qt.SortOrder.AscendingOrder)
+        self._table_contracts.doubleClicked.connect(self.open_file)
+        for col, val in enumerate([QHeaderView.ResizeMode.ResizeToContents, QHeaderView.ResizeMode.Interactive,
+                                   QHeaderView.ResizeMode.Stretch, QHeaderView.ResizeMode.ResizeToContents,
+                                   QHeaderView.ResizeMode.ResizeToContents]):
+            self._table_contracts.horizontalHeader().setSectionResizeMode(col, val)
+        group_contracts_layout.addWidget(self._table_contracts, 1, 0)
+
+        # totals per file and of all files
+        group_totals = QGroupBox("Summen", self)
+        window_layout.addWidget(group_totals, 2, 0)
+        group_totals_layout = QGridLayout()
+        group_totals.setLayout(group_totals_layout)
+        self._table_totals = QTableWidget(0, 4)
+        self._table_totals.setHorizontalHeaderLabels(["Datei", "Verträge", "Preis / Monat", "Preis / Jahr"])
+        self._table_totals.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self._table_totals.verticalHeader().hide()
+        self._table_totals.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self._table_totals.setFixedHeight(40 + 30 * min(len(sources) + 1, 5))
+        group_totals_layout.addWidget(self._table_totals, 0, 0)
+        executor().failed.connect(self.show_error)
+        self._started = False
+
+    def showEvent(self, event: QtGui.QShowEvent):
+        super().showEvent(event)
+        if not self._started:
+            # like the main window, the data follows the first paint
+            self._started = True
+            QtCore.QTimer.singleShot(0, self.start)
+
+    @QtCore.Slot()
+    def start(self):
+        # the tags follow the contracts, the queries over all files would otherwise compete with each other
+        self._table_contracts_model.modelReset.connect(self.load_tags, QtCore.Qt.ConnectionType.SingleShotConnection)
+        self.refresh()
+
+    @QtCore.Slot()
+    def load_tags(self):
+        sources = self._sources
+        executor().read(lambda: workspace_tags(sources), self.set_tags, context=self)
+
+    def set_tags(self, tags: list[tuple]):
+        self._table_tags.blockSignals(True)
+        self._table_tags.setRowCount(len(tags))
+        for row, (source, name, count, per_month, per_year) in enumerate(tags):
+            values = (os.path.basename(self._sources[source].file), name, str(count), f"{per_month:.2f} €",
+                      f"{per_year:.2f} €")
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                item.setData(QtCore.Qt.ItemDataRole.UserRole, (source, name))
+                self._table_tags.setItem(row, column, item)
+        self._table_tags.blockSignals(False)
+
+    @QtCore.Slot()
+    def refresh(self):
+        sources, match_all = self._sources, not self._radio_tag_sort_or.isChecked()
+        tag_names = {}
+        for idx in self._table_tags.selectionModel().selectedRows():
+            source, name = self._table_tags.item(idx.row(), 0).data(QtCore.Qt.ItemDataRole.UserRole)
+            tag_names.setdefault(source, []).append(name)
+        executor().read(lambda: workspace_totals(sources, tag_names=tag_names, match_all=match_all),
+                        self.set_totals, key=self._table_totals, context=self)
+        executor().read(lambda: load_contracts(sources, tag_names, match_all), self._table_contracts_model.set_rows,
+                        key=self._table_contracts_model, context=self)
+
+    def set_totals(self, totals: list[tuple]):
+        self._table_totals.setRowCount(len(totals))
+        for row, (source, count, per_month, per_year) in enumerate(totals):
+            name = "Gesamt" if source is None else self._sources[source].file
+            values = (name, str(count), f"{per_month or 0:.2f} €", f"{per_year or 0:.2f} €")
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if source is None:
+                    font = item.font()
+                    font.setBold(True)
+                    item.setFont(font)
+                self._table_totals.setItem(row, column, item)
+
+    @QtCore.Slot(object)
+    def show_error(self, error: Exception):
+        # e.g. a file removed or replaced while the workspace is open
+        QMessageBox.critical(self, "Fehler", f"Die Dateien konnten nicht gelesen werden: {error}")
+
+    @QtCore.Slot(QtCore.QModelIndex)
+    def open_file(self, idx: QtCore.QModelIndex):
+        # contracts are edited in the window of their own file, in a process of its own
+        if not idx.isValid():
+            return
+        source = self._table_contracts_model.get_row_source(self._table_contracts_proxy.mapToSource(idx).row())
+        QtCore.QProcess.startDetached(sys.executable, [os.path.dirname(os.path.abspath(__file__)),
+                                                       os.path.abspath(self._sources[source].file)])
+
+
+class WorkspaceContractModel(QtCore.QAbstractTableModel):
+    col_source = 0
+    col_name = 1
+    col_company = 2
+    col_price_month = 3
+    col_price_year = 4
+
+    def __init__(self, source_names: list[str], **kwargs):
+        super().__init__(**kwargs)
+        self._source_names = source_names
+        # rows are kept as (source, id, name, company, price / month, price / year, reminder due)
+        self._rows: list[tuple] = []
+
+    def set_rows(self, rows: list[tuple]):
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
+
+    def get_row_source(self, row: int) -> int:
+        return self._rows[row][0]
+
+    def columnCount(self, /, parent: QtCore.QModelIndex | QtCore.QPersistentModelIndex = ...):
+        return 5
+
+    def rowCount(self, /, parent: QtCore.QModelIndex | QtCore.QPersistentModelIndex = ...):
+        return len(self._rows)
+
+    def flags(self, index: QtCore.QModelIndex | QtCore.QPersistentModelIndex, /):
+        return QtCore.Qt.ItemFlag.ItemIsEnabled | QtCore.Qt.ItemFlag.ItemIsSelectable
+
+    def headerData(self, section: int, orientation: QtCore.Qt.Orientation, /, role: int = ...):
+        if role != QtCore.Qt.ItemDataRole.DisplayRole or orientation != QtCore.Qt.Orientation.Horizontal:
+            return None
+        return ("Datei", "Bezeichnung", "Anbieter", "Preis / Monat", "Preis / Jahr")[section]
+
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        source, _, name, company, per_month, per_year, due = self._rows[index.row()]
+        column = index.column()
+        if role in (QtCore.Qt.ItemDataRole.DisplayRole, QtCore.Qt.ItemDataRole.UserRole):
+            if column == self.col_source:
+                return self._source_names[source]
+            if column in (self.col_price_month, self.col_price_year):
+                value = per_month if column == self.col_price_month else per_year
+                # sort prices by their numeric value
+                return f"{value:.2f}" if role == QtCore.Qt.ItemDataRole.DisplayRole else value
+            return name if column == self.col_name else company
+        if role == QtCore.Qt.ItemDataRole.BackgroundRole and column == self.col_name and due:
+            return QtGui.QColor(180, 180, 255)
@@ -1,12 +1,43 @@
+import os
 import sys
-from PySide6 import QtCore, QtWidgets
-from Data import *
-import MainWindow
+import Cli
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] in Cli.COMMANDS:
+        # reports without loading Qt
+        sys.exit(Cli.main(sys.argv[1:]))
+
+    from PySide6 import QtCore, QtWidgets
+    from Data import *
+    # only what the main window needs, everything else is imported on first use
+    import MainWindow
+    from Executor import executor
+    from DocumentStore import document_store
+    from TextIndex import text_indexer
+    from BackupScheduler import backups
+
     app = QtWidgets.QApplication([])
+    # pragma profile, e.g. "network" for files on network shares
+    profile = os.environ.get('VERTRAGSASSISTENT_PRAGMAS', 'default')
     filename = ' '.join(sys.argv[1:])
+    if len(sys.argv) > 2 and not QtCore.QFileInfo.exists(filename) \
+            and all(QtCore.QFileInfo.exists(file) for file in sys.argv[1:]):
+        # several files: one read only workspace over all of them
+        from Workspace import close_workspace, open_workspace
+        from WorkspaceWindow import WorkspaceWindow
+        try:
+            sources = open_workspace(sys.argv[1:], profile)
+        except ValueError as e:
+            QtWidgets.QMessageBox.critical(QtWidgets.QWidget(), "Arbeitsbereich", str(e))
+            sys.exit(1)
+        workspace_window = WorkspaceWindow(sources)
+        workspace_window.show()
+        ret = app.exec()
+        executor().wait()
+        close_workspace(sources)
+        sys.exit(ret)
+
     if not QtCore.QFileInfo.exists(filename):
         # no parameter given, therefore ask for path
         filename = QtWidgets.QFileDialog.getSaveFileName(caption="Wähle eine neue Datei oder die zu öffnende Datei",
@@ -15,18 +46,39 @@ if __name__ == '__main__':
         # no file given, therefore close
         sys.exit(0)
 
+    # record statements and timings of all actions as JSON lines into the given file
+    profiling = os.environ.get('VERTRAGSASSISTENT_PROFILING')
+    if profiling:
+        import Profiler
+        Profiler.enable(profiling)
+    # hours between the backups into <datei>.sicherungen (0 for none), the number of them kept and whether the
+    # documents are archived along with them
+    backup_hours = float(os.environ.get('VERTRAGSASSISTENT_BACKUP_HOURS', '24'))
+    backup_keep = int(os.environ.get('VERTRAGSASSISTENT_BACKUP_KEEP', '10'))
+    backup_documents = os.environ.get('VERTRAGSASSISTENT_BACKUP_DOCUMENTS', '0') == '1'
+
     if not QtCore.QFileInfo.exists(filename):
         if QtWidgets.QMessageBox.question(QtWidgets.QWidget(),
                                           "Neue Datei", "Soll die Datenbank neu erstellt werden?")\
                 != QtWidgets.QMessageBox.StandardButton.Yes:
             sys.exit(0)
-        db.init(filename)
-        create_tables()
+        open_database(filename, create=True, profile=profile)
     else:
-        db.init(filename)
+        open_database(filename, profile=profile)
 
     main_window = MainWindow.MainWindow(filename)
     main_window.show()
+    backups().start(backup_hours, backup_keep, backup_documents)
     ret = app.exec()
-    db.close()
+    document_store().cancel()
+    text_indexer().cancel()
+    if 'Preview' in sys.modules:
+        # loaded with the first contract dialog
+        sys.modules['Preview'].previews().cancel()
+    backups().cancel()
+    executor().wait()
+    db.execute_sql('PRAGMA optimize')
+    db.close_all()
+    if profiling:
+        Profiler.profiler().dump()
     sys.exit(ret)
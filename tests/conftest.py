@@ -0,0 +1,24 @@
+import os
+import sys
+
+# the modules import each other by their names, like when started with python vertragsassistent
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src', 'vertragsassistent'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import pytest
+from Data import *
+
+
+@pytest.fixture
+def database(tmp_path):
+    # a new, empty file opened like the application does
+    filename = str(tmp_path / 'vertraege.db')
+    open_database(filename, create=True)
+    yield filename
+    db.close_all()
+
+
+@pytest.fixture(scope='session')
+def app():
+    from PySide6 import QtWidgets
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
@@ -0,0 +1,51 @@
+import decimal
+import contextlib
+import logging
+import threading
+from Data import *
+
+
+def add_contract(name: str, price: str | None = None, interval: int = 30,
+                 start: datetime.date = datetime.date(2020, 1, 1), end: datetime.date | None = None,
+                 tags: tuple[ContractTag, ...] = (), company: str = "Anbieter") -> Contract:
+    contract = Contract.create(name=name, company=company, notes="")
+    if price is not None:
+        ContractPricing.create(contract=contract, price=decimal.Decimal(price), payment_interval_days=interval,
+                               start_date=start, end_date=end)
+    for tag in tags:
+        tag.add_contract(contract)
+    return contract
+
+
+@contextlib.contextmanager
+def count_statements():
+    # all statements run through peewee meanwhile, in any thread
+    statements = []
+    lock = threading.Lock()
+
+    class Handler(logging.Handler):
+        def emit(self, record: logging.LogRecord):
+            # leaves out the messages of the connection pool
+            if record.name == 'peewee':
+                with lock:
+                    statements.append(record.msg)
+
+    logger = logging.getLogger('peewee')
+    handler, level = Handler(), logger.level
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    try:
+        yield statements
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+
+
+def settle(app):
+    # until all reads and writes are done and their callbacks ran, including the ones issued by callbacks
+    from Executor import executor
+    while True:
+        executor().wait()
+        app.processEvents()
+        if not executor()._jobs:
+            return
@@ -0,0 +1,43 @@
+import os
+import sqlite3
+import stat
+import types
+import Backup
+from Data import *
+from tests.helpers import add_contract
+
+
+class SameSecond(datetime.datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 3, 1, 12, 0, 0)
+
+
+def test_backups_in_the_same_second_are_kept_apart(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(Backup, 'datetime', types.SimpleNamespace(datetime=SameSecond, date=datetime.date,
+                                                                  timedelta=datetime.timedelta))
+    contract = add_contract("Haftpflicht", "120", 365)
+    document = tmp_path / 'police.txt'
+    document.write_text("Police")
+    ContractDocument.create(contract=contract, file=relative_file(str(document)), description="Police",
+                            date=datetime.date.today())
+    directory = str(tmp_path / 'sicherungen')
+    first = Backup.backup(directory, documents=True)
+    add_contract("Hausrat", "60", 365)
+    second = Backup.backup(directory, documents=False)
+    assert [os.path.basename(first), os.path.basename(second)] == ['20260301-120000.db', '20260301-120000-2.db']
+    assert Backup.snapshots(directory) == ['20260301-120000', '20260301-120000-2']
+    for file, count in ((first, 1), (second, 2)):
+        connection = sqlite3.connect(file)
+        assert connection.execute("SELECT COUNT(*) FROM contract").fetchone() == (count,)
+        connection.close()
+    # only the snapshot with documents has a manifest
+    assert sorted(name for name in os.listdir(directory) if name.endswith('.json')) == ['20260301-120000.json']
+    Backup.prune(directory, keep=1)
+    assert Backup.snapshots(directory) == ['20260301-120000-2']
+
+
+def test_snapshot_has_permissions_of_database(database, tmp_path):
+    os.chmod(database, 0o644)
+    snapshot = Backup.backup(str(tmp_path / 'sicherungen'))
+    assert stat.S_IMODE(os.stat(snapshot).st_mode) == 0o644
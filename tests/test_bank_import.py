@@ -0,0 +1,77 @@
+import decimal
+import pytest
+from BankImport import apply_proposals, detect_interval, propose
+from Data import *
+from tests.helpers import add_contract
+
+HEADER = "Buchungstag;Betrag;Begünstigter/Zahlungspflichtiger;Verwendungszweck\n"
+
+
+def months(first: datetime.date, count: int, step: int = 1) -> list[datetime.date]:
+    return [datetime.date(first.year + (first.month - 1 + number * step) // 12,
+                          (first.month - 1 + number * step) % 12 + 1, first.day) for number in range(count)]
+
+
+def write_statement(path, payments: list[tuple[datetime.date, str, str]]) -> str:
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(HEADER)
+        for date, amount, party in sorted(payments):
+            file.write(f"{date:%d.%m.%Y};-{amount.replace('.', ',')};{party};Beitrag\n")
+    return str(path)
+
+
+@pytest.mark.parametrize('dates, known, interval', [
+    (months(datetime.date(2025, 1, 15), 12), None, 30),
+    (months(datetime.date(2025, 1, 15), 12), 31, 31),
+    (months(datetime.date(2025, 1, 15), 12), 28, 28),
+    (months(datetime.date(2025, 1, 15), 12), 7, 30),
+    (months(datetime.date(2025, 1, 15), 5, 3), None, 90),
+    (months(datetime.date(2025, 1, 15), 5, 3), 91, 91),
+    (months(datetime.date(2024, 1, 15), 2, 12), None, 365),
+    ([datetime.date(2025, 1, 1), datetime.date(2025, 1, 9), datetime.date(2025, 3, 20)], None, None),
+])
+def test_detect_interval(dates, known, interval):
+    assert detect_interval(dates, known) == interval
+
+
+@pytest.mark.parametrize('interval, step', [(90, 3), (91, 3), (31, 1), (28, 1), (30, 1)])
+def test_stored_interval_is_kept(database, tmp_path, interval, step):
+    add_contract("Hausrat", "30", interval, company="Versicherung AG")
+    dates = months(datetime.date(2024, 1, 15), 24 // step, step)
+    statement = write_statement(tmp_path / 'konto.csv', [(date, "30.00", "Versicherung AG") for date in dates])
+    assert propose([statement]) == []
+
+
+def test_changed_price_keeps_stored_interval(database, tmp_path):
+    contract = add_contract("Hausrat", "30", 90, company="Versicherung AG")
+    dates = months(datetime.date(2024, 1, 15), 8, 3)
+    statement = write_statement(tmp_path / 'konto.csv', [(date, "30.00" if date.year == 2024 else "33.00",
+                                                          "Versicherung AG") for date in dates])
+    proposal, = propose([statement])
+    assert (proposal.action, proposal.contract_id, proposal.price, proposal.interval, proposal.old_interval) \
+        == ('change', contract.id, decimal.Decimal('33.00'), 90, 90)
+    assert proposal.since == datetime.date(2025, 1, 15)
+
+
+def test_one_proposal_per_contract(database, tmp_path):
+    # two amounts paid to the same payee on the same days, only one contract matches
+    contract = add_contract("Strom", "50", 30, company="Stadtwerke")
+    dates = months(datetime.date(2025, 1, 15), 12)
+    statement = write_statement(tmp_path / 'konto.csv', [(date, amount, "Stadtwerke")
+                                                         for date in dates for amount in ("55.00", "80.00")])
+    proposals = propose([statement])
+    assert [(proposal.action, proposal.contract_id, proposal.price) for proposal in proposals] \
+        == [('change', contract.id, decimal.Decimal('55.00')), (None, None, decimal.Decimal('80.00'))]
+    apply_proposals([proposal for proposal in proposals if proposal.action is not None])
+    assert [(pricing.price, pricing.end_date) for pricing in ContractPricing.select().order_by(ContractPricing.id)] \
+        == [(50, datetime.date(2025, 1, 14)), (decimal.Decimal('55.00'), None)]
+
+
+def test_conflicting_proposals_are_rejected(database, tmp_path):
+    contract = add_contract("Strom", "50", 30, company="Stadtwerke")
+    dates = months(datetime.date(2025, 1, 15), 12)
+    statement = write_statement(tmp_path / 'konto.csv', [(date, "55.00", "Stadtwerke") for date in dates])
+    proposal, = propose([statement])
+    with pytest.raises(ValueError):
+        apply_proposals([proposal, proposal._replace(price=decimal.Decimal('80.00'))])
+    assert ContractPricing.select().where(ContractPricing.contract == contract).count() == 1
@@ -0,0 +1,58 @@
+import decimal
+from Data import *
+from tests.helpers import add_contract
+
+TODAY = datetime.date.today()
+
+
+def pricings_of(contract: Contract) -> list[tuple]:
+    return list(ContractPricing.select(ContractPricing.start_date, ContractPricing.end_date, ContractPricing.price)
+                .where(ContractPricing.contract == contract).order_by(ContractPricing.start_date).tuples())
+
+
+def test_change_prices(database):
+    continued = add_contract("Strom", "100", 30)
+    in_place = add_contract("Gas", "50", 30, start=TODAY)
+    without = add_contract("Girokonto")
+    ids = [continued.id, in_place.id, without.id]
+    old_continued, old_in_place = (ContractPricing.get(ContractPricing.contract == contract).id
+                                   for contract in (continued, in_place))
+    assert [(name, price, changed) for _, name, _, _, price, changed in price_change_preview(ids, TODAY, 10)] \
+        == [("Gas", decimal.Decimal(50), 55.0), ("Strom", decimal.Decimal(100), 110.0)]
+
+    with changes().collect() as published:
+        assert change_prices(ids, TODAY, 10) == 2
+    # the running pricing ends the day before and continues at the new price, the new one is changed in place
+    assert pricings_of(continued) == [(datetime.date(2020, 1, 1), TODAY - datetime.timedelta(days=1), 100),
+                                      (TODAY, None, 110)]
+    assert pricings_of(in_place) == [(TODAY, None, 55)]
+    assert pricings_of(without) == []
+    new_continued = ContractPricing.get((ContractPricing.contract == continued)
+                                        & (ContractPricing.start_date == TODAY))
+
+    assert sorted(published) == sorted([Change(ContractPricing, 'updated', old_continued, continued.id),
+                                        Change(ContractPricing, 'updated', old_in_place, in_place.id),
+                                        Change(ContractPricing, 'created', new_continued.id, continued.id)])
+    cached = {row.contract_id: (row.pricing_id, row.per_month) for row in CurrentPricing.select()}
+    assert cached == {continued.id: (new_continued.id, 110), in_place.id: (old_in_place, 55)}
+
+
+def test_change_tags_twice(database):
+    tag = ContractTag.create(name="Energie")
+    tagged = add_contract("Strom", tags=(tag,))
+    untagged = add_contract("Gas")
+    ids = [tagged.id, untagged.id]
+    through = ContractTag.contracts.get_through_model()
+    assert [(name, has_tag) for _, name, _, has_tag in tag_change_preview(ids, tag)] \
+        == [("Gas", False), ("Strom", True)]
+
+    for add, expected in ((True, [untagged.id]), (False, ids)):
+        with changes().collect() as published:
+            assert change_tags(ids, tag, add) == len(expected)
+        assert sorted(published) == sorted(Change(through, 'created' if add else 'deleted', tag.id, contract_id)
+                                           for contract_id in expected)
+        # nothing left to change the second time
+        with changes().collect() as published:
+            assert change_tags(ids, tag, add) == 0
+        assert published == []
+        assert sorted(contract.id for contract in tag.contracts) == (ids if add else [])
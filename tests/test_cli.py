@@ -0,0 +1,42 @@
+import pytest
+import Cli
+from Data import *
+from tests.helpers import add_contract
+
+
+def test_report_skips_links_of_deleted_contracts(database, capsys):
+    tag = ContractTag.create(name="Versicherung")
+    add_contract("Haftpflicht", "120", 365, tags=(tag,))
+    add_contract("Hausrat", "60", 365, tags=(tag,))
+    # left behind by earlier versions, which deleted contracts only
+    Contract.delete().where(Contract.name == "Haftpflicht").execute()
+    db.close_all()
+    assert Cli.main(['report', database]) == 0
+    output = capsys.readouterr().out
+    assert "1 Verträge" in output
+    assert "Versicherung: 4.93 € / Monat, 60.00 € / Jahr (1 Verträge)" in output
+
+
+def test_report_leaves_the_file_unchanged(database, capsys):
+    today = datetime.date.today()
+    add_contract("Hausrat", "60", 365)
+    add_contract("Zeitung", "120", 365, end=today - datetime.timedelta(days=1))
+    # cached the day before, the newspaper ended since
+    refresh_current_pricing(date=today - datetime.timedelta(days=1))
+    db.close_all()
+    before = open(database, 'rb').read()
+    assert Cli.main(['report', database]) == 0
+    assert "Preis / Jahr: 60.00 €" in capsys.readouterr().out
+    assert open(database, 'rb').read() == before
+    assert not os.path.exists(database + '-wal') or os.path.getsize(database + '-wal') == 0
+
+
+def test_timeline_range(database, capsys):
+    add_contract("Hausrat", "365", 365)
+    db.close_all()
+    with pytest.raises(SystemExit):
+        Cli.main(['timeline', database, '--from', '2025-06-01', '--to', '2025-01-01'])
+    assert "--from (2025-06-01) liegt nach --to (2025-01-01)" in capsys.readouterr().err
+    # only --from ends with its year
+    assert Cli.main(['timeline', database, '--from', '2025-06-01', '--unit', 'year']) == 0
+    assert capsys.readouterr().out.splitlines()[0] == f"{database}: Kosten von 2025-06-01 bis 2025-12-31"
@@ -0,0 +1,54 @@
+import Cli
+from Data import *
+from Projection import CostProjection
+from tests.helpers import add_contract
+
+YEAR = (datetime.date(2025, 1, 1), datetime.date(2025, 12, 31))
+
+
+def delete_one(database: str) -> Contract:
+    # two tagged contracts with documents, the first one is deleted
+    tag = ContractTag.create(name="Versicherung")
+    deleted = add_contract("Haftpflicht", "1200", 365, tags=(tag,))
+    kept = add_contract("Hausrat", "365", 365, tags=(tag,))
+    for contract in (deleted, kept):
+        ContractDocument.create(contract=contract, file=f"{contract.name}.pdf", description=f"Police {contract.name}",
+                                date=datetime.date.today())
+    deleted.delete_instance()
+    return kept
+
+
+def test_delete_removes_everything_of_the_contract(database):
+    kept = delete_one(database)
+    through = ContractTag.contracts.get_through_model()
+    for model in (ContractPricing, ContractDocument, through, CurrentPricing):
+        assert [row.contract_id for row in model.select()] == [kept.id]
+    assert search_contracts("Police") == ([kept.id], True)
+
+
+def test_projection_ignores_deleted_contracts(database):
+    delete_one(database)
+    assert CostProjection.load().total(*YEAR) == 365
+    _, _, costs = CostProjection.load().costs(*YEAR, 'year', 'tag')
+    assert costs.tolist() == [[365]]
+
+
+def test_report_after_delete(database, capsys):
+    delete_one(database)
+    db.close_all()
+    assert Cli.main(['report', database]) == 0
+    output = capsys.readouterr().out
+    assert f"Kosten {datetime.date.today().year}: " in output
+    assert "1 Verträge" in output
+    assert "Versicherung: 30.00 € / Monat, 365.00 € / Jahr (1 Verträge)" in output
+
+
+def test_migration_deletes_rows_of_deleted_contracts(database):
+    kept = add_contract("Hausrat", "365", 365)
+    orphan = add_contract("Haftpflicht", "1200", 365)
+    Contract.delete().where(Contract.id == orphan.id).execute()
+    SchemaVersion.update(version=len(MIGRATIONS) - 1).execute()
+    db.close_all()
+    open_database(database)
+    assert [row.contract_id for row in ContractPricing.select()] == [kept.id]
+    assert CostProjection.load().total(*YEAR) == 365
@@ -0,0 +1,79 @@
+import hashlib
+import time
+from Data import *
+from DocumentStore import document_store
+from tests.helpers import add_contract, settle
+
+
+def settle_store(app):
+    # until all batches of files are hashed and their writes are done, batches may follow reads and the other way round
+    from Executor import executor
+    while document_store()._batches or executor()._jobs:
+        settle(app)
+        app.processEvents()
+        time.sleep(0.001)
+
+
+def write_files(directory, count: int) -> list[str]:
+    paths = []
+    for number in range(count):
+        path = directory / f"rechnung{number}.txt"
+        path.write_text(f"Rechnung {number}")
+        paths.append(str(path))
+    return paths
+
+
+def test_attach_saves_document_before_hashing(app, database, tmp_path):
+    contract = add_contract("Haftpflicht")
+    path, = write_files(tmp_path, 1)
+    document = ContractDocument(contract=contract, description="Rechnung", date=datetime.date.today())
+    document_store().attach(document, path)
+    # closing the application cancels the hashing, the document stays
+    document_store().cancel()
+    settle(app)
+    saved = ContractDocument.get(ContractDocument.contract == contract)
+    assert saved.absolute_file == path
+    assert saved.hash is None
+
+
+def test_attach_fills_in_hash(app, database, tmp_path):
+    contract = add_contract("Haftpflicht")
+    path, = write_files(tmp_path, 1)
+    document = ContractDocument(contract=contract, description="Rechnung", date=datetime.date.today())
+    document_store().attach(document, path, copy=True)
+    settle_store(app)
+    saved = ContractDocument.get(ContractDocument.contract == contract)
+    digest = hashlib.sha256(b"Rechnung 0").hexdigest()
+    assert saved.hash == digest
+    assert saved.absolute_file.startswith(store_directory())
+
+
+def test_cancelling_an_import_keeps_other_batches(app, database, tmp_path):
+    contract = add_contract("Haftpflicht")
+    attached, *imported = write_files(tmp_path, 41)
+    document = ContractDocument(contract=contract, description="Rechnung", date=datetime.date.today())
+    document_store().attach(document, attached)
+    progress, done = [], []
+    ticket = document_store().import_files(contract, imported, done.append,
+                                           progress=lambda *args: progress.append(args))
+    document_store().cancel(ticket)
+    settle_store(app)
+    assert done == []
+    assert all(total == len(imported) for _, total in progress)
+    saved = ContractDocument.get(ContractDocument.contract == contract)
+    assert saved.hash == hashlib.sha256(b"Rechnung 0").hexdigest()
+
+
+def test_import_reports_its_own_progress(app, database, tmp_path):
+    contract = add_contract("Haftpflicht")
+    *paths, existing = write_files(tmp_path, 6)
+    # the backfill hashes documents attached before hashes were known meanwhile
+    ContractDocument.create(contract=contract, file=relative_file(existing), description="Alt",
+                            date=datetime.date.today())
+    document_store().backfill()
+    progress, done = [], []
+    document_store().import_files(contract, paths, done.append, progress=lambda *args: progress.append(args))
+    settle_store(app)
+    assert done == [5]
+    assert progress == [(number, 5) for number in range(1, 6)]
+    assert ContractDocument.select().where(ContractDocument.hash >> None).count() == 0
@@ -0,0 +1,58 @@
+from Data import *
+from Executor import executor
+from tests.helpers import add_contract, settle
+
+
+def fail():
+    raise OperationalError("database is locked")
+
+
+def test_failures_are_signalled(app, database):
+    failures, results = [], []
+    executor().failed.connect(failures.append)
+    try:
+        executor().read(fail, results.append)
+
+        def write():
+            add_contract("Hausrat")
+            fail()
+
+        executor().write(write, results.append)
+        settle(app)
+    finally:
+        executor().failed.disconnect(failures.append)
+    assert [str(error) for error in failures] == ["database is locked"] * 2
+    assert results == []
+    # the write is rolled back
+    assert Contract.select().count() == 0
+
+
+def test_main_window_shows_failures(app, database, monkeypatch):
+    import MainWindow
+    shown = []
+    monkeypatch.setattr(MainWindow.QMessageBox, 'exec', lambda box: shown.append((box.text(), box.detailedText())))
+    window = MainWindow.MainWindow(database)
+    settle(app)
+    executor().read(fail)
+    settle(app)
+    window.deleteLater()
+    settle(app)
+    assert len(shown) == 1
+    assert shown[0][0] == "Die Aktion ist fehlgeschlagen: database is locked"
+    assert "Traceback" in shown[0][1]
+
+
+def test_reads_reuse_their_connection(app, database):
+    connections = []
+
+    def read():
+        connections.append(db.connection())
+        return db.execute_sql('PRAGMA cache_size').fetchone()[0]
+
+    sizes = []
+    for _ in range(10):
+        executor().read(read, sizes.append)
+        settle(app)
+    # the page cache of the connection is kept along with it
+    assert len(set(map(id, connections))) == 1
+    assert sizes == [PRAGMA_PROFILES['default']['cache_size']] * 10
@@ -0,0 +1,42 @@
+import csv
+from Data import *
+from Export import export
+from tests.helpers import add_contract, settle
+
+
+def read_rows(directory, name: str) -> list[dict]:
+    with open(directory / f'vertraege_{name}.csv', newline='', encoding='utf-8') as file:
+        return list(csv.DictReader(file))
+
+
+def test_export_skips_rows_of_deleted_contracts(database, tmp_path):
+    tag = ContractTag.create(name="Versicherung")
+    kept = add_contract("Hausrat", "365", 365, tags=(tag,))
+    orphan = add_contract("Haftpflicht", "1200", 365, tags=(tag,))
+    for contract in (kept, orphan):
+        ContractDocument.create(contract=contract, file=f"{contract.name}.pdf", description="Police",
+                                date=datetime.date.today())
+    # left behind by earlier versions, which deleted contracts only
+    Contract.delete().where(Contract.id == orphan.id).execute()
+    counts = export(str(tmp_path), 'vertraege_')
+    assert counts == {'contracts': 1, 'pricings': 1, 'tags': 1, 'documents': 1}
+    for name in ('pricings', 'tags', 'documents'):
+        assert [row['contract'] for row in read_rows(tmp_path, name)] == [str(kept.id)]
+
+
+def test_failed_export_is_reported(app, database, tmp_path, monkeypatch):
+    import MainWindow
+    add_contract("Hausrat", "365", 365)
+    warnings = []
+    monkeypatch.setattr(MainWindow.QInputDialog, 'getItem', lambda *args, **kwargs: ("CSV", True))
+    monkeypatch.setattr(MainWindow.QFileDialog, 'getExistingDirectory',
+                        lambda *args: str(tmp_path / 'nicht vorhanden'))
+    monkeypatch.setattr(MainWindow.QMessageBox, 'warning', lambda parent, title, text: warnings.append(text))
+    window = MainWindow.MainWindow(database)
+    settle(app)
+    window.export()
+    settle(app)
+    assert len(warnings) == 1 and warnings[0].startswith("Export fehlgeschlagen: ")
+    assert window.statusBar().currentMessage() == ""
+    window.deleteLater()
+    settle(app)
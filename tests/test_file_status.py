@@ -0,0 +1,44 @@
+import os
+import threading
+import FileStatus
+from FileStatus import FileStatusCache
+
+
+def settle_cache(app, cache: FileStatusCache):
+    while cache._pending:
+        cache._pool.waitForDone()
+        app.processEvents()
+
+
+def test_files_are_checked_in_the_background(app, tmp_path, monkeypatch):
+    (tmp_path / 'vorhanden.pdf').write_bytes(b'%PDF')
+    present, missing = str(tmp_path / 'vorhanden.pdf'), str(tmp_path / 'fehlt.pdf')
+    elsewhere = str(tmp_path / 'nicht vorhanden' / 'fehlt.pdf')
+    threads = []
+    for name in ('isfile', 'isdir'):
+        check = getattr(os.path, name)
+        monkeypatch.setattr(FileStatus.os.path, name,
+                            lambda path, check=check: threads.append(threading.current_thread()) or check(path))
+    cache = FileStatusCache()
+    done = []
+    cache.when_checked([present, missing, elsewhere], lambda: done.append(True))
+    settle_cache(app, cache)
+    assert done == [True]
+    assert (cache.exists(present), cache.exists(missing), cache.exists(elsewhere)) == (True, False, False)
+    assert threads and threading.main_thread() not in threads
+    # the directory is watched once, the missing one not at all
+    assert cache._watched == {str(tmp_path)}
+    assert cache._watcher.directories() == [str(tmp_path)]
+    cache.deleteLater()
+
+
+def test_polling_registers_directories_once(app, tmp_path, monkeypatch):
+    (tmp_path / 'vorhanden.pdf').write_bytes(b'%PDF')
+    cache = FileStatusCache()
+    added = []
+    monkeypatch.setattr(cache._watcher, 'addPath', added.append)
+    for _ in range(3):
+        cache._check([str(tmp_path / 'vorhanden.pdf'), str(tmp_path / 'fehlt.pdf')])
+        settle_cache(app, cache)
+    assert added == [str(tmp_path)]
+    cache.deleteLater()
@@ -0,0 +1,30 @@
+import datetime
+import hashlib
+import types
+import Generator
+from Data import *
+from Generator import generate
+
+
+class NextYear(datetime.date):
+    @classmethod
+    def today(cls):
+        return datetime.date(2027, 6, 1)
+
+
+def dump(filename: str) -> str:
+    open_database(filename)
+    try:
+        return hashlib.sha256('\n'.join(db.connection().iterdump()).encode()).hexdigest()
+    finally:
+        db.close_all()
+
+
+def test_same_seed_gives_same_file(tmp_path, monkeypatch):
+    generate(str(tmp_path / 'heute.db'), contracts=50, pricings=3, tags=5, documents=2, seed=7)
+    db.close_all()
+    # on another day
+    monkeypatch.setattr(Generator, 'datetime', types.SimpleNamespace(date=NextYear, timedelta=datetime.timedelta))
+    generate(str(tmp_path / 'spaeter.db'), contracts=50, pricings=3, tags=5, documents=2, seed=7)
+    db.close_all()
+    assert dump(str(tmp_path / 'heute.db')) == dump(str(tmp_path / 'spaeter.db'))
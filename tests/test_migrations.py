@@ -0,0 +1,109 @@
+import decimal
+import pytest
+import sqlite3
+import Cli
+from Data import *
+
+# the schema of files created before the schema was versioned
+BASELINE_SCHEMA = [
+    'CREATE TABLE "contract" ("id" INTEGER NOT NULL PRIMARY KEY, "name" VARCHAR(255) NOT NULL, '
+    '"company" VARCHAR(255) NOT NULL, "notes" TEXT NOT NULL, "reminder" DATE)',
+    'CREATE TABLE "contractdocument" ("id" INTEGER NOT NULL PRIMARY KEY, "contract_id" INTEGER NOT NULL, '
+    '"file" TEXT NOT NULL, "description" VARCHAR(255) NOT NULL, "date" DATE NOT NULL, '
+    'FOREIGN KEY ("contract_id") REFERENCES "contract" ("id"))',
+    'CREATE INDEX "contractdocument_contract_id" ON "contractdocument" ("contract_id")',
+    'CREATE TABLE "contractpricing" ("id" INTEGER NOT NULL PRIMARY KEY, "contract_id" INTEGER NOT NULL, '
+    '"price" DECIMAL(10, 5) NOT NULL, "payment_interval_days" INTEGER NOT NULL, "start_date" DATE NOT NULL, '
+    '"end_date" DATE, FOREIGN KEY ("contract_id") REFERENCES "contract" ("id"))',
+    'CREATE INDEX "contractpricing_contract_id" ON "contractpricing" ("contract_id")',
+    'CREATE TABLE "contracttag" ("id" INTEGER NOT NULL PRIMARY KEY, "name" VARCHAR(255) NOT NULL)',
+    'CREATE TABLE "contracttag_contract_through" ("id" INTEGER NOT NULL PRIMARY KEY, '
+    '"contracttag_id" INTEGER NOT NULL, "contract_id" INTEGER NOT NULL, '
+    'FOREIGN KEY ("contracttag_id") REFERENCES "contracttag" ("id"), '
+    'FOREIGN KEY ("contract_id") REFERENCES "contract" ("id"))',
+    'CREATE INDEX "contracttagcontractthrough_contracttag_id" ON "contracttag_contract_through" ("contracttag_id")',
+    'CREATE INDEX "contracttagcontractthrough_contract_id" ON "contracttag_contract_through" ("contract_id")',
+    'CREATE UNIQUE INDEX "contracttagcontractthrough_contracttag_id_contract_id" '
+    'ON "contracttag_contract_through" ("contracttag_id", "contract_id")',
+]
+
+
+def create_baseline_file(filename: str):
+    connection = sqlite3.connect(filename)
+    with connection:
+        for statement in BASELINE_SCHEMA:
+            connection.execute(statement)
+        connection.execute("INSERT INTO contract VALUES (1, 'Haftpflicht', 'Versicherung', 'Notiz', NULL)")
+        connection.execute("INSERT INTO contractpricing VALUES (1, 1, 120, 365, '2020-01-01', NULL)")
+        connection.execute("INSERT INTO contractdocument VALUES (1, 1, 'police.pdf', 'Police', '2020-01-01')")
+        connection.execute("INSERT INTO contracttag VALUES (1, 'Versicherung')")
+        connection.execute("INSERT INTO contracttag_contract_through VALUES (1, 1, 1)")
+    connection.close()
+
+
+def test_open_baseline_file(tmp_path):
+    filename = str(tmp_path / 'alt.db')
+    create_baseline_file(filename)
+    open_database(filename)
+    try:
+        assert schema_version() == len(MIGRATIONS)
+        contract = current_overview().get()
+        assert contract.name == 'Haftpflicht'
+        assert contract.currentpricing.per_year == decimal.Decimal('120')
+        assert search_contracts("Police") == ([1], True)
+        assert ContractDocument.get_by_id(1).hash is None
+    finally:
+        db.close_all()
+    # opening an up to date file again changes nothing
+    open_database(filename)
+    try:
+        assert schema_version() == len(MIGRATIONS)
+    finally:
+        db.close_all()
+
+
+def test_report_of_baseline_file(tmp_path, capsys):
+    filename = str(tmp_path / 'alt.db')
+    create_baseline_file(filename)
+    before = open(filename, 'rb').read()
+    # reports do not migrate the file
+    with pytest.raises(SystemExit):
+        Cli.main(['report', filename])
+    assert "bitte zuerst mit der Anwendung öffnen" in capsys.readouterr().err
+    assert open(filename, 'rb').read() == before
+    open_database(filename)
+    db.close_all()
+    assert Cli.main(['report', filename]) == 0
+    output = capsys.readouterr().out
+    assert "1 Verträge" in output
+    assert "Preis / Jahr: 120.00 €" in output
+    assert "Versicherung: 9.86 € / Monat, 120.00 € / Jahr (1 Verträge)" in output
+
+
+def schema_of(filename: str) -> dict[str, list]:
+    # every table, index and trigger with its columns, independent of how the statements were written
+    connection = sqlite3.connect(filename)
+    try:
+        names = connection.execute("SELECT type, name, tbl_name FROM sqlite_master "
+                                   "WHERE name NOT LIKE 'sqlite_%'").fetchall()
+        schema = {}
+        for kind, name, table in names:
+            if kind == 'table':
+                schema[name] = [row[1:] for row in connection.execute(f'PRAGMA table_info("{name}")')]
+            elif kind == 'index':
+                schema[name] = [table] + [row[2] for row in connection.execute(f'PRAGMA index_info("{name}")')]
+            else:
+                schema[name] = [kind, table]
+        return schema
+    finally:
+        connection.close()
+
+
+def test_migrated_schema_matches_new_files(tmp_path):
+    old, new = str(tmp_path / 'alt.db'), str(tmp_path / 'neu.db')
+    create_baseline_file(old)
+    open_database(old)
+    db.close_all()
+    open_database(new, create=True)
+    db.close_all()
+    assert schema_of(old) == schema_of(new)
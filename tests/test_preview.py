@@ -0,0 +1,74 @@
+import hashlib
+import os
+from PySide6 import QtGui
+from Preview import PreviewCache
+
+
+def write_files(tmp_path, count: int) -> list[str]:
+    paths = []
+    for number in range(count):
+        path = tmp_path / f'notiz{number}.txt'
+        path.write_text(f"Notiz {number}\n" * (number + 1), encoding='utf-8')
+        paths.append(str(path))
+    return paths
+
+
+def cached_file(cache: PreviewCache, path: str) -> str:
+    stat = os.stat(path)
+    key = hashlib.sha1(f"{path}\0{stat.st_mtime_ns}\0{stat.st_size}".encode()).hexdigest()
+    return os.path.join(cache._directory, key[:2], key + '.png')
+
+
+def settle_cache(app, cache: PreviewCache):
+    while cache._pending:
+        cache._pool.waitForDone()
+        app.processEvents()
+
+
+def test_least_recently_used_previews_are_dropped(app, tmp_path):
+    cache = PreviewCache(str(tmp_path / 'vorschau'))
+    cache.max_images = 3
+    first, second, third, fourth = write_files(tmp_path, 4)
+    for path in (first, second, third):
+        # one after another, the workers may finish in any order
+        assert cache.preview(path) is None
+        settle_cache(app, cache)
+    # the first one is used again, the second one is the oldest now
+    assert cache.preview(first) is not None
+    cache.preview(fourth)
+    settle_cache(app, cache)
+    assert list(cache._images) == [third, first, fourth]
+    cache.deleteLater()
+
+
+def test_disk_cache_drops_oldest_files(app, tmp_path):
+    cache = PreviewCache(str(tmp_path / 'vorschau'))
+    paths = write_files(tmp_path, 4)
+    for age, path in enumerate(paths[:3]):
+        cache.cached_image(path)
+        os.utime(cached_file(cache, path), (1000000 + age, 1000000 + age))
+    sizes = [os.path.getsize(cached_file(cache, path)) for path in paths[:3]]
+    # the fourth preview exceeds the limit
+    cache.max_bytes = sum(sizes) + 1
+    cache.cached_image(paths[3])
+    kept = [os.path.isfile(cached_file(cache, path)) for path in paths]
+    assert kept[0] is False and kept[3] is True
+    assert cache._disk_bytes == sum(entry.stat().st_size for entry in cache._entries()) <= cache.max_bytes * 3 // 4
+    cache.deleteLater()
+
+
+def test_changed_files_are_rendered_again(app, tmp_path):
+    cache = PreviewCache(str(tmp_path / 'vorschau'))
+    path, = write_files(tmp_path, 1)
+    cache.preview(path)
+    settle_cache(app, cache)
+    before = QtGui.QImage(cache.preview(path))
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write("ganz anderer Inhalt\n" * 20)
+    # as done once the file status changes
+    cache.forget(path)
+    assert cache.preview(path) is None
+    settle_cache(app, cache)
+    assert cache.preview(path) != before
+    assert os.path.isfile(cached_file(cache, path))
+    cache.deleteLater()
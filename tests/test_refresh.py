@@ -0,0 +1,33 @@
+import pytest
+from Data import *
+from Generator import generate
+from tests.helpers import count_statements, settle
+
+
+def refresh_statements(app, filename: str, tagged: bool) -> int:
+    import MainWindow
+    window = MainWindow.MainWindow(filename)
+    settle(app)
+    if tagged:
+        window._tag_list = list(ContractTag.select().limit(2))
+        window._radio_tag_sort_or.setChecked(True)
+    with count_statements() as statements:
+        window.refresh()
+        settle(app)
+    window.deleteLater()
+    settle(app)
+    assert len(window._table_contracts_model.get_ids()) > 0
+    return len(statements)
+
+
+@pytest.mark.parametrize('tagged', [False, True])
+def test_refresh_runs_constant_number_of_statements(app, tmp_path, tagged):
+    counts = []
+    for contracts in (20, 500):
+        filename = str(tmp_path / f'{contracts}.db')
+        generate(filename, contracts=contracts, pricings=3, tags=5, tag_density=0.5, documents=1)
+        try:
+            counts.append(refresh_statements(app, filename, tagged))
+        finally:
+            db.close_all()
+    assert counts[0] == counts[1]
@@ -0,0 +1,77 @@
+from Data import *
+from tests.helpers import add_contract
+
+
+def document(contract: Contract, description: str) -> ContractDocument:
+    return ContractDocument.create(contract=contract, file=f"{description}.pdf", description=description,
+                                   date=datetime.date.today())
+
+
+def test_words_match_as_prefixes(database):
+    electricity = add_contract("Stromvertrag", company="Stadtwerke")
+    add_contract("Gasvertrag", company="Stadtwerke")
+    assert search_contracts("strom") == ([electricity.id], True)
+    assert search_contracts("Stadt Strom") == ([electricity.id], True)
+    # words are matched from their beginning only
+    assert search_contracts("vertrag") == ([], True)
+
+
+def test_names_rank_before_notes(database):
+    noted = add_contract("Girokonto")
+    Contract.update(notes="Kündigung der Haftpflicht bestätigt").where(Contract.id == noted.id).execute()
+    named = add_contract("Haftpflicht")
+    assert search_contracts("haftpflicht") == ([named.id, noted.id], True)
+
+
+def test_search_within_contracts(database):
+    first, second = add_contract("Hausrat"), add_contract("Hausrat Ferienwohnung")
+    assert search_contracts("hausrat", [second.id]) == ([second.id], True)
+    assert search_contracts("hausrat", []) == ([], True)
+    assert sorted(search_contracts("hausrat", [first.id, second.id])[0]) == [first.id, second.id]
+
+
+def test_document_descriptions_and_texts(database):
+    described, extracted = add_contract("Haftpflicht"), add_contract("Hausrat")
+    document(described, "Police Nr 4711")
+    scanned = document(extracted, "Scan")
+    DocumentText.insert(rowid=scanned.id, text="Versicherungsschein 4711", file=scanned.file, size='1', mtime='1',
+                        hash='').execute()
+    # contracts found by the contents of their documents only follow the others
+    assert search_contracts("4711") == ([described.id, extracted.id], True)
+    assert search_contracts("versicherungsschein") == ([extracted.id], True)
+
+
+def test_punctuation_only(database):
+    add_contract("Hausrat")
+    assert search_contracts("- / ,") is None
+    assert search_contracts("") is None
+    # quotes do not break the expression
+    assert search_contracts('"Hausrat') == ([1], True)
+
+
+def test_many_matches_stay_unranked(database):
+    Contract.insert_many([{'name': f"Vertrag {number}", 'company': "Anbieter", 'notes': ""}
+                          for number in range(RANKED_MATCHES + 1)]).execute()
+    ids, ranked = search_contracts("vertrag")
+    assert not ranked
+    assert sorted(ids) == list(range(1, RANKED_MATCHES + 2))
+    # fewer matches are ranked again
+    assert search_contracts("vertrag 1999") == ([2000], True)
+
+
+def test_index_follows_changes(database):
+    contract = add_contract("Haftpflicht")
+    policy = document(contract, "Police")
+    contract.name = "Hausrat"
+    contract.save()
+    assert search_contracts("haftpflicht") == ([], True)
+    assert search_contracts("hausrat") == ([contract.id], True)
+    policy.description = "Rechnung"
+    policy.save()
+    assert search_contracts("police") == ([], True)
+    assert search_contracts("rechnung") == ([contract.id], True)
+    policy.delete_instance()
+    assert search_contracts("rechnung") == ([], True)
+    contract.delete_instance()
+    assert search_contracts("hausrat") == ([], True)
+    assert ContractSearch.select().count() == 0
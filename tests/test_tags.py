@@ -0,0 +1,32 @@
+from Data import *
+from tests.helpers import add_contract, settle
+
+
+def tag_labels(model) -> list[str]:
+    return [model.data(model.index(row)) for row in range(model.rowCount())]
+
+
+def test_tag_counts_skip_links_of_deleted_contracts(app, database):
+    from TagListView import TagListModel
+    tag = ContractTag.create(name="Versicherung")
+    add_contract("Haftpflicht", "120", 365, tags=(tag,))
+    orphan = add_contract("Hausrat", "60", 365, tags=(tag,))
+    # left behind by earlier versions, which deleted contracts only
+    Contract.delete().where(Contract.id == orphan.id).execute()
+    model = TagListModel()
+    settle(app)
+    assert tag_labels(model) == ["Versicherung (1)", "..."]
+
+
+def test_tag_counts_follow_deleted_contracts(app, database):
+    from Executor import executor
+    from TagListView import TagListModel
+    tag = ContractTag.create(name="Versicherung")
+    add_contract("Haftpflicht", "120", 365, tags=(tag,))
+    deleted = add_contract("Hausrat", "60", 365, tags=(tag,))
+    model = TagListModel()
+    settle(app)
+    assert tag_labels(model) == ["Versicherung (2)", "..."]
+    executor().write(deleted.delete_instance)
+    settle(app)
+    assert tag_labels(model) == ["Versicherung (1)", "..."]
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+from Data import *
+from TextIndex import extract_text, stale_documents, store_document_texts
+from tests.helpers import add_contract
+
+
+def indexed(database: str, text: str = "Police Nr 4711") -> ContractDocument:
+    with open(os.path.join(os.path.dirname(database), 'police.txt'), 'w', encoding='utf-8') as file:
+        file.write(text)
+    document = ContractDocument.create(contract=add_contract("Haftpflicht"), file='police.txt', description="Police",
+                                       date=datetime.date.today(), hash='a' * 64)
+    store_document_texts([(document_id, extract_text(path), state) for document_id, path, state in stale_documents()])
+    return document
+
+
+def test_unchanged_files_are_skipped(database):
+    indexed(database)
+    assert stale_documents() == []
+    assert search_contracts("4711")[0] == [1]
+
+
+def test_changed_files_are_extracted_again(database):
+    document = indexed(database)
+    path = document.absolute_file
+    # other size
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write("Police Nr 4712 neu")
+    assert [document_id for document_id, _, _ in stale_documents()] == [document.id]
+    store_document_texts([(document_id, extract_text(path), state) for document_id, path, state in stale_documents()])
+    assert search_contracts("4712")[0] == [document.contract_id]
+    # only the time
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    assert [document_id for document_id, _, _ in stale_documents()] == [document.id]
+
+
+def test_changed_hash_is_extracted_again(database):
+    document = indexed(database)
+    ContractDocument.update(hash='b' * 64).where(ContractDocument.id == document.id).execute()
+    assert [document_id for document_id, _, _ in stale_documents([document.id])] == [document.id]
+
+
+def test_missing_files_keep_their_text(database):
+    document = indexed(database)
+    os.remove(document.absolute_file)
+    assert stale_documents() == []
+    assert search_contracts("4711")[0] == [document.contract_id]
+
+
+def test_extractors_are_looked_up_on_first_use():
+    # importing the module is on the path to the first paint
+    script = "import shutil, sys; shutil.which = lambda *args: sys.exit('PATH durchsucht'); import TextIndex"
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(path for path in sys.path if path)}
+    subprocess.run([sys.executable, '-c', script], env=env, check=True)
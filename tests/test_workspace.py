@@ -0,0 +1,89 @@
+import decimal
+import hashlib
+import pytest
+import Cli
+from Data import *
+from Workspace import close_workspace, open_workspace, workspace_contracts, workspace_tags, workspace_totals
+from tests.helpers import add_contract, settle
+from tests.test_migrations import create_baseline_file
+
+
+@pytest.fixture
+def files(tmp_path):
+    # a file of the first version and an up to date one, both with a tag "Versicherung"
+    old, new = str(tmp_path / 'alt.db'), str(tmp_path / 'neu.db')
+    create_baseline_file(old)
+    open_database(new, create=True)
+    insurance, car = ContractTag.create(name="Versicherung"), ContractTag.create(name="Auto")
+    add_contract("Kasko", "365", 365, tags=(insurance, car))
+    add_contract("Tankkarte", "30", 30, tags=(car,))
+    db.close_all()
+    return [old, new]
+
+
+def checksums(files: list[str]) -> list[str]:
+    return [hashlib.sha256(open(file, 'rb').read()).hexdigest() for file in files]
+
+
+@pytest.fixture
+def workspace(files):
+    before = checksums(files)
+    sources = open_workspace(files)
+    yield sources
+    close_workspace(sources)
+    # read only, the old file is not even migrated
+    assert checksums(files) == before
+
+
+def test_totals(workspace):
+    assert workspace_totals(workspace) == [(0, 1, 9.86, 120.0), (1, 2, 60.0, 730.0), (None, 3, 69.86, 850.0)]
+    assert workspace_totals(workspace, tag_names={0: ["Versicherung"], 1: ["Versicherung"]}) \
+        == [(0, 1, 9.86, 120.0), (1, 1, 30.0, 365.0), (None, 2, 39.86, 485.0)]
+
+
+def test_tags_keep_their_source(workspace):
+    assert workspace_tags(workspace) == [(1, "Auto", 2, 60.0, 730.0), (0, "Versicherung", 1, 9.86, 120.0),
+                                         (1, "Versicherung", 1, 30.0, 365.0)]
+    # the tags of one file filter only the contracts of that file
+    rows = db.execute(workspace_contracts(workspace, tag_names={1: ["Versicherung", "Auto"]})).fetchall()
+    assert [(source, name) for source, _, name, *_ in rows] == [(1, "Kasko")]
+    rows = db.execute(workspace_contracts(workspace, tag_names={1: ["Versicherung", "Auto"]}, match_all=False))\
+        .fetchall()
+    assert sorted((source, name) for source, _, name, *_ in rows) == [(1, "Kasko"), (1, "Tankkarte")]
+
+
+def test_files_cannot_be_changed(workspace):
+    with pytest.raises(OperationalError):
+        db.execute_sql('DELETE FROM "quelle0"."contract"')
+
+
+def test_other_files_are_rejected(tmp_path):
+    other = tmp_path / 'notizen.txt'
+    other.write_text("keine Datenbank")
+    with pytest.raises(ValueError):
+        open_workspace([str(other)])
+
+
+def test_command_line(files, capsys):
+    assert Cli.main(['workspace', *files]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert f"  Gesamt: 69.86 € / Monat, 850.00 € / Jahr (3 Verträge)" in lines
+    assert f"  Versicherung ({files[0]}): 9.86 € / Monat, 120.00 € / Jahr (1 Verträge)" in lines
+    assert Cli.main(['workspace', *files, '--tag', 'Auto']) == 0
+    assert f"  Gesamt: 60.00 € / Monat, 730.00 € / Jahr (2 Verträge)" in capsys.readouterr().out.splitlines()
+
+
+def test_window(app, workspace):
+    from WorkspaceWindow import WorkspaceWindow
+    window = WorkspaceWindow(workspace)
+    window.start()
+    settle(app)
+    assert window._table_contracts_model.rowCount() == 3
+    assert window._table_tags.rowCount() == 3
+    # the tag "Versicherung" of the old file
+    window._table_tags.selectRow(1)
+    settle(app)
+    assert window._table_contracts_model.rowCount() == 1
+    assert window._table_totals.item(1, 3).text() == "120.00 €"
+    window.deleteLater()
+    settle(app)